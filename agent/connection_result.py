@@ -1,28 +1,131 @@
-from dataclasses import dataclass
+import base64
 from datetime import datetime
 
-@dataclass
+# Output representations accepted by CommandResult.to_dict().
+OUTPUT_FORMATS = ("text", "base64")
+
+
+def _as_bytes(value: bytes | str) -> bytes:
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return bytes(value)
+
+
 class CommandResult:
-    command: str
-    exit_code: int
-    stdout: str
-    stderr: str
-    started_at: datetime
-    ended_at: datetime
-
-    def to_dict(self):
-        """Convert CommandResult to a dictionary."""
-        return {
+    """Outcome of one executed command.
+
+    stdout/stderr are stored as the raw bytes the command wrote and decoded
+    only when read, using *encoding* and *errors* (default "replace", so
+    non-UTF-8 output never raises). Pass errors="strict" to surface decoding
+    problems instead. str values are accepted for convenience and stored
+    UTF-8 encoded.
+    """
+
+    __slots__ = (
+        "command",
+        "exit_code",
+        "started_at",
+        "ended_at",
+        "stdout_truncated",
+        "stderr_truncated",
+        "stdout_total_bytes",
+        "stderr_total_bytes",
+        "encoding",
+        "errors",
+        "_stdout",
+        "_stderr",
+    )
+
+    def __init__(
+        self,
+        command: str,
+        exit_code: int,
+        stdout: bytes | str,
+        stderr: bytes | str,
+        started_at: datetime,
+        ended_at: datetime,
+        # Output beyond the per-stream limit is drained but not retained.
+        # *_total_bytes counts everything the command wrote; None means "not measured".
+        stdout_truncated: bool = False,
+        stderr_truncated: bool = False,
+        stdout_total_bytes: int | None = None,
+        stderr_total_bytes: int | None = None,
+        encoding: str = "utf-8",
+        errors: str = "replace",
+    ):
+        self.command = command
+        self.exit_code = exit_code
+        self._stdout = _as_bytes(stdout)
+        self._stderr = _as_bytes(stderr)
+        self.started_at = started_at
+        self.ended_at = ended_at
+        self.stdout_truncated = stdout_truncated
+        self.stderr_truncated = stderr_truncated
+        self.stdout_total_bytes = stdout_total_bytes
+        self.stderr_total_bytes = stderr_total_bytes
+        self.encoding = encoding
+        self.errors = errors
+
+    @property
+    def stdout_bytes(self) -> bytes:
+        return self._stdout
+
+    @property
+    def stderr_bytes(self) -> bytes:
+        return self._stderr
+
+    @property
+    def stdout(self) -> str:
+        return self._stdout.decode(self.encoding, self.errors)
+
+    @property
+    def stderr(self) -> str:
+        return self._stderr.decode(self.encoding, self.errors)
+
+    def to_dict(self, output_format: str = "text"):
+        """Convert CommandResult to a dictionary.
+
+        output_format="text" decodes stdout/stderr; "base64" returns the raw
+        bytes base64-encoded (for binary output) and adds "output_format".
+        """
+        if output_format == "text":
+            stdout, stderr = self.stdout, self.stderr
+        elif output_format == "base64":
+            stdout = base64.b64encode(self._stdout).decode("ascii")
+            stderr = base64.b64encode(self._stderr).decode("ascii")
+        else:
+            raise ValueError(f"Unknown output_format: {output_format!r}")
+        result = {
             "command": self.command,
             "exit_code": self.exit_code,
-            "stdout": self.stdout,
-            "stderr": self.stderr,
+            "stdout": stdout,
+            "stderr": stderr,
             "started_at": self.started_at.isoformat(),
             "ended_at": self.ended_at.isoformat(),
+            "stdout_truncated": self.stdout_truncated,
+            "stderr_truncated": self.stderr_truncated,
+            "stdout_total_bytes": self.stdout_total_bytes,
+            "stderr_total_bytes": self.stderr_total_bytes,
         }
+        if output_format != "text":
+            result["output_format"] = output_format
+        return result
 
     def duration(self) -> float:
         return (self.ended_at - self.started_at).total_seconds()
 
     def succeeded(self) -> bool:
-        return self.exit_code == 0
\ No newline at end of file
+        return self.exit_code == 0
+
+    def __eq__(self, other):
+        if not isinstance(other, CommandResult):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"CommandResult(command={self.command!r}, exit_code={self.exit_code!r}, "
+            f"stdout_bytes={len(self._stdout)}, stderr_bytes={len(self._stderr)})"
+        )
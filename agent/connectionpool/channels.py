@@ -0,0 +1,22 @@
+"""Waiting for data on Paramiko channels.
+
+Local boundary notes:
+- A Paramiko channel exposes readiness through `fileno()`, an OS pipe that
+  becomes readable when data (or EOF) arrives. The gateway holds one such
+  pipe per open channel, so with hundreds of connections the descriptor
+  numbers routinely pass 1024, which `select.select()` cannot handle. Waits
+  go through `selectors` (epoll/poll/kqueue) instead.
+"""
+
+import selectors
+from typing import Optional
+
+
+def wait_readable(channel, timeout: Optional[float]) -> bool:
+    """Block until *channel* has data or EOF pending, or *timeout* seconds pass (None = no limit).
+
+    Returns True if the channel became readable.
+    """
+    with selectors.DefaultSelector() as selector:
+        selector.register(channel.fileno(), selectors.EVENT_READ)
+        return bool(selector.select(timeout))
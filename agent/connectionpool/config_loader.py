@@ -9,6 +9,29 @@ class ConnectionMode(Enum):
     DIRECT = "direct"
     TUNNEL = "tunnel"
 
+# Default cap on concurrently open exec/SFTP channels per connection.
+# OpenSSH's MaxSessions defaults to 10; stay safely below it so health checks
+# and ad-hoc SFTP sessions still find a free slot.
+DEFAULT_MAX_CHANNELS = 8
+
+# Default number of SFTP read requests (32 KiB each) kept in flight while
+# downloading. Throughput is bounded by window * 32 KiB / RTT; raise it for
+# high-latency links.
+DEFAULT_SFTP_PREFETCH_WINDOW = 64
+
+# Default bound, in seconds, on each phase of opening a direct connection
+# (TCP connect, SSH banner, authentication) so one unreachable host cannot
+# hold a pool worker indefinitely.
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+# Health check mode: "passive" only watches transport.is_active(); "active"
+# also sends an SSH keepalive global request with a reply deadline, which
+# catches half-open sessions and measures round-trip time.
+HEALTH_CHECK_MODES = ("active", "passive")
+DEFAULT_HEALTH_CHECK = "active"
+# Seconds an active keepalive may go unanswered before the connection is BROKEN.
+DEFAULT_KEEPALIVE_TIMEOUT = 10.0
+
 class ConnectionConfigError(Exception):
     """Raised when the connection configuration is invalid."""
     pass
@@ -21,6 +44,11 @@ class ConnectionConfig:
     mode: str  # either "direct" or "tunnel"
     port: int
     host: Optional[str]  # required for 'direct', None for 'tunnel'
+    max_channels: int = DEFAULT_MAX_CHANNELS  # concurrent channels per connection
+    sftp_prefetch_window: int = DEFAULT_SFTP_PREFETCH_WINDOW  # outstanding SFTP reads per download
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT  # seconds per connect/banner/auth phase
+    health_check: str = DEFAULT_HEALTH_CHECK  # "active" | "passive"
+    keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT  # active mode reply deadline, seconds
 
 def load_connections(path: str) -> list[dict]:
     """Load connection configurations from a file."""
@@ -76,13 +104,38 @@ def parse_connections(raw_connections: list[dict]) -> list[ConnectionConfig]:
             if not host or not isinstance(host, str):
                 raise ConnectionConfigError(f"{ctx} 'host' is required for mode 'direct'")
 
+        max_channels = conn.get("max_channels", DEFAULT_MAX_CHANNELS)
+        if isinstance(max_channels, bool) or not isinstance(max_channels, int) or max_channels < 1:
+            raise ConnectionConfigError(f"{ctx} Invalid 'max_channels' (must be a positive integer)")
+
+        prefetch_window = conn.get("sftp_prefetch_window", DEFAULT_SFTP_PREFETCH_WINDOW)
+        if isinstance(prefetch_window, bool) or not isinstance(prefetch_window, int) or prefetch_window < 1:
+            raise ConnectionConfigError(f"{ctx} Invalid 'sftp_prefetch_window' (must be a positive integer)")
+
+        connect_timeout = conn.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)
+        if isinstance(connect_timeout, bool) or not isinstance(connect_timeout, (int, float)) or connect_timeout <= 0:
+            raise ConnectionConfigError(f"{ctx} Invalid 'connect_timeout' (must be a positive number of seconds)")
+
+        health_check = conn.get("health_check", DEFAULT_HEALTH_CHECK)
+        if health_check not in HEALTH_CHECK_MODES:
+            raise ConnectionConfigError(f"{ctx} Invalid 'health_check' (must be 'active' or 'passive')")
+
+        keepalive_timeout = conn.get("keepalive_timeout", DEFAULT_KEEPALIVE_TIMEOUT)
+        if isinstance(keepalive_timeout, bool) or not isinstance(keepalive_timeout, (int, float)) or keepalive_timeout <= 0:
+            raise ConnectionConfigError(f"{ctx} Invalid 'keepalive_timeout' (must be a positive number of seconds)")
+
         validated.append(ConnectionConfig(
             name=name,
             user=user,
             id_file=id_file,
             mode=mode,
             port=port,
-            host=host if mode == "direct" else None
+            host=host if mode == "direct" else None,
+            max_channels=max_channels,
+            sftp_prefetch_window=prefetch_window,
+            connect_timeout=float(connect_timeout),
+            health_check=health_check,
+            keepalive_timeout=float(keepalive_timeout),
         ))
 
     logging.info(f"✅ Parsed {len(validated)} connection(s).")
@@ -7,13 +7,25 @@ Local boundary notes:
 """
 
 import logging
+import socket
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from enum import Enum
-from typing import Optional, List
-from paramiko import SSHClient, AutoAddPolicy
+from typing import Callable, Iterator, Optional, List
+from paramiko import SSHClient, AutoAddPolicy, SFTPClient, SSHException
 from agent.connection_result import CommandResult
 from agent.connectionpool.config_loader import ConnectionMode, ConnectionConfig
+from agent.connectionpool.config_loader import DEFAULT_MAX_CHANNELS, DEFAULT_SFTP_PREFETCH_WINDOW
+from agent.connectionpool.config_loader import DEFAULT_CONNECT_TIMEOUT, DEFAULT_HEALTH_CHECK, DEFAULT_KEEPALIVE_TIMEOUT
+from agent.connectionpool import delta, tarstream
+from agent.connectionpool.channels import wait_readable
+from agent.connectionpool.delta import DEFAULT_BLOCK_SIZE
+from agent.connectionpool.history import CommandHistory, DEFAULT_PAGE_SIZE
+from agent.connectionpool.rtt import RttTracker
+from agent.connectionpool.scheduler import ScheduledTask, TimerScheduler, default_scheduler
+from agent.connectionpool.session import ShellSession
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(message)s')
@@ -26,51 +38,186 @@ class ConnectionState(Enum):
     BROKEN = "broken"           # Was open, but failed
 
 
+# Scheduler callbacks wait at most this long for a connection lock, then retry
+# later, so one busy connection cannot pin a shared timer worker.
+_CALLBACK_LOCK_TIMEOUT = 0.5
+_CALLBACK_RETRY_DELAY = 1.0
+_TUNNEL_CONNECT_WORKERS = 8
+_KEEPALIVE_WORKERS = 16
+
+
+# Global request name for keepalives; OpenSSH answers it (with a failure reply)
+# like any request it does not implement, which is all a liveness probe needs.
+KEEPALIVE_REQUEST = "keepalive@openssh.com"
+
+
 class OneShotRepeatingTimer:
     """
-    A helper class for registering recurring actions using a one-shot timer model.
-    Each callback is responsible for rescheduling the next timer.
+    A helper class for registering recurring actions using a one-shot timer model:
+    the next run is due `interval` seconds after the previous one finished.
+
+    Runs are driven by the shared TimerScheduler instead of a thread per timer.
+    start() is a no-op once started (or after cancel()).
     """
-    def __init__(self, interval, callback):
+    def __init__(self, interval, callback, scheduler: Optional[TimerScheduler] = None):
         self.interval = interval
         self.callback = callback
-        self._timer: Optional[threading.Timer] = None
+        self._scheduler = scheduler
+        self._task: Optional[ScheduledTask] = None
         self._lock = threading.Lock()
         self._stopped = False
-        self._running = False
 
     def start(self):
         with self._lock:
-            if self._stopped or self._running:
+            if self._stopped or self._task is not None:
                 return
-            self._running = True
-            self._timer = threading.Timer(self.interval, self._run)
-            self._timer.daemon = True
-            self._timer.start()
-
-    def _run(self):
-        try:
-            self.callback()
-        finally:
-            with self._lock:
-                self._running = False
-                if not self._stopped:
-                    self._timer = threading.Timer(self.interval, self._run)
-                    self._timer.daemon = True
-                    self._timer.start()
+            scheduler = self._scheduler or default_scheduler()
+            self._task = scheduler.call_every(self.interval, self.callback)
 
     def cancel(self):
         with self._lock:
             self._stopped = True
-            if self._timer:
-                self._timer.cancel()
-                self._timer = None
+            if self._task:
+                self._task.cancel()
+                self._task = None
+
+
+# Per-stream cap on command output retained in a CommandResult (1 MiB).
+DEFAULT_OUTPUT_LIMIT = 1024 * 1024
+
+# Bytes requested per channel read while draining command output.
+_READ_CHUNK = 32768
+
+# Most bytes read per drain pass before deadline and cancel are checked again,
+# so a command producing output faster than it is read cannot starve them.
+_DRAIN_PASS_BYTES = 32 * _READ_CHUNK
+
+# Upper bound on a single wait while a cancel event is being watched.
+_CANCEL_POLL_INTERVAL = 0.2
+
+# Largest slice copied out of a shared buffer per SFTP write.
+_SFTP_WRITE_CHUNK = 1024 * 1024
+
+# Upper bound on file content returned by download_tree(), matching download_file().
+DEFAULT_TREE_DOWNLOAD_LIMIT = 10 * 1024 * 1024
+
+
+class CommandCancelled(Exception):
+    """Raised by BaseConnection.execute() when its cancel_event is set mid-command."""
+
+
+class _BoundedBuffer:
+    """Accumulates stream output up to *limit* bytes and counts the remainder.
+
+    Every chunk is also passed to *sink* (if given) before the limit applies,
+    so streaming consumers see the complete output.
+    """
+
+    __slots__ = ("limit", "total", "_chunks", "_retained", "_sink")
+
+    def __init__(self, limit: int, sink: Optional[Callable[[bytes], None]] = None):
+        self.limit = limit
+        self.total = 0
+        self._chunks: List[bytes] = []
+        self._retained = 0
+        self._sink = sink
+
+    def feed(self, data: bytes) -> None:
+        if self._sink is not None:
+            self._sink(data)
+        self.total += len(data)
+        room = self.limit - self._retained
+        if room > 0:
+            kept = data[:room]
+            self._chunks.append(kept)
+            self._retained += len(kept)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self._retained
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._chunks)
+
+
+def _drain_ready(
+    channel, out_buf: _BoundedBuffer, err_buf: _BoundedBuffer, max_bytes: Optional[int] = None
+) -> bool:
+    """Move output currently buffered on *channel* into the output buffers.
+
+    Stops after about *max_bytes* (None = until nothing is buffered). Returns
+    True if it stopped on the budget, i.e. more output may be waiting.
+    """
+    received = 0
+    while max_bytes is None or received < max_bytes:
+        progressed = False
+        if channel.recv_ready():
+            chunk = channel.recv(_READ_CHUNK)
+            out_buf.feed(chunk)
+            received += len(chunk)
+            progressed = True
+        if channel.recv_stderr_ready():
+            chunk = channel.recv_stderr(_READ_CHUNK)
+            err_buf.feed(chunk)
+            received += len(chunk)
+            progressed = True
+        if not progressed:
+            return False
+    return True
+
+
+def _drain_channel(
+    channel,
+    out_buf: _BoundedBuffer,
+    err_buf: _BoundedBuffer,
+    deadline: Optional[float],
+    cancel_event: Optional[threading.Event] = None,
+) -> int:
+    """Read stdout/stderr from *channel* until the command exits; return its exit status.
+
+    Waiting is event-driven on the calling thread: while output may still
+    arrive we wait on the channel's notification pipe, and once EOF is in
+    we block on the channel's exit-status event. No helper thread is used.
+
+    Raises TimeoutError once time.monotonic() passes *deadline* (None = no deadline),
+    and CommandCancelled once *cancel_event* is set.
+    """
+    while True:
+        more = _drain_ready(channel, out_buf, err_buf, _DRAIN_PASS_BYTES)
+        if channel.exit_status_ready() or channel.closed:
+            # Output precedes exit-status on the wire, so one final pass
+            # picks up anything that landed after the previous drain. The
+            # command has exited, so what is left is finite.
+            _drain_ready(channel, out_buf, err_buf)
+            return channel.recv_exit_status()
+
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError("command deadline exceeded")
+        if cancel_event is not None:
+            if cancel_event.is_set():
+                raise CommandCancelled("command cancelled")
+            remaining = _CANCEL_POLL_INTERVAL if remaining is None else min(remaining, _CANCEL_POLL_INTERVAL)
+
+        if more:
+            continue  # output is still buffered; no need to wait for it
+        if channel.eof_received:
+            # Both streams are finished; only the exit status is outstanding.
+            # The notification pipe stays readable after EOF, so waiting on it would spin.
+            channel.status_event.wait(remaining)
+        else:
+            wait_readable(channel, remaining)
 
 
 class BaseConnection:
     """
     Abstract base class for connections. Implements state handling,
     health monitoring, and common metadata logic.
+
+    Commands and SFTP transfers are multiplexed as separate channels over the
+    single Paramiko transport. ``self._lock`` only guards the client reference
+    and channel setup; the number of channels in flight is capped by
+    ``self._channel_slots`` (``config.max_channels``).
     """
     def __init__(self, config):
         self.name = config.name
@@ -81,10 +228,26 @@ class BaseConnection:
         self.host = config.host
         self.state = ConnectionState.CLOSED
         self.metadata = {"os_version": None, "architecture": None}
-        self._history: List[CommandResult] = []
+        self._history = CommandHistory()
+        # Incremented on every successful open; lets callers detect reconnects.
+        self.generation = 0
         self._ssh: Optional[SSHClient] = None
         self._health_timer: Optional[OneShotRepeatingTimer] = None
         self._lock = threading.Lock()
+        self.max_channels = config.max_channels or DEFAULT_MAX_CHANNELS
+        self._channel_slots = threading.BoundedSemaphore(self.max_channels)
+        self.sftp_prefetch_window = config.sftp_prefetch_window or DEFAULT_SFTP_PREFETCH_WINDOW
+        self.connect_timeout = config.connect_timeout or DEFAULT_CONNECT_TIMEOUT
+        self.health_check = config.health_check or DEFAULT_HEALTH_CHECK
+        self.keepalive_timeout = config.keepalive_timeout or DEFAULT_KEEPALIVE_TIMEOUT
+        self.rtt = RttTracker()
+        # Shared SFTP client, opened lazily. paramiko's SFTPClient cannot serve
+        # concurrent blocking calls, so _sftp_lock serialises its use.
+        self._sftp: Optional[SFTPClient] = None
+        self._sftp_generation: Optional[int] = None
+        self._sftp_lock = threading.Lock()
+        # Guards swapping self._sftp, so close() racing a failing transfer releases its slot once.
+        self._sftp_swap_lock = threading.Lock()
 
     def open(self):
         raise NotImplementedError
@@ -92,6 +255,7 @@ class BaseConnection:
     def close(self):
         with self._lock:
             logging.info(f"🛑 Closing connection: {self.name}")
+            self._discard_sftp()
             if self._ssh:
                 self._ssh.close()
             self._ssh = None
@@ -100,57 +264,191 @@ class BaseConnection:
                 self._health_timer.cancel()
                 self._health_timer = None
 
-    def execute(self, command: str, timeout: int | float | None = None) -> CommandResult:
-        import threading as _threading
-        from datetime import datetime, timezone
-        with self._lock:
-            if not self._ssh:
-                raise RuntimeError("Connection is not open.")
+    @contextmanager
+    def _sftp_session(self) -> Iterator[SFTPClient]:
+        """Yield the connection's SFTP client for exclusive use.
 
-            started_at = datetime.now(timezone.utc)
-            logging.info(f"💻 Executing on {self.name}: {command}")
-            stdin, stdout, stderr = self._ssh.exec_command(command)
+        The client is opened on first use and kept for later transfers. It is
+        re-opened after a reconnect (generation change) and dropped if the
+        SFTP channel fails mid-operation.
 
-            # recv_exit_status() internally waits on a threading.Event and ignores
-            # channel.settimeout(), so we enforce the deadline via a worker thread.
-            exit_code_holder: list = [None]
-            exc_holder: list = [None]
+        The client's single channel holds one channel slot from open until
+        _discard_sftp(); callers queued on _sftp_lock hold none, so pending
+        transfers cannot starve execute() of slots. The slot for a new client
+        is awaited without holding _sftp_lock and for at most connect_timeout
+        seconds.
 
-            def _wait():
-                try:
-                    exit_code_holder[0] = stdout.channel.recv_exit_status()
-                except Exception as e:
-                    exc_holder[0] = e
+        Raises:
+            TimeoutError: if a new client is needed and no channel slot frees up in time.
+        """
+        spare_slot = False
+        try:
+            while True:
+                self._sftp_lock.acquire()
+                if self._sftp is not None and self._sftp_generation != self.generation:
+                    self._discard_sftp()
+                if self._sftp is not None or spare_slot:
+                    break
+                # Wait for a slot without blocking other SFTP callers, then re-check.
+                self._sftp_lock.release()
+                self._acquire_channel_slot(self.connect_timeout)
+                spare_slot = True
+            try:
+                if self._sftp is None:
+                    with self._lock:
+                        if not self._ssh:
+                            raise RuntimeError("Connection is not open.")
+                        sftp = self._ssh.open_sftp()
+                    with self._sftp_swap_lock:
+                        self._sftp = sftp
+                        self._sftp_generation = self.generation
+                    spare_slot = False  # now held by the client until _discard_sftp()
+                yield self._sftp
+            except (SSHException, EOFError):
+                self._discard_sftp()
+                raise
+            finally:
+                self._sftp_lock.release()
+        finally:
+            if spare_slot:
+                self._channel_slots.release()
 
-            t = _threading.Thread(target=_wait, daemon=True)
-            t.start()
-            t.join(timeout)
+    def _discard_sftp(self) -> None:
+        """Close the shared SFTP client, if any, and release its channel slot. Safe to race with itself."""
+        with self._sftp_swap_lock:
+            sftp, self._sftp = self._sftp, None
+        if sftp is not None:
+            try:
+                sftp.close()
+            except Exception:
+                pass
+            self._channel_slots.release()
 
-            if t.is_alive():
-                # Close the channel to unblock the waiting thread
+    def _acquire_channel_slot(
+        self, timeout: int | float | None, cancel_event: Optional[threading.Event] = None
+    ) -> None:
+        """Block until a channel slot is free, or raise TimeoutError after *timeout* seconds.
+
+        With *cancel_event*, the wait is polled and raises CommandCancelled once
+        the event is set, so a caller queued behind busy slots can be cancelled.
+        """
+        if cancel_event is None:
+            acquired = self._channel_slots.acquire(timeout=timeout)
+        else:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            acquired = False
+            while not acquired:
+                if cancel_event.is_set():
+                    raise CommandCancelled("command cancelled while waiting for a channel slot")
+                wait = _CANCEL_POLL_INTERVAL
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    wait = min(wait, remaining)
+                acquired = self._channel_slots.acquire(timeout=wait)
+        if not acquired:
+            raise TimeoutError(
+                f"No free channel on {self.name} within {timeout}s "
+                f"(max_channels={self.max_channels})"
+            )
+
+    def execute(
+        self,
+        command: str,
+        timeout: int | float | None = None,
+        output_limit: int = DEFAULT_OUTPUT_LIMIT,
+        on_stdout: Optional[Callable[[bytes], None]] = None,
+        on_stderr: Optional[Callable[[bytes], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> CommandResult:
+        """Run *command* on a new exec channel and collect its result.
+
+        stdout and stderr are drained incrementally while the command runs, so
+        the remote side never stalls on a full channel window. Each stream keeps
+        at most *output_limit* bytes; anything beyond is read and discarded, and
+        reported via the ``*_truncated`` / ``*_total_bytes`` fields.
+
+        *on_stdout* / *on_stderr* receive every raw chunk as it arrives,
+        regardless of *output_limit*. Setting *cancel_event* closes the channel
+        and aborts the wait; set while still queued for a channel slot, the
+        command is never started. *timeout* covers the slot wait and the run
+        together.
+
+        Raises:
+            RuntimeError: if the connection is not open.
+            TimeoutError: if the command does not finish within *timeout* seconds.
+            CommandCancelled: if *cancel_event* is set before the command finishes.
+        """
+        from datetime import datetime, timezone
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._acquire_channel_slot(timeout, cancel_event)
+        try:
+            if cancel_event is not None and cancel_event.is_set():
+                raise CommandCancelled("command cancelled")
+            started_at = datetime.now(timezone.utc)
+            # The connection lock is not held while the command runs so other
+            # channels (commands, transfers, health checks) proceed in parallel.
+            channel = self._open_exec_channel(command)
+            out_buf = _BoundedBuffer(output_limit, on_stdout)
+            err_buf = _BoundedBuffer(output_limit, on_stderr)
+            try:
+                exit_code = _drain_channel(channel, out_buf, err_buf, deadline, cancel_event)
+            except TimeoutError:
+                raise TimeoutError(
+                    f"Command timed out after {timeout}s on {self.name}: {command}"
+                ) from None
+            finally:
                 try:
-                    stdout.channel.close()
+                    channel.close()
                 except Exception:
                     pass
-                raise TimeoutError(
-                    f"Command timed out after {timeout}s on {self.name}: {command}"
-                )
-
-            if exc_holder[0] is not None:
-                raise exc_holder[0]
 
             ended_at = datetime.now(timezone.utc)
 
             result = CommandResult(
                 command=command,
-                exit_code=exit_code_holder[0],
-                stdout=stdout.read().decode(),
-                stderr=stderr.read().decode(),
+                exit_code=exit_code,
+                stdout=out_buf.getvalue(),
+                stderr=err_buf.getvalue(),
                 started_at=started_at,
-                ended_at=ended_at
+                ended_at=ended_at,
+                stdout_truncated=out_buf.truncated,
+                stderr_truncated=err_buf.truncated,
+                stdout_total_bytes=out_buf.total,
+                stderr_total_bytes=err_buf.total,
             )
-            self._history.append(result)
+            self._history.record(result)
             return result
+        finally:
+            self._channel_slots.release()
+
+    def open_shell_session(self, timeout: int | float | None = 10) -> ShellSession:
+        """Open a persistent `sh` on a dedicated channel and return it as a ShellSession.
+
+        The session holds one channel slot until it is closed.
+
+        Raises:
+            RuntimeError: if the connection is not open.
+            TimeoutError: if no channel slot frees up within *timeout* seconds.
+        """
+        self._acquire_channel_slot(timeout)
+        try:
+            with self._lock:
+                if not self._ssh:
+                    raise RuntimeError("Connection is not open.")
+                channel = self._ssh.get_transport().open_session(timeout=timeout)
+            channel.exec_command("sh")
+        except BaseException:
+            self._channel_slots.release()
+            raise
+        logging.info(f"🐚 Opened shell session on {self.name}")
+        return ShellSession(
+            self.name,
+            channel,
+            on_close=self._channel_slots.release,
+            on_result=self._history.record,
+        )
 
     def upload_file(self, remote_path: str, data_b64: str, mode: str = "0644") -> dict:
         """Upload a base64-encoded file to the remote node via SFTP.
@@ -167,7 +465,6 @@ class BaseConnection:
         """
         import base64
         import binascii
-        import io
         import re
 
         # Validate base64
@@ -180,17 +477,307 @@ class BaseConnection:
         if not re.match(r'^[0-7]{3,4}$', mode):
             return {"error": "invalid_mode", "path": remote_path, "mode": mode}
 
-        with self._lock:
-            if not self._ssh:
-                raise RuntimeError("Connection is not open.")
-            sftp = self._ssh.open_sftp()
+        self.upload_data(remote_path, data, mode)
+        return {"status": "written", "path": remote_path}
+
+    def upload_data(self, remote_path: str, data: bytes, mode: str = "0644") -> dict:
+        """Write already-decoded *data* to *remote_path* and apply *mode*.
+
+        *mode* must already be validated. Returns the remote attributes seen
+        right after the write, in stat_file() form.
+        """
+        import io
+
+        with self._sftp_session() as sftp:
+            # putfo() stats the file to confirm its size; chmod leaves mtime alone.
+            attrs = sftp.putfo(io.BytesIO(data), remote_path)
+            sftp.chmod(remote_path, int(mode, 8))
+        return {"size": attrs.st_size, "mtime": attrs.st_mtime, "mode": int(mode, 8)}
+
+    def upload_data_atomic(
+        self,
+        remote_path: str,
+        data: bytes,
+        mode: str = "0644",
+        timeout: int | float | None = 600,
+    ) -> dict:
+        """Write *data* to a temporary sibling, verify it, then rename it over *remote_path*.
+
+        The sha256 is computed over the chunks as they are written, compared
+        with `sha256sum` of the temporary file on the node, and only a match is
+        renamed into place (atomically, via posix-rename). A dropped connection
+        or failed check leaves *remote_path* untouched. *mode* must already be
+        validated.
+
+        Returns:
+            {"status": "written", "path": remote_path, "sha256": "...", "size": n, "mtime": n, "mode": n}
+            where size/mtime/mode are as in stat_file().
+            {"error": "verification_failed", "path": remote_path, "expected_sha256": "...",
+             "remote_sha256": "..."} if the node's digest differs.
+            {"error": "upload_failed", "path": remote_path, "detail": "..."} if the node cannot
+                hash the file (e.g. no sha256sum).
+
+        Raises:
+            TimeoutError: if the remote digest does not finish within *timeout* seconds.
+        """
+        import hashlib
+        import posixpath
+        import shlex
+        import uuid
+
+        directory, base = posixpath.split(remote_path)
+        tmp_path = posixpath.join(directory, f".{base}.upload-{uuid.uuid4().hex[:8]}")
+        digest = hashlib.sha256()
+        view = memoryview(data)
+        try:
+            with self._sftp_session() as sftp:
+                with sftp.open(tmp_path, "wb") as f:
+                    # Pipelined writes don't wait for each chunk's ack; close() collects them.
+                    f.set_pipelined(True)
+                    for pos in range(0, len(view), _SFTP_WRITE_CHUNK):
+                        chunk = view[pos:pos + _SFTP_WRITE_CHUNK]
+                        digest.update(chunk)
+                        f.write(bytes(chunk))
+                sftp.chmod(tmp_path, int(mode, 8))
+                attrs = sftp.stat(tmp_path)
+
+            expected = digest.hexdigest()
+            check = self.execute(f"sha256sum {shlex.quote(tmp_path)}", timeout=timeout)
+            if check.exit_code != 0:
+                self._remove_quietly(tmp_path)
+                return {"error": "upload_failed", "path": remote_path, "detail": check.stderr.strip()}
+            remote_digest = (check.stdout.split() or [""])[0]
+            if remote_digest != expected:
+                self._remove_quietly(tmp_path)
+                return {
+                    "error": "verification_failed",
+                    "path": remote_path,
+                    "expected_sha256": expected,
+                    "remote_sha256": remote_digest,
+                }
+
+            with self._sftp_session() as sftp:
+                sftp.posix_rename(tmp_path, remote_path)
+        except BaseException:
+            self._remove_quietly(tmp_path)
+            raise
+
+        return {
+            "status": "written",
+            "path": remote_path,
+            "sha256": expected,
+            "size": attrs.st_size,
+            "mtime": attrs.st_mtime,
+            "mode": int(mode, 8),
+        }
+
+    def stat_file(self, remote_path: str) -> Optional[dict]:
+        """Return {"size", "mtime", "mode"} for *remote_path*, or None if it does not exist.
+
+        "mode" holds the permission bits only (e.g. 0o644).
+        """
+        with self._sftp_session() as sftp:
             try:
-                sftp.putfo(io.BytesIO(data), remote_path)
+                attrs = sftp.stat(remote_path)
+            except FileNotFoundError:
+                return None
+        return {"size": attrs.st_size, "mtime": attrs.st_mtime, "mode": attrs.st_mode & 0o7777}
+
+    def sync_file(
+        self,
+        remote_path: str,
+        data: bytes,
+        mode: str = "0644",
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        timeout: int | float | None = 600,
+    ) -> dict:
+        """Bring *remote_path* to *data* by shipping only the blocks that differ.
+
+        The node lists per-block digests of its current copy (see delta.py);
+        changed blocks are written into a copy of the old file in a temporary
+        sibling, which is truncated, chmod'ed, verified against a whole-file
+        digest and renamed over *remote_path*. Readers see either the old or
+        the new file, never a mix. If the file is missing, or the node has
+        no hash tool, the whole content is sent the same way.
+
+        Returns:
+            {"status": "synced" | "unchanged", "path": remote_path, "transfer": "delta" | "full" | "none",
+             "block_size": n, "blocks_total": n, "blocks_sent": n, "bytes_sent": n, "bytes_total": n}
+            {"error": "sync_failed", "path": remote_path, "detail": "..."} if a remote step fails.
+            {"error": "verification_failed", "path": remote_path} if the assembled file's digest differs.
+        """
+        import posixpath
+        import shlex
+        import uuid
+
+        block_size = delta.effective_block_size(block_size, len(data))
+        listing = self.execute(delta.remote_digest_script(remote_path, block_size), timeout=timeout)
+        try:
+            if listing.exit_code != 0:
+                raise ValueError(listing.stderr.strip() or f"exit code {listing.exit_code}")
+            remote = delta.parse_remote_digests(listing.stdout)
+        except ValueError as e:
+            return {"error": "sync_failed", "path": remote_path, "detail": f"block listing failed: {e}"}
+
+        blocks_total = -(-len(data) // block_size)
+        incremental = remote.exists and remote.tool is not None
+        if incremental:
+            runs = delta.changed_runs(delta.local_digests(data, block_size, remote.tool), remote.digests)
+        else:
+            runs = [(0, blocks_total)] if data else []
+        summary = {
+            "path": remote_path,
+            "block_size": block_size,
+            "blocks_total": blocks_total,
+            "blocks_sent": sum(count for _, count in runs),
+            "bytes_total": len(data),
+        }
+
+        if incremental and not runs and remote.size == len(data):
+            with self._sftp_session() as sftp:
                 sftp.chmod(remote_path, int(mode, 8))
-            finally:
-                sftp.close()
+            return {"status": "unchanged", "transfer": "none", "bytes_sent": 0, **summary}
 
-        return {"status": "written", "path": remote_path}
+        directory, base = posixpath.split(remote_path)
+        tmp_path = posixpath.join(directory, f".{base}.sync-{uuid.uuid4().hex[:8]}")
+        if incremental:
+            copied = self.execute(f"cp -- {shlex.quote(remote_path)} {shlex.quote(tmp_path)}", timeout=timeout)
+            if copied.exit_code != 0:
+                return {"error": "sync_failed", "path": remote_path, "detail": copied.stderr.strip()}
+
+        view = memoryview(data)
+        bytes_sent = 0
+        try:
+            with self._sftp_session() as sftp:
+                with sftp.open(tmp_path, "r+b" if incremental else "wb") as f:
+                    for first, count in runs:
+                        start = first * block_size
+                        end = min(start + count * block_size, len(data))
+                        f.seek(start)
+                        for pos in range(start, end, _SFTP_WRITE_CHUNK):
+                            f.write(bytes(view[pos:min(pos + _SFTP_WRITE_CHUNK, end)]))
+                        bytes_sent += end - start
+                sftp.truncate(tmp_path, len(data))
+                sftp.chmod(tmp_path, int(mode, 8))
+
+            if remote.tool is not None:
+                check = self.execute(f"{remote.tool} {shlex.quote(tmp_path)}", timeout=timeout)
+                expected = delta.hasher(remote.tool)(data).hexdigest()
+                if check.exit_code != 0 or check.stdout.split()[:1] != [expected]:
+                    self._remove_quietly(tmp_path)
+                    return {"error": "verification_failed", "path": remote_path}
+
+            with self._sftp_session() as sftp:
+                sftp.posix_rename(tmp_path, remote_path)
+        except BaseException:
+            self._remove_quietly(tmp_path)
+            raise
+
+        return {
+            "status": "synced",
+            "transfer": "delta" if incremental else "full",
+            "bytes_sent": bytes_sent,
+            **summary,
+        }
+
+    def _remove_quietly(self, remote_path: str) -> None:
+        try:
+            with self._sftp_session() as sftp:
+                sftp.remove(remote_path)
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # Streaming remote files (chunked transfers). Handles stay open across
+    # calls; every operation runs under the shared SFTP client's lock.
+    # ------------------------------------------------------------------
+
+    def open_remote_file(self, remote_path: str, mode: str = "wb", pipelined: bool = False):
+        """Open *remote_path* on the shared SFTP client and return the SFTPFile handle.
+
+        With *pipelined*, writes return without waiting for the server's ack;
+        errors surface on a later write or on close.
+        """
+        with self._sftp_session() as sftp:
+            handle = sftp.open(remote_path, mode)
+            if pipelined:
+                handle.set_pipelined(True)
+            return handle
+
+    def reopen_remote_file(self, remote_path: str, offset: int, pipelined: bool = False):
+        """Reopen a partially written *remote_path* to continue writing at *offset*.
+
+        Anything past *offset* (e.g. an unconfirmed write cut off by a
+        connection drop) is truncated away. Returns the SFTPFile handle.
+        """
+        with self._sftp_session() as sftp:
+            handle = sftp.open(remote_path, "r+b")
+            try:
+                handle.truncate(offset)
+                handle.seek(offset)
+            except BaseException:
+                handle.close()
+                raise
+            if pipelined:
+                handle.set_pipelined(True)
+            return handle
+
+    def read_remote_file(self, handle, offset: int, length: int) -> bytes:
+        """Read up to *length* bytes at *offset* through *handle*, pipelined over the prefetch window.
+
+        Raises:
+            IOError: if the handle's SFTP session has been replaced (reconnect) or the read fails.
+        """
+        with self._sftp_session() as sftp:
+            if handle.sftp is not sftp:
+                raise IOError("SFTP session was reset; the remote file handle is no longer valid")
+            return b"".join(handle.readv([(offset, length)], self.sftp_prefetch_window))
+
+    def close_remote_file(self, handle) -> None:
+        """Close a handle opened with open_remote_file(). Best-effort; stale handles are ignored."""
+        try:
+            with self._sftp_session() as sftp:
+                if handle.sftp is sftp:
+                    handle.close()
+        except Exception as e:
+            logging.warning(f"⚠️ Could not close remote file on {self.name}: {e}")
+
+    def rename_remote_file(self, old_path: str, new_path: str) -> None:
+        """Atomically replace *new_path* with *old_path* (posix-rename)."""
+        with self._sftp_session() as sftp:
+            sftp.posix_rename(old_path, new_path)
+
+    def write_remote_file(self, handle, data: bytes) -> None:
+        """Append *data* at the handle's current position.
+
+        Raises:
+            IOError: if the handle's SFTP session has been replaced (reconnect) or the write fails.
+        """
+        with self._sftp_session() as sftp:
+            if handle.sftp is not sftp:
+                raise IOError("SFTP session was reset; the remote file handle is no longer valid")
+            handle.write(data)
+
+    def finish_remote_file(self, handle, remote_path: str, mode: str) -> None:
+        """Flush and close *handle*, then apply the permission *mode* (octal string)."""
+        with self._sftp_session() as sftp:
+            if handle.sftp is not sftp:
+                raise IOError("SFTP session was reset; the remote file handle is no longer valid")
+            handle.close()
+            sftp.chmod(remote_path, int(mode, 8))
+
+    def abort_remote_file(self, handle, remote_path: str) -> None:
+        """Close *handle* (if any) and remove the partially written *remote_path*. Best-effort."""
+        try:
+            with self._sftp_session() as sftp:
+                if handle is not None and handle.sftp is sftp:
+                    try:
+                        handle.close()
+                    except IOError:
+                        pass
+                sftp.remove(remote_path)
+        except Exception as e:
+            logging.warning(f"⚠️ Could not remove partial upload {remote_path} on {self.name}: {e}")
 
     def download_file(self, remote_path: str) -> dict:
         """Download a file from the remote node via SFTP, returning base64-encoded content.
@@ -209,58 +796,361 @@ class BaseConnection:
 
         _LIMIT = 10 * 1024 * 1024  # 10 MB
 
+        with self._sftp_session() as sftp:
+            # Size guard via stat (best-effort — proceed if stat fails)
+            try:
+                st = sftp.stat(remote_path)
+                if st.st_size > _LIMIT:
+                    return {
+                        "error": "file_too_large",
+                        "path": remote_path,
+                        "size_bytes": st.st_size,
+                        "limit_bytes": _LIMIT,
+                    }
+            except IOError:
+                # stat unavailable on this SFTP server or path — proceed best-effort.
+                # v1 policy: if stat fails, skip the size guard rather than blocking the download.
+                # A future version may treat stat failure as a hard error instead.
+                pass
+
+            buf = io.BytesIO()
+            try:
+                # Bounded prefetch: keeps the link busy without queueing every
+                # read request (and its response buffer) of a large file at once.
+                sftp.getfo(
+                    remote_path,
+                    buf,
+                    prefetch=True,
+                    max_concurrent_prefetch_requests=self.sftp_prefetch_window,
+                )
+            except (IOError, FileNotFoundError):
+                return {"error": "file_not_found", "path": remote_path}
+
+        # Encode straight from the buffer's memory instead of copying it out first.
+        data_b64 = base64.b64encode(buf.getbuffer()).decode()
+        return {"status": "ok", "path": remote_path, "data_b64": data_b64}
+
+    def download_file_range(self, remote_path: str, offset: int, length: int) -> dict:
+        """Read up to *length* bytes of a remote file starting at *offset*.
+
+        Only the requested range is held in memory, so files of any size can
+        be read page by page. Reading at or past the end returns no data.
+
+        Returns:
+            {"status": "ok", "path": remote_path, "offset": offset, "length": n,
+             "size_bytes": file_size, "eof": bool, "data_b64": "<b64>"} on success.
+            {"error": "file_not_found", "path": remote_path} on IOError/FileNotFoundError.
+        """
+        import base64
+
+        with self._sftp_session() as sftp:
+            try:
+                size = sftp.stat(remote_path).st_size
+                end = min(offset + length, size)
+                data = b""
+                if end > offset:
+                    with sftp.open(remote_path, "rb") as f:
+                        # readv() pipelines the page as up to prefetch-window
+                        # concurrent 32 KiB requests instead of one per round trip.
+                        data = b"".join(f.readv([(offset, end - offset)], self.sftp_prefetch_window))
+            except (IOError, FileNotFoundError):
+                return {"error": "file_not_found", "path": remote_path}
+
+        return {
+            "status": "ok",
+            "path": remote_path,
+            "offset": offset,
+            "length": len(data),
+            "size_bytes": size,
+            "eof": offset + len(data) >= size,
+            "data_b64": base64.b64encode(data).decode(),
+        }
+
+    def _open_exec_channel(self, command: str):
+        """Start *command* on a new exec channel and return the channel. Caller holds a channel slot.
+
+        The connection lock only guards the client lookup. Opening the channel
+        is bounded by `connect_timeout` (paramiko otherwise waits up to an hour
+        on a half-open transport) and happens outside the lock, so a stuck open
+        cannot queue every other caller or the health check behind it.
+
+        Raises:
+            RuntimeError: if the connection is not open.
+            SSHException: if the channel cannot be opened within connect_timeout.
+        """
         with self._lock:
             if not self._ssh:
                 raise RuntimeError("Connection is not open.")
-            sftp = self._ssh.open_sftp()
+            client = self._ssh
+        logging.info(f"💻 Executing on {self.name}: {command}")
+        _, stdout, _ = client.exec_command(command, timeout=self.connect_timeout)
+        channel = stdout.channel
+        channel.settimeout(None)  # exec_command applies its timeout to reads too; callers bound their own waits
+        return channel
+
+    def upload_tree(
+        self,
+        remote_dir: str,
+        entries,
+        compress: bool = False,
+        timeout: int | float | None = 600,
+    ) -> dict:
+        """Unpack (relative_path, data, mode) *entries* under *remote_dir* via one tar stream.
+
+        The archive is generated on the fly and written straight into the stdin
+        of `tar -x` on the node, so gateway memory stays at one tar record plus
+        the current entry regardless of tree size. Existing files are
+        overwritten; file modes are subject to the remote user's umask unless
+        the user is root.
+
+        Returns:
+            {"status": "written", "path": remote_dir, "files": n, "bytes_total": n, "bytes_sent": n}
+            where bytes_sent counts archive bytes on the wire.
+            {"error": "tree_failed", "path": remote_dir, "exit_code": n, "stderr": "..."} if tar fails.
+
+        Raises:
+            RuntimeError: if the connection is not open.
+            TimeoutError: if the transfer does not finish within *timeout* seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._acquire_channel_slot(timeout)
+        try:
+            channel = self._open_exec_channel(tarstream.extract_command(remote_dir, compress))
+            out_buf = _BoundedBuffer(DEFAULT_OUTPUT_LIMIT)
+            err_buf = _BoundedBuffer(DEFAULT_OUTPUT_LIMIT)
+            writer = tarstream.ChannelWriter(channel, on_stderr=err_buf.feed)
+            count = total = 0
             try:
-                # Size guard via stat (best-effort — proceed if stat fails)
+                channel.settimeout(timeout)
                 try:
-                    st = sftp.stat(remote_path)
-                    if st.st_size > _LIMIT:
-                        return {
-                            "error": "file_too_large",
-                            "path": remote_path,
-                            "size_bytes": st.st_size,
-                            "limit_bytes": _LIMIT,
-                        }
-                except IOError:
-                    # stat unavailable on this SFTP server or path — proceed best-effort.
-                    # v1 policy: if stat fails, skip the size guard rather than blocking the download.
-                    # A future version may treat stat failure as a hard error instead.
+                    count, total = tarstream.write_archive(writer, entries, compress)
+                    channel.shutdown_write()
+                except TimeoutError:
+                    raise
+                except OSError:
+                    # The remote tar exited early; its exit status and stderr say why.
                     pass
+                exit_code = _drain_channel(channel, out_buf, err_buf, deadline)
+            except TimeoutError:
+                raise TimeoutError(f"Tree upload timed out after {timeout}s on {self.name}: {remote_dir}") from None
+            finally:
+                try:
+                    channel.close()
+                except Exception:
+                    pass
+        finally:
+            self._channel_slots.release()
+
+        if exit_code != 0:
+            return {
+                "error": "tree_failed",
+                "path": remote_dir,
+                "exit_code": exit_code,
+                "stderr": err_buf.getvalue().decode("utf-8", "replace"),
+            }
+        return {
+            "status": "written",
+            "path": remote_dir,
+            "files": count,
+            "bytes_total": total,
+            "bytes_sent": writer.bytes_sent,
+        }
+
+    def download_tree(
+        self,
+        remote_dir: str,
+        compress: bool = False,
+        max_bytes: int = DEFAULT_TREE_DOWNLOAD_LIMIT,
+        timeout: int | float | None = 600,
+    ) -> dict:
+        """Read every regular file under *remote_dir* from one `tar -c` stream.
 
-                buf = io.BytesIO()
+        The archive is parsed as it arrives; only the extracted file contents
+        (capped at *max_bytes* in total) are held, never the archive itself.
+
+        Returns:
+            {"status": "ok", "path": remote_dir, "files": [(relative_path, data, mode), ...],
+             "skipped": [relative_path, ...], "bytes_total": n, "bytes_received": n}
+            where "skipped" lists symlinks and other non-regular files and
+            bytes_received counts archive bytes on the wire.
+            {"error": "tree_too_large", "path": remote_dir, "limit_bytes": n} if the cap is exceeded.
+            {"error": "tree_failed", "path": remote_dir, "exit_code": n, "stderr": "..."} if tar fails.
+
+        Raises:
+            RuntimeError: if the connection is not open.
+            TimeoutError: if the transfer does not finish within *timeout* seconds.
+        """
+        import tarfile
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._acquire_channel_slot(timeout)
+        try:
+            channel = self._open_exec_channel(tarstream.create_command(remote_dir, compress))
+            out_buf = _BoundedBuffer(0)
+            err_buf = _BoundedBuffer(DEFAULT_OUTPUT_LIMIT)
+            reader = tarstream.ChannelReader(channel, on_stderr=err_buf.feed)
+            files, skipped, archive_error = [], [], None
+            try:
+                channel.settimeout(timeout)
                 try:
-                    sftp.getfo(remote_path, buf)
-                except (IOError, FileNotFoundError):
-                    return {"error": "file_not_found", "path": remote_path}
+                    files, skipped = tarstream.read_archive(reader, compress, max_bytes)
+                except tarstream.TreeTooLarge:
+                    return {"error": "tree_too_large", "path": remote_dir, "limit_bytes": max_bytes}
+                except TimeoutError:
+                    raise
+                except (tarfile.TarError, EOFError, OSError) as e:
+                    # Usually an empty stream because tar failed; the exit status says why.
+                    archive_error = str(e)
+                # Discard archive padding left after the last member, then collect the exit status.
+                exit_code = _drain_channel(channel, out_buf, err_buf, deadline)
+            except TimeoutError:
+                raise TimeoutError(f"Tree download timed out after {timeout}s on {self.name}: {remote_dir}") from None
             finally:
-                sftp.close()
+                try:
+                    channel.close()
+                except Exception:
+                    pass
+        finally:
+            self._channel_slots.release()
 
-        data_b64 = base64.b64encode(buf.getvalue()).decode()
-        return {"status": "ok", "path": remote_path, "data_b64": data_b64}
+        if exit_code != 0 or archive_error is not None:
+            stderr = err_buf.getvalue().decode("utf-8", "replace")
+            return {
+                "error": "tree_failed",
+                "path": remote_dir,
+                "exit_code": exit_code,
+                "stderr": stderr or archive_error,
+            }
+        return {
+            "status": "ok",
+            "path": remote_dir,
+            "files": files,
+            "skipped": skipped,
+            "bytes_total": sum(len(data) for _, data, _ in files),
+            "bytes_received": reader.bytes_received + out_buf.total,
+        }
 
-    def describe(self):
+    def describe(self, history_offset: int = 0, history_limit: int = DEFAULT_PAGE_SIZE):
+        """Return connection metadata plus one page of command history (newest first)."""
         return {
             "name": self.name,
             "state": self.state.value,
             "metadata": self.metadata,
-            "history": [r.to_dict() for r in self._history]
+            "history": self._history.page(history_offset, history_limit),
         }
 
     def get_state(self):
         return self.state
 
+    def check_transport(self, blocking: bool = True) -> bool:
+        """Mark the connection BROKEN now if its transport has died. Returns True if it is usable.
+
+        The periodic health check does the same every few seconds; transfers
+        call this right after a failure so a reconnect does not have to wait
+        for the next check. With blocking=False the check is skipped (and the
+        current state reported) while another thread holds the connection lock,
+        so a slow open/close cannot stall a shared scheduler worker.
+        """
+        if not self._lock.acquire(blocking=blocking):
+            return self.state == ConnectionState.OPEN
+        try:
+            if self._ssh:
+                transport = self._ssh.get_transport()
+                if transport and not transport.is_active():
+                    logging.warning(f"❌ Health check failed: {self.name} appears broken.")
+                    self.state = ConnectionState.BROKEN
+            return self.state == ConnectionState.OPEN
+        finally:
+            self._lock.release()
+
+    def _health_check_tick(self):
+        # check_transport(blocking=False) reports the current state if the lock
+        # is busy; the keepalive itself never waits for the lock.
+        if self.check_transport(blocking=False) and self.health_check == "active":
+            self.send_keepalive()
+
+    def send_keepalive(self) -> bool:
+        """Send one keepalive global request and time its reply. Returns True if it was sent.
+
+        The request asks for a reply (any reply, success or failure, proves the
+        session is alive). paramiko's public global_request() only waits for a
+        reply in blocking mode and without a deadline, so the round trip runs
+        on a keepalive worker thread; a check scheduled `keepalive_timeout`
+        seconds later marks the connection BROKEN and closes the client if it
+        has not returned, which catches half-open sessions that
+        transport.is_active() still reports as alive (and ends the wait).
+
+        No probe is sent while a key exchange is in progress: sending would
+        block until it finishes, and the end of the exchange would look like
+        the reply.
+        """
+        # No connection lock: paramiko's transport is thread-safe for sending
+        # global requests, and a caller holding the lock (e.g. stuck on the very
+        # half-open session this probe is meant to detect) must not suppress it.
+        client, generation = self._ssh, self.generation
+        if self.state != ConnectionState.OPEN or not client:
+            return False
+        try:
+            transport = client.get_transport()
+            if transport is None or not transport.is_active() or transport.in_kex:
+                return False
+            reply = _keepalive_executor().submit(self._keepalive_round_trip, transport)
+        except Exception as e:
+            logging.warning(f"⚠️ Could not send keepalive to {self.name}: {e}")
+            return False
+        default_scheduler().call_later(
+            self.keepalive_timeout, lambda: self._check_keepalive(reply, generation), name=f"keepalive-{self.name}"
+        )
+        return True
+
+    def _keepalive_round_trip(self, transport) -> None:
+        # global_request() also returns when the transport dies or a key
+        # exchange completes; neither is a reply, so neither is timed. Each
+        # exchange sets a new exchange hash (transport.H).
+        exchange_hash = transport.H
+        sent_at = time.monotonic()
+        transport.global_request(KEEPALIVE_REQUEST, wait=True)
+        if transport.is_active() and transport.H == exchange_hash:
+            self.rtt.record(time.monotonic() - sent_at)
+
+    def _check_keepalive(self, reply: Future, generation: int, missed: bool = False) -> None:
+        if reply.done():
+            return
+        if not missed:
+            self.rtt.record_miss()
+        # Runs on a shared scheduler worker: never wait long for the lock.
+        if not self._lock.acquire(timeout=_CALLBACK_LOCK_TIMEOUT):
+            default_scheduler().call_later(
+                _CALLBACK_RETRY_DELAY,
+                lambda: self._check_keepalive(reply, generation, missed=True),
+                name=f"keepalive-{self.name}",
+            )
+            return
+        try:
+            if self.generation != generation or self.state != ConnectionState.OPEN:
+                return  # reconnected or closed in the meantime
+            logging.warning(
+                f"❌ Health check failed: {self.name} did not answer a keepalive within {self.keepalive_timeout}s."
+            )
+            self.state = ConnectionState.BROKEN
+            client, self._ssh = self._ssh, None
+        finally:
+            self._lock.release()
+        if client:
+            client.close()
+        # _sftp_lock is taken before _lock elsewhere, so only after releasing it.
+        # A transfer still holding it fails on the closed transport and
+        # discards the client itself.
+        if self._sftp_lock.acquire(timeout=_CALLBACK_LOCK_TIMEOUT):
+            try:
+                self._discard_sftp()
+            finally:
+                self._sftp_lock.release()
+
     def _start_health_check(self):
-        def check():
-            with self._lock:
-                if self._ssh:
-                    transport = self._ssh.get_transport()
-                    if transport and not transport.is_active():
-                        logging.warning(f"❌ Health check failed: {self.name} appears broken.")
-                        self.state = ConnectionState.BROKEN
-        self._health_timer = OneShotRepeatingTimer(10, check)
+        if self._health_timer:
+            self._health_timer.cancel()  # left over from before a reconnect
+        self._health_timer = OneShotRepeatingTimer(10, self._health_check_tick)
         self._health_timer.start()
 
 
@@ -272,6 +1162,11 @@ class DirectConnection(BaseConnection):
         with self._lock:
             logging.info(f"🔌 Opening direct connection: {self.name}")
             self.state = ConnectionState.OPENING
+            if self._ssh:
+                # Replacing a client must not leak its transport and channels.
+                self._discard_sftp()
+                self._ssh.close()
+                self._ssh = None
             try:
                 self._ssh = SSHClient()
                 self._ssh.set_missing_host_key_policy(AutoAddPolicy())
@@ -279,9 +1174,13 @@ class DirectConnection(BaseConnection):
                     hostname=self.host,
                     port=self.port,
                     username=self.user,
-                    key_filename=self.id_file
+                    key_filename=self.id_file,
+                    timeout=self.connect_timeout,
+                    banner_timeout=self.connect_timeout,
+                    auth_timeout=self.connect_timeout,
                 )
                 self.state = ConnectionState.OPEN
+                self.generation += 1
                 self._start_health_check()
             except Exception as e:
                 logging.error(f"❌ Failed to open direct connection {self.name}: {e}")
@@ -305,49 +1204,109 @@ class TunnelConnection(BaseConnection):
     Reverse connection using a local tunnel port.
     Periodically probes until tunnel becomes active.
     """
+    _probe_timer: Optional[OneShotRepeatingTimer] = None
+    _connecting = False
+
     def open(self):
-        import socket
         with self._lock:
             logging.info(f"🔄 Waiting for tunnel connection: {self.name}")
             self.state = ConnectionState.OPENING
             self._start_probe_timer()
 
     def _start_probe_timer(self):
-        def probe():
-            import socket
-            with self._lock:
-                if self.state != ConnectionState.OPENING:
-                    return
-                try:
-                    sock = socket.create_connection(("127.0.0.1", self.port), timeout=2)
-                    sock.close()
-                    logging.info(f"📡 Tunnel for {self.name} is active. Connecting...")
-
-                    self._ssh = SSHClient()
-                    self._ssh.set_missing_host_key_policy(AutoAddPolicy())
-                    self._ssh.connect(
-                        hostname="127.0.0.1",
-                        port=self.port,
-                        username=self.user,
-                        key_filename=self.id_file
-                    )
-                    self.state = ConnectionState.OPEN
-                    self._start_health_check()
-                except Exception:
-                    logging.info(f"⏳ Still waiting for tunnel {self.name}...")
-                    if self._probe_timer:
-                        self._probe_timer.start()
-
-        self._probe_timer: Optional[OneShotRepeatingTimer] = OneShotRepeatingTimer(5, probe)
+        if self._probe_timer:
+            self._probe_timer.cancel()
+        self._probe_timer = OneShotRepeatingTimer(5, self._probe)
         self._probe_timer.start()
 
+    def _probe(self):
+        # Runs on a shared scheduler worker: it only hands the port check and
+        # SSH connect to the tunnel-connect executor, never blocking on them.
+        if not self._lock.acquire(timeout=_CALLBACK_LOCK_TIMEOUT):
+            return  # busy (opening or closing); the timer probes again in 5 seconds
+        try:
+            if self.state != ConnectionState.OPENING or self._connecting:
+                return
+            self._connecting = True
+        finally:
+            self._lock.release()
+        try:
+            _tunnel_connect_executor().submit(self._connect_tunnel)
+        except RuntimeError:
+            self._connecting = False  # interpreter shutting down
+
+    def _connect_tunnel(self):
+        client = None
+        try:
+            sock = socket.create_connection(("127.0.0.1", self.port), timeout=2)
+            sock.close()
+            logging.info(f"📡 Tunnel for {self.name} is active. Connecting...")
+            client = SSHClient()
+            client.set_missing_host_key_policy(AutoAddPolicy())
+            client.connect(
+                hostname="127.0.0.1",
+                port=self.port,
+                username=self.user,
+                key_filename=self.id_file,
+                timeout=self.connect_timeout,
+                banner_timeout=self.connect_timeout,
+                auth_timeout=self.connect_timeout,
+            )
+        except Exception:
+            # The scheduler runs the probe again in 5 seconds.
+            logging.info(f"⏳ Still waiting for tunnel {self.name}...")
+            if client:
+                client.close()
+            self._connecting = False
+            return
+        with self._lock:
+            self._connecting = False
+            if self.state != ConnectionState.OPENING:
+                client.close()  # closed while connecting
+                return
+            self._ssh = client
+            self.state = ConnectionState.OPEN
+            self.generation += 1
+            self._start_health_check()
+            # Connected: the health check takes over from the probe.
+            if self._probe_timer:
+                self._probe_timer.cancel()
+
     def close(self):
         super().close()
-        if hasattr(self, "_probe_timer") and self._probe_timer:
+        if self._probe_timer:
             self._probe_timer.cancel()
             self._probe_timer = None
 
 
+_tunnel_connect_pool: Optional[ThreadPoolExecutor] = None
+_tunnel_connect_lock = threading.Lock()
+
+
+def _tunnel_connect_executor() -> ThreadPoolExecutor:
+    """Process-wide executor for tunnel SSH connects, kept off the timer workers."""
+    global _tunnel_connect_pool
+    with _tunnel_connect_lock:
+        if _tunnel_connect_pool is None:
+            _tunnel_connect_pool = ThreadPoolExecutor(
+                max_workers=_TUNNEL_CONNECT_WORKERS, thread_name_prefix="tunnel-connect"
+            )
+        return _tunnel_connect_pool
+
+
+_keepalive_pool: Optional[ThreadPoolExecutor] = None
+_keepalive_lock = threading.Lock()
+
+
+def _keepalive_executor() -> ThreadPoolExecutor:
+    """Process-wide executor for keepalive round trips, kept off the timer workers."""
+    global _keepalive_pool
+    with _keepalive_lock:
+        if _keepalive_pool is None:
+            _keepalive_pool = ThreadPoolExecutor(max_workers=_KEEPALIVE_WORKERS, thread_name_prefix="keepalive")
+        return _keepalive_pool
+
+
 class Connection:
     """
     Connection wrapper used by the pool. Chooses the correct implementation.
@@ -0,0 +1,110 @@
+"""Block-checksum helpers for delta file synchronisation.
+
+Local boundary notes:
+- The node hashes its copy of a file block by block with standard tools
+  (`dd` plus `sha256sum`, falling back to `md5sum`); the gateway hashes the
+  new content the same way and ships only blocks whose digests differ.
+- Only the script text and output parsing live here; transport and file
+  assembly are `BaseConnection.sync_file()`'s concern.
+"""
+
+import hashlib
+import shlex
+from typing import Optional
+
+DEFAULT_BLOCK_SIZE = 128 * 1024
+MIN_BLOCK_SIZE = 4 * 1024
+MAX_BLOCK_SIZE = 16 * 1024 * 1024
+# Upper bound on blocks per file; larger files use proportionally larger blocks
+# so the remote digest listing (one line per block) stays small.
+MAX_BLOCKS = 8192
+
+_HASH_TOOLS = {"sha256sum": hashlib.sha256, "md5sum": hashlib.md5}
+
+
+class RemoteDigests:
+    """Parsed output of the remote block digest script."""
+
+    __slots__ = ("exists", "tool", "size", "digests")
+
+    def __init__(self, exists: bool, tool: Optional[str], size: int = 0, digests: Optional[list[str]] = None):
+        self.exists = exists
+        self.tool = tool  # "sha256sum" | "md5sum" | None (no usable hash tool)
+        self.size = size
+        self.digests = digests or []
+
+
+def effective_block_size(requested: int, total_bytes: int) -> int:
+    """Return *requested*, grown if needed so *total_bytes* spans at most MAX_BLOCKS blocks."""
+    needed = -(-total_bytes // MAX_BLOCKS)
+    return min(max(requested, needed), MAX_BLOCK_SIZE)
+
+
+def remote_digest_script(remote_path: str, block_size: int) -> str:
+    """Shell script describing *remote_path* for delta sync.
+
+    Output: `tool <sha256sum|md5sum|none>`, then `missing` if the file does not
+    exist; otherwise (when a tool is available) `size <n>` followed by one
+    `<digest>  -` line per block.
+    """
+    path = shlex.quote(remote_path)
+    return (
+        f"f={path}; bs={block_size}\n"
+        "if command -v sha256sum >/dev/null 2>&1; then h=sha256sum\n"
+        "elif command -v md5sum >/dev/null 2>&1; then h=md5sum\n"
+        "else h=; fi\n"
+        'echo "tool ${h:-none}"\n'
+        '[ -f "$f" ] || { echo missing; exit 0; }\n'
+        '[ -n "$h" ] || exit 0\n'
+        'size=$(wc -c < "$f"); size=$((size + 0)); echo "size $size"\n'
+        "n=$(( (size + bs - 1) / bs )); i=0\n"
+        'while [ "$i" -lt "$n" ]; do dd if="$f" bs="$bs" skip="$i" count=1 2>/dev/null | "$h"; i=$((i + 1)); done\n'
+    )
+
+
+def parse_remote_digests(stdout: str) -> RemoteDigests:
+    """Parse remote_digest_script() output.
+
+    Raises:
+        ValueError: if the output is not in the expected shape.
+    """
+    lines = stdout.splitlines()
+    if not lines or not lines[0].startswith("tool "):
+        raise ValueError(f"unexpected digest listing header: {lines[:1]!r}")
+    tool = lines[0].split(" ", 1)[1]
+    tool = None if tool == "none" else tool
+    if tool is not None and tool not in _HASH_TOOLS:
+        raise ValueError(f"unknown hash tool {tool!r}")
+    if len(lines) > 1 and lines[1] == "missing":
+        return RemoteDigests(exists=False, tool=tool)
+    if tool is None:
+        return RemoteDigests(exists=True, tool=None)
+    if len(lines) < 2 or not lines[1].startswith("size "):
+        raise ValueError(f"missing size line: {lines[:2]!r}")
+    size = int(lines[1].split(" ", 1)[1])
+    digests = [line.split()[0] for line in lines[2:] if line.strip()]
+    return RemoteDigests(exists=True, tool=tool, size=size, digests=digests)
+
+
+def hasher(tool: str):
+    """Return the hashlib constructor matching a remote hash *tool*."""
+    return _HASH_TOOLS[tool]
+
+
+def local_digests(data, block_size: int, tool: str) -> list[str]:
+    new = hasher(tool)
+    view = memoryview(data)
+    return [new(view[i:i + block_size]).hexdigest() for i in range(0, len(view), block_size)]
+
+
+def changed_runs(local: list[str], remote: list[str]) -> list[tuple[int, int]]:
+    """Return (first_block, block_count) runs of local blocks that differ from *remote*."""
+    runs: list[tuple[int, int]] = []
+    for i, digest in enumerate(local):
+        if i < len(remote) and remote[i] == digest:
+            continue
+        if runs and runs[-1][0] + runs[-1][1] == i:
+            runs[-1] = (runs[-1][0], runs[-1][1] + 1)
+        else:
+            runs.append((i, 1))
+    return runs
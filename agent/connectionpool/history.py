@@ -0,0 +1,182 @@
+"""Bounded per-connection command history.
+
+Local boundary notes:
+- `CommandHistory` keeps the most recent commands in a fixed-capacity ring;
+  older records are evicted, so memory use does not grow with uptime.
+- Records keep only a preview of stdout/stderr. When a spill directory is
+  configured, the full output is written to disk and the record points at it;
+  spill files are deleted when their record is evicted.
+- Reads are paginated so callers such as `BaseConnection.describe()` cost
+  O(page), not O(lifetime).
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from itertools import islice
+from typing import Optional
+
+from agent.connection_result import CommandResult
+
+DEFAULT_HISTORY_CAPACITY = 200
+DEFAULT_PREVIEW_CHARS = 4096
+DEFAULT_PAGE_SIZE = 20
+
+
+def _preview(data: bytes, chars: int) -> tuple[str, bool]:
+    """Decode at most *chars* characters of *data*; also report whether any were cut.
+
+    Only the leading bytes that can contribute to the preview are decoded
+    (UTF-8 uses at most 4 bytes per character).
+    """
+    head = data[:chars * 4]
+    text = head.decode("utf-8", errors="replace")
+    return text[:chars], len(text) > chars or len(head) < len(data)
+
+
+class HistoryRecord:
+    """Compact, immutable-by-convention summary of one executed command."""
+
+    __slots__ = (
+        "seq",
+        "command",
+        "exit_code",
+        "started_at",
+        "ended_at",
+        "stdout",
+        "stderr",
+        "stdout_truncated",
+        "stderr_truncated",
+        "stdout_total_bytes",
+        "stderr_total_bytes",
+        "spill_path",
+    )
+
+    def __init__(self, seq: int, result: CommandResult, preview_chars: int, spill_path: Optional[str] = None):
+        self.seq = seq
+        self.command = result.command
+        self.exit_code = result.exit_code
+        self.started_at = result.started_at
+        self.ended_at = result.ended_at
+        self.stdout, stdout_cut = _preview(result.stdout_bytes, preview_chars)
+        self.stderr, stderr_cut = _preview(result.stderr_bytes, preview_chars)
+        self.stdout_truncated = result.stdout_truncated or stdout_cut
+        self.stderr_truncated = result.stderr_truncated or stderr_cut
+        self.stdout_total_bytes = result.stdout_total_bytes
+        self.stderr_total_bytes = result.stderr_total_bytes
+        self.spill_path = spill_path
+
+    def to_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "command": self.command,
+            "exit_code": self.exit_code,
+            "stdout": self.stdout,
+            "stderr": self.stderr,
+            "started_at": self.started_at.isoformat(),
+            "ended_at": self.ended_at.isoformat(),
+            "stdout_truncated": self.stdout_truncated,
+            "stderr_truncated": self.stderr_truncated,
+            "stdout_total_bytes": self.stdout_total_bytes,
+            "stderr_total_bytes": self.stderr_total_bytes,
+            "spill_path": self.spill_path,
+        }
+
+
+class CommandHistory:
+    """Fixed-capacity ring buffer of HistoryRecord objects. Thread-safe."""
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_HISTORY_CAPACITY,
+        preview_chars: int = DEFAULT_PREVIEW_CHARS,
+        spill_dir: Optional[str] = None,
+    ):
+        """
+        :param capacity: Maximum number of records retained; the oldest is evicted first.
+        :param preview_chars: Characters of stdout/stderr kept in memory per record.
+        :param spill_dir: Optional directory (one per history) for the full output
+            of records whose output exceeds the preview. None disables spilling.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.preview_chars = preview_chars
+        self.spill_dir = spill_dir
+        self._records: deque[HistoryRecord] = deque()
+        self._next_seq = 1
+        self._lock = threading.Lock()
+
+    def record(self, result: CommandResult) -> HistoryRecord:
+        """Append a summary of *result*, evicting the oldest record when full."""
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            spill_path = self._spill(seq, result)
+            rec = HistoryRecord(seq, result, self.preview_chars, spill_path)
+            if len(self._records) >= self.capacity:
+                self._discard(self._records.popleft())
+            self._records.append(rec)
+            return rec
+
+    def page(self, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """Return one page of records, newest first.
+
+        Returns:
+            {"total_recorded": n, "retained": m, "offset": o, "records": [...],
+             "next_offset": o + len(records) or None when no older records remain}
+        """
+        offset = max(offset, 0)
+        limit = max(limit, 0)
+        with self._lock:
+            retained = len(self._records)
+            total = self._next_seq - 1
+            page = list(islice(reversed(self._records), offset, offset + limit))
+        next_offset = offset + len(page)
+        return {
+            "total_recorded": total,
+            "retained": retained,
+            "offset": offset,
+            "records": [r.to_dict() for r in page],
+            "next_offset": next_offset if next_offset < retained else None,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            while self._records:
+                self._discard(self._records.popleft())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    # ------------------------------------------------------------------
+    # Spill handling (called with self._lock held)
+    # ------------------------------------------------------------------
+
+    def _spill(self, seq: int, result: CommandResult) -> Optional[str]:
+        if not self.spill_dir:
+            return None
+        # A byte count within the preview guarantees the character count is too.
+        if len(result.stdout_bytes) <= self.preview_chars and len(result.stderr_bytes) <= self.preview_chars:
+            return None
+        path = os.path.join(self.spill_dir, f"{seq:08d}.log")
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"=== stdout ===\n")
+                f.write(result.stdout_bytes)
+                f.write(b"\n=== stderr ===\n")
+                f.write(result.stderr_bytes)
+        except OSError as e:
+            logging.warning(f"⚠️ Failed to spill command output to {path}: {e}")
+            return None
+        return path
+
+    def _discard(self, rec: HistoryRecord) -> None:
+        if rec.spill_path:
+            try:
+                os.remove(rec.spill_path)
+            except OSError:
+                pass
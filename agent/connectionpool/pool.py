@@ -5,33 +5,71 @@ Local boundary notes:
   refresh for each configured connection.
 - Callers should treat `Connection` as the public integration surface; pool logic
   does not expose transport-specific internals.
+- Connections are indexed by name, so per-name lookups are O(1) and
+  `snapshot_states()` reads every state in one locked pass.
+- `start()` opens connections through a bounded worker pool; each open is
+  bounded by the connection's `connect_timeout`, and start() itself returns
+  after `start_timeout` even if some opens are still in flight.
+- The monitor ticks every `reconnection_delay` seconds on the shared
+  TimerScheduler (`scheduler.py`) and hands down connections to a bounded
+  reconnect worker pool. Each connection backs off exponentially (with
+  jitter) while it keeps failing; see `reconnect.py`.
 """
 
 import logging
 import threading
 import time
 import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from typing import Optional
 from .connection import Connection
 from .connection import ConnectionState
+from .reconnect import ReconnectBackoff, DEFAULT_MAX_BACKOFF
+from .scheduler import ScheduledTask, default_scheduler
+
+# Connections opened concurrently by start().
+DEFAULT_START_PARALLEL = 32
+# Seconds start() waits for initial opens before handing stragglers to the monitor.
+DEFAULT_START_TIMEOUT = 60.0
+# Reconnect attempts the monitor runs concurrently.
+DEFAULT_RECONNECT_PARALLEL = 8
+
 
 class ConnectionPool:
-    def __init__(self, connection_configs, reconnection_delay: float = 5):
+    def __init__(
+        self,
+        connection_configs,
+        reconnection_delay: float = 5,
+        start_parallel: int = DEFAULT_START_PARALLEL,
+        start_timeout: float = DEFAULT_START_TIMEOUT,
+        reconnect_parallel: int = DEFAULT_RECONNECT_PARALLEL,
+        max_reconnect_backoff: float = DEFAULT_MAX_BACKOFF,
+    ):
         """
         Initialize the connection pool.
 
         :param connection_configs: List of connection configurations.
-        :param reconnection_delay: Delay in seconds between reconnection attempts (default: 5 seconds). Accepts float for sub-second values.
+        :param reconnection_delay: Monitor tick in seconds, and the first reconnect backoff delay (default: 5 seconds). Accepts float for sub-second values.
+        :param start_parallel: Maximum number of connections opened concurrently by start().
+        :param start_timeout: Seconds start() waits for initial opens before returning.
+        :param reconnect_parallel: Maximum number of reconnect attempts running at once.
+        :param max_reconnect_backoff: Upper bound in seconds on a failing connection's retry delay.
 
         Current assumption: configs are static for process lifetime.
         """
         self.reconnection_delay = reconnection_delay
-        self.connections = []
+        self.start_parallel = max(1, start_parallel)
+        self.start_timeout = start_timeout
+        self.reconnect_parallel = max(1, reconnect_parallel)
+        self._backoff = ReconnectBackoff(reconnection_delay, max_reconnect_backoff)
+        self._reconnecting: set[str] = set()  # names with a reconnect worker in flight
+        self._reconnect_pool: Optional[ThreadPoolExecutor] = None
+        self._connections: dict[str, Connection] = {}  # name -> Connection, in insertion order
         self.os_info_cache = {}
         self.lock = threading.Lock()  # For thread-safe access to os_info_cache and connections
         self._monitor_lock = threading.Lock()  # To ensure one monitor loop at a time
         self._stopping = threading.Event()  # To signal stop
-        self._timer = None
+        self._timer: Optional[ScheduledTask] = None
         self._started = False
         self._disabled_names: set[str] = set()  # Names of connections skipped by the monitor
 
@@ -39,91 +77,207 @@ class ConnectionPool:
             # Accept both legacy dict configs and validated config objects.
             # Loader paths now produce ConnectionConfig dataclass instances.
             if isinstance(config, dict):
+                name = config["name"]
                 connection = Connection(**config)
             else:
+                name = config.name
                 connection = Connection(config)
-            self.connections.append(connection)
+            self._connections[name] = connection
 
-    def gather_os_info(self, connection):
-        """Gather OS info for a specific connection."""
+    @property
+    def connections(self) -> list[Connection]:
+        """Snapshot list of the pooled connections, in insertion order."""
         with self.lock:
-            try:
-                result = subprocess.run(
-                    ["scripts/os_info.sh"],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    check=True
-                )
-                if result.stdout:
-                    self.os_info_cache[connection.name] = result.stdout.strip()
-                else:
-                    logging.error(f"❌ No output received for OS info on {connection.name}.")
-            except subprocess.CalledProcessError as e:
-                logging.error(f"❌ Failed to gather OS info for {connection.name}: {e}", exc_info=True)
+            return list(self._connections.values())
+
+    def gather_os_info(self, connection):
+        """Gather OS info for a specific connection.
 
-    def start(self):
+        The script runs outside the pool lock so parallel opens in start() do
+        not queue behind each other; only the cache update is locked.
+        """
+        try:
+            result = subprocess.run(
+                ["scripts/os_info.sh"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                check=True
+            )
+        except subprocess.CalledProcessError as e:
+            logging.error(f"❌ Failed to gather OS info for {connection.name}: {e}", exc_info=True)
+            return
+        if result.stdout:
+            with self.lock:
+                self.os_info_cache[connection.name] = result.stdout.strip()
+        else:
+            logging.error(f"❌ No output received for OS info on {connection.name}.")
+
+    def start(self) -> Optional[dict]:
+        """Open every connection through a bounded worker pool and start the monitor.
+
+        Returns a startup report:
+            {"elapsed_seconds": s, "open": n, "failed": n, "pending": n,
+             "nodes": [{"name", "state", "elapsed_seconds"[, "detail"]}, ...]}
+        "state" is the connection state once its open attempt finished, or
+        "pending" if it had not finished when start_timeout expired. Opens
+        already running then finish in the background; opens still queued are
+        cancelled and left to the monitor, which reconnects them.
+        Returns None if the pool was already started.
+        """
         if self._started:
             logging.warning("⚠️ Connection pool already started.")
-            return
+            return None
         self._started = True
-        logging.info("🚀 Starting the connection pool...")
-
-        for connection in self.connections:
-            try:
-                connection.open()
-                self.gather_os_info(connection)
-            except Exception as e:
-                logging.error(
-                    f"❌ Failed to open connection {connection.name} during startup: {e}",
-                    exc_info=True,
-                )
-
+        connections = self.connections
+        logging.info(
+            f"🚀 Starting the connection pool ({len(connections)} connection(s), "
+            f"up to {self.start_parallel} in parallel)..."
+        )
+
+        started = time.monotonic()
+        report = {"elapsed_seconds": 0.0, "open": 0, "failed": 0, "pending": 0, "nodes": []}
+        if connections:
+            executor = ThreadPoolExecutor(
+                max_workers=min(self.start_parallel, len(connections)),
+                thread_name_prefix="pool-start",
+            )
+            futures = [executor.submit(self._open_for_start, connection) for connection in connections]
+            done, _ = wait(futures, timeout=self.start_timeout)
+            # Do not block on stragglers: running opens are bounded by connect_timeout,
+            # queued ones are dropped and the monitor opens them on its next pass.
+            executor.shutdown(wait=False, cancel_futures=True)
+            for connection, future in zip(connections, futures):
+                if future in done:
+                    entry = future.result()
+                else:
+                    entry = {"name": connection.name, "state": "pending", "elapsed_seconds": None}
+                    logging.warning(f"⚠️ Connection {connection.name} still opening after {self.start_timeout}s")
+                report["nodes"].append(entry)
+                # Tunnel connections report "opening" until their tunnel comes up.
+                key = {"open": "open", "opening": "pending", "pending": "pending"}.get(entry["state"], "failed")
+                report[key] += 1
+
+        report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        logging.info(
+            f"✅ Pool start finished in {report['elapsed_seconds']}s: {report['open']} open, "
+            f"{report['failed']} failed, {report['pending']} pending"
+        )
         self._schedule_monitor()
+        return report
+
+    def _open_for_start(self, connection) -> dict:
+        """Open one connection for start(); never raises. Returns its report entry."""
+        started = time.monotonic()
+        entry = {"name": connection.name}
+        try:
+            connection.open()
+            self.gather_os_info(connection)
+        except Exception as e:
+            logging.error(
+                f"❌ Failed to open connection {connection.name} during startup: {e}",
+                exc_info=True,
+            )
+            entry["detail"] = str(e)
+        entry["state"] = connection.get_state().value
+        entry["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        logging.info(f"🔌 {connection.name}: {entry['state']} after {entry['elapsed_seconds']}s")
+        return entry
 
     def _schedule_monitor(self):
         if not self._stopping.is_set():
-            self._timer = threading.Timer(self.reconnection_delay, self._monitor_once)
-            self._timer.start()
+            self._timer = default_scheduler().call_later(
+                self.reconnection_delay, self._monitor_once, name="pool-monitor"
+            )
+
+    def _monitor_once(self) -> list[Future]:
+        """One monitor tick: hand every due, down, enabled connection to a reconnect worker.
 
-    def _monitor_once(self):
+        The tick itself never opens a connection, so a slow or dead host
+        cannot delay the others. Connections still in backoff, already being
+        reconnected, or OPENING (a tunnel waiting for its port) are skipped.
+        Returns the futures of the reconnects started by this tick.
+        """
+        submitted: list[Future] = []
         with self._monitor_lock:
             if self._stopping.is_set():
-                return
+                return submitted
 
             with self.lock:
-                connections_snapshot = list(self.connections)
+                connections_snapshot = list(self._connections.values())
                 disabled_snapshot = set(self._disabled_names)
 
             if not connections_snapshot:
                 logging.info("🔍 No connections in the pool.")
             else:
-                closed_found = False
+                now = time.monotonic()
+                down = backing_off = 0
                 for connection in connections_snapshot:
                     if connection.name in disabled_snapshot:
                         continue  # disabled — do not reconnect
-                    if connection.get_state() != ConnectionState.OPEN:
-                        closed_found = True
-                        logging.warning(f"⚠️ Connection {connection.name} is down. Attempting to reconnect...")
-                        # Re-check under lock before reconnecting (race: disable_node may have fired)
-                        with self.lock:
-                            if connection.name in self._disabled_names:
-                                continue
-                        try:
-                            connection.open()
-                            self.gather_os_info(connection)
-                        except Exception as e:
-                            logging.error(
-                                f"❌ Reconnect failed for {connection.name}: {e}",
-                                exc_info=True,
-                            )
-
-                if closed_found:
-                    logging.info("🔁 One or more connections were re-opened.")
+                    state = connection.get_state()
+                    if state == ConnectionState.OPEN:
+                        self._backoff.succeeded(connection.name)
+                        continue
+                    down += 1
+                    if state == ConnectionState.OPENING or not self._backoff.is_due(connection.name, now):
+                        backing_off += 1
+                        continue
+                    with self.lock:
+                        if connection.name in self._reconnecting:
+                            continue
+                        self._reconnecting.add(connection.name)
+                    logging.warning(f"⚠️ Connection {connection.name} is down. Attempting to reconnect...")
+                    submitted.append(self._reconnect_executor().submit(self._reconnect, connection))
+
+                if down:
+                    logging.info(
+                        f"🔁 {down} connection(s) down: {len(submitted)} reconnect(s) started, "
+                        f"{backing_off} backing off."
+                    )
                 else:
                     logging.info("✅ All connections are currently open.")
 
         self._schedule_monitor()
+        return submitted
+
+    def _reconnect_executor(self) -> ThreadPoolExecutor:
+        if self._reconnect_pool is None:
+            self._reconnect_pool = ThreadPoolExecutor(
+                max_workers=self.reconnect_parallel,
+                thread_name_prefix="pool-reconnect",
+            )
+        return self._reconnect_pool
+
+    def _reconnect(self, connection) -> None:
+        """Reconnect worker: one open attempt, then update the connection's backoff."""
+        name = connection.name
+        try:
+            # Re-check under lock before reconnecting (race: disable_node may have fired,
+            # or ensure_connection_open() reopened the node while this task was queued)
+            with self.lock:
+                if name in self._disabled_names or self._stopping.is_set():
+                    return
+                if connection.get_state() in (ConnectionState.OPEN, ConnectionState.OPENING):
+                    self._backoff.succeeded(name)
+                    return
+            try:
+                connection.open()
+                self.gather_os_info(connection)
+            except Exception as e:
+                logging.error(f"❌ Reconnect failed for {name}: {e}", exc_info=True)
+            if connection.get_state() == ConnectionState.OPEN:
+                self._backoff.succeeded(name)
+                logging.info(f"🔁 Connection {name} re-opened.")
+            else:
+                delay = self._backoff.failed(name, time.monotonic())
+                logging.info(
+                    f"⏳ Next reconnect for {name} in {delay:.1f}s "
+                    f"({self._backoff.failures(name)} consecutive failure(s))."
+                )
+        finally:
+            with self.lock:
+                self._reconnecting.discard(name)
 
     def stop(self):
         if not self._started:
@@ -140,6 +294,11 @@ class ConnectionPool:
         with self._monitor_lock:
             pass  # Wait for any running monitor to complete
 
+        if self._reconnect_pool is not None:
+            # Running attempts are bounded by connect_timeout; queued ones are dropped.
+            self._reconnect_pool.shutdown(wait=True, cancel_futures=True)
+            self._reconnect_pool = None
+
         for connection in self.connections:
             connection.close()
 
@@ -148,7 +307,7 @@ class ConnectionPool:
     def query_pool(self):
         with self.lock:
             pool_state = []
-            for connection in self.connections:
+            for connection in self._connections.values():
                 state = {
                     "name": connection.name,
                     "state": connection.get_state().value,
@@ -165,27 +324,51 @@ class ConnectionPool:
         Thread-safe.
         """
         with self.lock:
-            for conn in self.connections:
-                if conn.name == name:
-                    state = conn.get_state()
-                    return state.value  # ConnectionState enum → string
-            return "not_in_pool"
+            conn = self._connections.get(name)
+            if conn is None:
+                return "not_in_pool"
+            return conn.get_state().value  # ConnectionState enum → string
+
+    def snapshot_states(self) -> dict[str, str]:
+        """Return {name: state string} for every pooled connection in one locked pass.
+
+        Names absent from the result are "not_in_pool". Like
+        get_connection_state(), this never probes the transport. Thread-safe.
+        """
+        with self.lock:
+            return {name: conn.get_state().value for name, conn in self._connections.items()}
+
+    def snapshot_rtt(self) -> dict[str, Optional[dict]]:
+        """Return {name: RTT summary or None} from each connection's active keepalives.
+
+        Summaries are {"last_ms", "ewma_ms", "p95_ms", "samples", "missed",
+        "measured_at"}; None until a keepalive has been answered or missed.
+        Thread-safe.
+        """
+        with self.lock:
+            connections = list(self._connections.items())
+        return {name: conn.rtt.snapshot() for name, conn in connections}
 
     def send_command(self, connection_name, command):
         with self.lock:
-            for connection in self.connections:
-                if connection.name == connection_name:
-                    try:
-                        return connection.execute_command(command)
-                    except Exception as e:
-                        logging.error(f"❌ Failed to execute command on {connection_name}: {e}")
-                        return None
+            connection = self._connections.get(connection_name)
+            if connection is not None:
+                try:
+                    return connection.execute_command(command)
+                except Exception as e:
+                    logging.error(f"❌ Failed to execute command on {connection_name}: {e}")
+                    return None
             logging.warning(f"⚠️ Connection {connection_name} not found.")
             return None
 
     def expose_pool_state(self):
         return self.query_pool()
 
+    def timer_stats(self) -> dict:
+        """Run, lateness and overrun counters of the shared timer scheduler
+        driving the monitor, health checks and tunnel probes."""
+        return default_scheduler().stats()
+
     def disable_connection(self, name: str) -> None:
         """Close a connection and mark it so the monitor loop will skip it.
 
@@ -193,11 +376,11 @@ class ConnectionPool:
         exception is raised.
         """
         with self.lock:
-            for connection in self.connections:
-                if connection.name == name:
-                    self._disabled_names.add(name)
-                    connection.close()
-                    return
+            connection = self._connections.get(name)
+            if connection is not None:
+                self._disabled_names.add(name)
+                connection.close()
+                return
         logging.warning(f"⚠️ disable_connection: connection '{name}' not found.")
 
     def enable_connection(self, name: str) -> None:
@@ -207,10 +390,10 @@ class ConnectionPool:
         not found, a warning is logged and no exception is raised.
         """
         with self.lock:
-            for connection in self.connections:
-                if connection.name == name:
-                    self._disabled_names.discard(name)
-                    return
+            if name in self._connections:
+                self._disabled_names.discard(name)
+                self._backoff.forget(name)
+                return
         logging.warning(f"⚠️ enable_connection: connection '{name}' not found.")
 
     def remove_connection(self, name: str) -> None:
@@ -220,12 +403,12 @@ class ConnectionPool:
         *name* is not found, a warning is logged and no exception is raised.
         """
         with self.lock:
-            for connection in self.connections:
-                if connection.name == name:
-                    connection.close()
-                    self.connections.remove(connection)
-                    self._disabled_names.discard(name)
-                    return
+            connection = self._connections.pop(name, None)
+            if connection is not None:
+                connection.close()
+                self._disabled_names.discard(name)
+                self._backoff.forget(name)
+                return
         logging.warning(f"⚠️ remove_connection: connection '{name}' not found.")
 
     def get_connection(self, name: str) -> Optional[Connection]:
@@ -235,10 +418,7 @@ class ConnectionPool:
         Does not check or change connection state.
         """
         with self.lock:
-            for conn in self.connections:
-                if conn.name == name:
-                    return conn
-        return None
+            return self._connections.get(name)
 
     def add_connection(self, config) -> None:
         """Add a new connection to the pool and clear any disabled state for the name.
@@ -251,12 +431,11 @@ class ConnectionPool:
             ValueError: if a connection with config.name already exists in the pool.
         """
         with self.lock:
-            for conn in self.connections:
-                if conn.name == config.name:
-                    raise ValueError(f"Connection '{config.name}' already exists in pool")
+            if config.name in self._connections:
+                raise ValueError(f"Connection '{config.name}' already exists in pool")
             self._disabled_names.discard(config.name)
-            conn = Connection(config)
-            self.connections.append(conn)
+            self._backoff.forget(config.name)
+            self._connections[config.name] = Connection(config)
 
     def ensure_connection_open(self, name: str) -> Optional[Connection]:
         """Return an open connection for name, re-opening if currently closed/broken.
@@ -286,5 +465,6 @@ class ConnectionPool:
             )
 
         if conn.get_state() == ConnectionState.OPEN:
+            self._backoff.succeeded(name)
             return conn
         return None
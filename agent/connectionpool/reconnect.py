@@ -0,0 +1,73 @@
+"""Per-connection reconnect backoff for the pool monitor.
+
+Local boundary notes:
+- Only the schedule lives here: when each connection may next be retried.
+  Running the attempts (worker threads, disabled checks) is `ConnectionPool`'s concern.
+- A connection with no recorded failures is always due, so a dropped but
+  healthy node is retried on the next monitor tick.
+- Each consecutive failure doubles the delay from `base_delay` up to
+  `max_delay`; jitter shortens each delay by a random fraction so many nodes
+  lost at once do not retry in lockstep.
+"""
+
+import random
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+DEFAULT_MAX_BACKOFF = 300.0
+DEFAULT_JITTER = 0.5
+_MAX_EXPONENT = 32
+
+
+@dataclass
+class _BackoffState:
+    failures: int = 0
+    next_attempt_at: float = 0.0
+
+
+class ReconnectBackoff:
+    """Thread-safe exponential backoff schedule keyed by connection name."""
+
+    def __init__(
+        self,
+        base_delay: float,
+        max_delay: float = DEFAULT_MAX_BACKOFF,
+        jitter: float = DEFAULT_JITTER,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.base_delay = base_delay
+        self.max_delay = max(max_delay, base_delay)
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self._rng = rng or random.Random()
+        self._states: dict[str, _BackoffState] = {}
+        self._lock = threading.Lock()
+
+    def is_due(self, name: str, now: float) -> bool:
+        with self._lock:
+            state = self._states.get(name)
+            return state is None or now >= state.next_attempt_at
+
+    def failed(self, name: str, now: float) -> float:
+        """Record a failed attempt and return the delay until the next one."""
+        with self._lock:
+            state = self._states.setdefault(name, _BackoffState())
+            state.failures += 1
+            # Cap the exponent: the delay is clamped to max_delay long before 2**32, and an
+            # unbounded power overflows float conversion after ~1000 failures.
+            delay = min(self.base_delay * 2 ** min(state.failures - 1, _MAX_EXPONENT), self.max_delay)
+            delay *= 1 - self.jitter * self._rng.random()
+            state.next_attempt_at = now + delay
+            return delay
+
+    def succeeded(self, name: str) -> None:
+        """Forget the failure history of *name*; it is due again immediately."""
+        with self._lock:
+            self._states.pop(name, None)
+
+    forget = succeeded
+
+    def failures(self, name: str) -> int:
+        with self._lock:
+            state = self._states.get(name)
+            return 0 if state is None else state.failures
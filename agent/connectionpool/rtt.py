@@ -0,0 +1,66 @@
+"""Round-trip time statistics for active keepalive health checks.
+
+Local boundary notes:
+- `RttTracker` only aggregates samples (last, EWMA, p95 over a sliding
+  window) and missed replies; sending keepalives and deciding that a
+  connection is broken is `BaseConnection`'s concern.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+DEFAULT_RTT_WINDOW = 100
+DEFAULT_RTT_EWMA_ALPHA = 0.2
+
+
+class RttTracker:
+    """Thread-safe RTT aggregate for one connection."""
+
+    def __init__(self, window: int = DEFAULT_RTT_WINDOW, alpha: float = DEFAULT_RTT_EWMA_ALPHA) -> None:
+        self.alpha = alpha
+        self._samples: deque[float] = deque(maxlen=window)
+        self._last: Optional[float] = None
+        self._ewma: Optional[float] = None
+        self._count = 0
+        self._missed = 0
+        self._measured_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, rtt: float) -> None:
+        """Add one RTT sample, in seconds."""
+        with self._lock:
+            self._samples.append(rtt)
+            self._last = rtt
+            self._ewma = rtt if self._ewma is None else self.alpha * rtt + (1 - self.alpha) * self._ewma
+            self._count += 1
+            self._measured_at = time.time()
+
+    def record_miss(self) -> None:
+        """Count a keepalive that got no reply before its deadline."""
+        with self._lock:
+            self._missed += 1
+
+    def snapshot(self) -> Optional[dict]:
+        """Return {last_ms, ewma_ms, p95_ms, samples, missed, measured_at}, or None before any data."""
+        with self._lock:
+            if self._count == 0 and self._missed == 0:
+                return None
+            p95 = None
+            if self._samples:
+                ordered = sorted(self._samples)
+                p95 = ordered[max(math.ceil(0.95 * len(ordered)) - 1, 0)]
+            return {
+                "last_ms": _ms(self._last),
+                "ewma_ms": _ms(self._ewma),
+                "p95_ms": _ms(p95),
+                "samples": self._count,
+                "missed": self._missed,
+                "measured_at": self._measured_at,
+            }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 3)
@@ -0,0 +1,195 @@
+"""Shared timer scheduler for periodic connection and pool work.
+
+Local boundary notes:
+- One dispatcher thread keeps every pending run in a heap ordered by due
+  time and hands due runs to a small fixed set of worker threads. Health
+  checks, tunnel probes and the pool monitor all run here, so thousands of
+  connections cost heap entries rather than timer threads.
+- Repeating tasks follow the one-shot model: the next run is due `interval`
+  seconds after the previous run finished, so runs of one task never overlap.
+- Callbacks share the workers, so they must not block for long. `stats()`
+  reports runs that started late (workers saturated) and runs that took longer
+  than their interval (callback cannot keep up).
+"""
+
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+DEFAULT_TIMER_WORKERS = 4
+# A run starting more than this many seconds after its due time counts as late.
+DEFAULT_LATE_THRESHOLD = 1.0
+
+
+class ScheduledTask:
+    """Handle for a callback registered with a TimerScheduler."""
+
+    def __init__(self, scheduler: "TimerScheduler", callback: Callable[[], None], interval: Optional[float], name: str):
+        self._scheduler = scheduler
+        self.callback = callback
+        self.interval = interval  # None for one-shot tasks
+        self.name = name
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Stop future runs. A run already in progress finishes normally."""
+        self.cancelled = True
+
+
+class TimerScheduler:
+    """Heap-based scheduler running callbacks on a fixed set of daemon workers."""
+
+    def __init__(self, workers: int = DEFAULT_TIMER_WORKERS, late_threshold: float = DEFAULT_LATE_THRESHOLD):
+        self.workers = max(1, workers)
+        self.late_threshold = late_threshold
+        self._heap: list[tuple[float, int, ScheduledTask]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._ready: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads: list[threading.Thread] = []
+        self._shutdown = False
+        self._stats_lock = threading.Lock()
+        self._runs = 0
+        self._late_runs = 0
+        self._overruns = 0
+        self._errors = 0
+        self._max_lateness = 0.0
+        self._max_run = 0.0
+
+    def call_later(self, delay: float, callback: Callable[[], None], name: Optional[str] = None) -> ScheduledTask:
+        """Run *callback* once, *delay* seconds from now."""
+        task = ScheduledTask(self, callback, None, name or _callback_name(callback))
+        self._push(task, time.monotonic() + delay)
+        return task
+
+    def call_every(
+        self,
+        interval: float,
+        callback: Callable[[], None],
+        name: Optional[str] = None,
+        first_delay: Optional[float] = None,
+    ) -> ScheduledTask:
+        """Run *callback* repeatedly, *interval* seconds after each previous run finished.
+
+        The first run is due after *first_delay* (default: *interval*) seconds.
+        """
+        task = ScheduledTask(self, callback, interval, name or _callback_name(callback))
+        self._push(task, time.monotonic() + (interval if first_delay is None else first_delay))
+        return task
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = sum(1 for _, _, task in self._heap if not task.cancelled)
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "pending": pending,
+                "runs": self._runs,
+                "late_runs": self._late_runs,
+                "overruns": self._overruns,
+                "errors": self._errors,
+                "max_lateness_seconds": round(self._max_lateness, 3),
+                "max_run_seconds": round(self._max_run, 3),
+            }
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop dispatching and wait up to *timeout* seconds per thread for the workers to exit."""
+        with self._cond:
+            self._shutdown = True
+            self._heap.clear()
+            self._cond.notify_all()
+            threads = list(self._threads)
+        for _ in range(self.workers):
+            self._ready.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def _push(self, task: ScheduledTask, due: float) -> None:
+        with self._cond:
+            if self._shutdown:
+                return
+            self._start_threads_locked()
+            heapq.heappush(self._heap, (due, next(self._seq), task))
+            self._cond.notify()
+
+    def _start_threads_locked(self) -> None:
+        if self._threads:
+            return
+        dispatcher = threading.Thread(target=self._dispatch, name="timer-dispatch", daemon=True)
+        self._threads.append(dispatcher)
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(target=self._work, name=f"timer-worker-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _dispatch(self) -> None:
+        with self._cond:
+            while not self._shutdown:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, task = self._heap[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+                if not task.cancelled:
+                    self._ready.put((task, due))
+
+    def _work(self) -> None:
+        while True:
+            item = self._ready.get()
+            if item is None:
+                return
+            task, due = item
+            if task.cancelled:
+                continue
+            started = time.monotonic()
+            failed = False
+            try:
+                task.callback()
+            except Exception as e:
+                failed = True
+                logging.error(f"❌ Scheduled task {task.name} failed: {e}", exc_info=True)
+            finished = time.monotonic()
+            self._record(task, started - due, finished - started, failed)
+            if task.interval is not None and not task.cancelled:
+                self._push(task, finished + task.interval)
+
+    def _record(self, task: ScheduledTask, lateness: float, duration: float, failed: bool) -> None:
+        overrun = task.interval is not None and duration > task.interval
+        with self._stats_lock:
+            self._runs += 1
+            self._errors += failed
+            self._max_lateness = max(self._max_lateness, lateness)
+            self._max_run = max(self._max_run, duration)
+            if lateness > self.late_threshold:
+                self._late_runs += 1
+            if overrun:
+                self._overruns += 1
+        if overrun:
+            logging.warning(
+                f"⚠️ Scheduled task {task.name} took {duration:.2f}s, longer than its {task.interval}s interval"
+            )
+
+
+def _callback_name(callback: Callable) -> str:
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+_default_scheduler: Optional[TimerScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> TimerScheduler:
+    """Process-wide scheduler shared by all connections and pools."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = TimerScheduler()
+        return _default_scheduler
@@ -0,0 +1,220 @@
+"""Persistent shell sessions over a single long-lived exec channel.
+
+Local boundary notes:
+- A `ShellSession` runs one remote `sh` process and feeds it commands on
+  stdin, so working directory, environment and shell variables persist
+  between commands and no channel open or shell spawn is paid per command.
+- Each command is framed by a random sentinel line on stdout (carrying `$?`)
+  and on stderr; output is everything before the sentinel.
+- Commands run as `{ <command>\n} </dev/null` in the session shell: builtins
+  such as `cd` and `export` take effect, but commands cannot read the
+  session's stdin (which carries the framing).
+- Commands that leave the shell mid-frame (unterminated quotes or heredocs,
+  `exit`) end the session.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from agent.connection_result import CommandResult
+from agent.connectionpool.channels import wait_readable
+
+DEFAULT_SESSION_OUTPUT_LIMIT = 1024 * 1024  # per stream, per command
+
+_READ_CHUNK = 32768
+
+
+class SessionClosed(Exception):
+    """Raised when a command is sent to a session whose shell is no longer running."""
+
+
+class _FramedStream:
+    """Collects one stream's output for a single command until its sentinel marker.
+
+    Bytes that could be the start of the marker are held back until it is
+    clear whether they belong to the output. At most *limit* output bytes are
+    retained; the rest are counted.
+    """
+
+    __slots__ = ("marker", "limit", "total", "trailer", "done", "_kept", "_pending", "_matched")
+
+    def __init__(self, marker: bytes, limit: int):
+        self.marker = marker
+        self.limit = limit
+        self.total = 0
+        self.trailer = bytearray()
+        self.done = False
+        self._kept = bytearray()
+        self._pending = bytearray()
+        self._matched = False
+
+    def feed(self, data: bytes) -> None:
+        if self._matched:
+            self.trailer += data
+        else:
+            self._pending += data
+            idx = self._pending.find(self.marker)
+            if idx >= 0:
+                self._emit(self._pending[:idx])
+                self.trailer += self._pending[idx + len(self.marker):]
+                self._pending.clear()
+                self._matched = True
+            else:
+                hold = len(self.marker) - 1
+                if len(self._pending) > hold:
+                    cut = len(self._pending) - hold
+                    self._emit(self._pending[:cut])
+                    del self._pending[:cut]
+        if self._matched and b"\n" in self.trailer:
+            self.done = True
+
+    def _emit(self, data) -> None:
+        self.total += len(data)
+        room = self.limit - len(self._kept)
+        if room > 0:
+            self._kept += data[:room]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self._kept)
+
+    def getvalue(self) -> bytes:
+        return bytes(self._kept)
+
+
+def _parse_exit_code(trailer: bytes) -> int:
+    """Parse the `$?` value following the stdout sentinel; -1 if it is malformed."""
+    try:
+        return int(bytes(trailer).split(b"\n", 1)[0].strip())
+    except ValueError:
+        return -1
+
+
+class ShellSession:
+    """A long-lived `sh` on one channel. Commands run one at a time (thread-safe)."""
+
+    def __init__(
+        self,
+        connection_name: str,
+        channel,
+        on_close: Optional[Callable[[], None]] = None,
+        on_result: Optional[Callable[[CommandResult], None]] = None,
+    ):
+        """
+        :param connection_name: Name of the owning connection (for logs).
+        :param channel: Paramiko channel already running `sh`.
+        :param on_close: Called exactly once when the session closes (releases the channel slot).
+        :param on_result: Called with each completed CommandResult (connection history).
+        """
+        self.connection_name = connection_name
+        self._channel = channel
+        self._on_close = on_close
+        self._on_result = on_result
+        self._lock = threading.Lock()  # one command at a time
+        self._close_lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def alive(self) -> bool:
+        return not self._closed and not self._channel.closed and not self._channel.eof_received
+
+    def run(
+        self,
+        command: str,
+        timeout: int | float | None = None,
+        output_limit: int = DEFAULT_SESSION_OUTPUT_LIMIT,
+    ) -> CommandResult:
+        """Run *command* in the session shell and return its framed result.
+
+        Raises:
+            SessionClosed: if the shell has exited or the session was closed.
+            TimeoutError: if the command does not finish within *timeout* seconds.
+                The session is closed, since the shell is left mid-command.
+        """
+        with self._lock:
+            if not self.alive:
+                self.close()
+                raise SessionClosed(f"Shell session on {self.connection_name} is closed")
+
+            token = f"__MCP_END_{uuid.uuid4().hex}__".encode()
+            out = _FramedStream(b"\n" + token + b" ", output_limit)
+            err = _FramedStream(b"\n" + token, output_limit)
+            framed = (
+                "{ " + (command if command.strip() else ":") + "\n} </dev/null\n"
+                f"__mcp_rc=$?; printf '\\n%s %d\\n' '{token.decode()}' \"$__mcp_rc\"; "
+                f"printf '\\n%s\\n' '{token.decode()}' >&2\n"
+            )
+
+            started_at = datetime.now(timezone.utc)
+            logging.info(f"💻 Executing in session on {self.connection_name}: {command}")
+            deadline = None if timeout is None else time.monotonic() + timeout
+            try:
+                self._channel.sendall(framed.encode())
+                self._read_frame(out, err, deadline)
+            except TimeoutError:
+                self.close()
+                raise TimeoutError(
+                    f"Session command timed out after {timeout}s on {self.connection_name}: {command}"
+                ) from None
+            except SessionClosed:
+                self.close()
+                raise
+            except OSError as e:
+                self.close()
+                raise SessionClosed(f"Shell session on {self.connection_name} failed: {e}") from e
+
+            ended_at = datetime.now(timezone.utc)
+            exit_code = _parse_exit_code(out.trailer)
+            result = CommandResult(
+                command=command,
+                exit_code=exit_code,
+                stdout=out.getvalue(),
+                stderr=err.getvalue(),
+                started_at=started_at,
+                ended_at=ended_at,
+                stdout_truncated=out.truncated,
+                stderr_truncated=err.truncated,
+                stdout_total_bytes=out.total,
+                stderr_total_bytes=err.total,
+            )
+        if self._on_result is not None:
+            self._on_result(result)
+        return result
+
+    def _read_frame(self, out: _FramedStream, err: _FramedStream, deadline: Optional[float]) -> None:
+        channel = self._channel
+        while True:
+            progressed = False
+            if channel.recv_ready():
+                out.feed(channel.recv(_READ_CHUNK))
+                progressed = True
+            if channel.recv_stderr_ready():
+                err.feed(channel.recv_stderr(_READ_CHUNK))
+                progressed = True
+            if out.done and err.done:
+                return
+            if progressed:
+                continue
+            if channel.eof_received or channel.closed:
+                raise SessionClosed(f"Shell on {self.connection_name} exited")
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("session command deadline exceeded")
+            wait_readable(channel, remaining)
+
+    def close(self) -> None:
+        """Close the channel (ending the remote shell). Idempotent."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self._channel.close()
+        except Exception:
+            pass
+        if self._on_close is not None:
+            self._on_close()
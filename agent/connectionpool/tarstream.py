@@ -0,0 +1,130 @@
+"""Streaming tar helpers for whole-directory transfers.
+
+Local boundary notes:
+- A tree moves as one tar stream over a single exec channel running `tar -x`
+  or `tar -c` on the node, instead of one SFTP open/write/chmod per file.
+- The gateway side uses tarfile's stream modes ("w|" / "r|", optionally gzip),
+  so only one tar record plus the current file is held in memory at a time.
+- Only archive encoding/decoding and the remote command lines live here;
+  channel lifecycle is `BaseConnection.upload_tree()` / `download_tree()`'s concern.
+"""
+
+import posixpath
+import shlex
+import tarfile
+import time
+from typing import Callable, Iterable, Optional
+
+_READ_CHUNK = 32768
+
+
+class TreeTooLarge(Exception):
+    """The remote tree holds more file data than the caller's limit."""
+
+
+class ChannelWriter:
+    """Minimal write-only file object that sends to an exec channel's stdin.
+
+    *on_stderr* receives stderr that arrives while writing, so a chatty
+    remote command cannot stall on a full stderr window.
+    """
+
+    def __init__(self, channel, on_stderr: Optional[Callable[[bytes], None]] = None):
+        self._channel = channel
+        self._on_stderr = on_stderr
+        self.bytes_sent = 0
+
+    def write(self, data) -> int:
+        while self._on_stderr is not None and self._channel.recv_stderr_ready():
+            self._on_stderr(self._channel.recv_stderr(_READ_CHUNK))
+        self._channel.sendall(data)
+        self.bytes_sent += len(data)
+        return len(data)
+
+
+class ChannelReader:
+    """Minimal read-only file object over an exec channel's stdout."""
+
+    def __init__(self, channel, on_stderr: Optional[Callable[[bytes], None]] = None):
+        self._channel = channel
+        self._on_stderr = on_stderr
+        self.bytes_received = 0
+
+    def read(self, size: int = _READ_CHUNK) -> bytes:
+        while self._on_stderr is not None and self._channel.recv_stderr_ready():
+            self._on_stderr(self._channel.recv_stderr(_READ_CHUNK))
+        data = self._channel.recv(size)
+        self.bytes_received += len(data)
+        return data
+
+
+def is_safe_member_path(path: str) -> bool:
+    """True for a non-empty relative POSIX path that stays inside its base directory."""
+    if not path or path.startswith("/") or "\x00" in path:
+        return False
+    parts = [p for p in path.split("/") if p not in ("", ".")]
+    return bool(parts) and ".." not in parts
+
+
+def extract_command(remote_dir: str, compress: bool) -> str:
+    """Remote command that creates *remote_dir* and unpacks a tar stream from stdin into it."""
+    directory = shlex.quote(remote_dir)
+    return f"mkdir -p {directory} && tar -x{'z' if compress else ''} -f - -C {directory}"
+
+
+def create_command(remote_dir: str, compress: bool) -> str:
+    """Remote command that writes a tar stream of *remote_dir*'s contents to stdout."""
+    return f"tar -c{'z' if compress else ''} -f - -C {shlex.quote(remote_dir)} ."
+
+
+def write_archive(fileobj, entries: Iterable[tuple[str, bytes, int]], compress: bool) -> tuple[int, int]:
+    """Stream (path, data, mode) entries into *fileobj* as a tar archive.
+
+    *entries* may be a generator; each data buffer can be released as soon as
+    the next entry is requested. Returns (file_count, content_bytes).
+    """
+    import io
+
+    count = total = 0
+    now = int(time.time())
+    with tarfile.open(fileobj=fileobj, mode="w|gz" if compress else "w|", format=tarfile.PAX_FORMAT) as tar:
+        for path, data, mode in entries:
+            info = tarfile.TarInfo(posixpath.normpath(path))
+            info.size = len(data)
+            info.mode = mode
+            info.mtime = now
+            tar.addfile(info, io.BytesIO(data))
+            count += 1
+            total += len(data)
+    return count, total
+
+
+def read_archive(fileobj, compress: bool, max_bytes: int) -> tuple[list[tuple[str, bytes, int]], list[str]]:
+    """Read a tar stream from *fileobj*.
+
+    Returns (files, skipped): files as (path, data, mode) for regular files,
+    and the paths of anything other than regular files and directories
+    (symlinks, devices, ...). Paths are relative, without a leading "./".
+
+    Raises:
+        TreeTooLarge: once the regular files' total size would exceed *max_bytes*.
+        tarfile.ReadError: if the stream is not a tar archive (e.g. it is empty).
+    """
+    files: list[tuple[str, bytes, int]] = []
+    skipped: list[str] = []
+    total = 0
+    with tarfile.open(fileobj=fileobj, mode="r|gz" if compress else "r|") as tar:
+        for member in tar:
+            path = posixpath.normpath(member.name)
+            if path == ".":
+                continue
+            if member.isdir():
+                continue
+            if not member.isreg():
+                skipped.append(path)
+                continue
+            total += member.size
+            if total > max_bytes:
+                raise TreeTooLarge(f"tree exceeds {max_bytes} bytes")
+            files.append((path, tar.extractfile(member).read(), member.mode & 0o7777))
+    return files, skipped
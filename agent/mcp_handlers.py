@@ -46,16 +46,177 @@ def register_tools(mcp: FastMCP, node_service, agent_identity_service):
         }
 
     @mcp.tool()
-    def run_command_on_node(name: str, command: str, timeout: int = 30) -> dict:
-        logging.debug(f"run_command_on_node called: name={name}, command={command}, timeout={timeout}")
-        return node_service.run_command_on_node(name=name, command=command, timeout=timeout)
+    def run_command_on_node(
+        name: str, command: str, timeout: int = 30, cache_ttl: float = 0, output_format: str = "text"
+    ) -> dict:
+        logging.debug(
+            f"run_command_on_node called: name={name}, command={command}, timeout={timeout}, "
+            f"cache_ttl={cache_ttl}, output_format={output_format}"
+        )
+        return node_service.run_command_on_node(
+            name=name, command=command, timeout=timeout, cache_ttl=cache_ttl, output_format=output_format
+        )
 
     @mcp.tool()
-    def upload_file_to_node(name: str, remote_path: str, data_b64: str, mode: str = "0644") -> dict:
-        logging.debug(f"upload_file_to_node called: name={name}, remote_path={remote_path}, mode={mode}")
-        return node_service.upload_file_to_node(name=name, remote_path=remote_path, data_b64=data_b64, mode=mode)
+    def run_command_on_nodes(
+        names: list[str], command: str, max_parallel: int = 16, deadline: float = 60, output_format: str = "text"
+    ) -> dict:
+        logging.debug(
+            f"run_command_on_nodes called: names={names}, command={command}, "
+            f"max_parallel={max_parallel}, deadline={deadline}, output_format={output_format}"
+        )
+        return node_service.run_command_on_nodes(
+            names=names, command=command, max_parallel=max_parallel, deadline=deadline, output_format=output_format
+        )
 
     @mcp.tool()
-    def download_file_from_node(name: str, remote_path: str) -> dict:
-        logging.debug(f"download_file_from_node called: name={name}, remote_path={remote_path}")
-        return node_service.download_file_from_node(name=name, remote_path=remote_path)
+    def open_session(name: str) -> dict:
+        logging.debug(f"open_session called: name={name}")
+        return node_service.open_session(name=name)
+
+    @mcp.tool()
+    def run_in_session(session_id: str, command: str, timeout: int = 30) -> dict:
+        logging.debug(f"run_in_session called: session_id={session_id}, command={command}, timeout={timeout}")
+        return node_service.run_in_session(session_id=session_id, command=command, timeout=timeout)
+
+    @mcp.tool()
+    def close_session(session_id: str) -> dict:
+        logging.debug(f"close_session called: session_id={session_id}")
+        return node_service.close_session(session_id=session_id)
+
+    @mcp.tool()
+    def start_command_on_node(name: str, command: str, timeout: Optional[int] = None) -> dict:
+        logging.debug(f"start_command_on_node called: name={name}, command={command}, timeout={timeout}")
+        return node_service.start_command_on_node(name=name, command=command, timeout=timeout)
+
+    @mcp.tool()
+    def get_job_status(job_id: str) -> dict:
+        logging.debug(f"get_job_status called: job_id={job_id}")
+        return node_service.get_job_status(job_id=job_id)
+
+    @mcp.tool()
+    def get_job_output(
+        job_id: str, offset: int = 0, limit: int = 65536, stream: str = "stdout", output_format: str = "text"
+    ) -> dict:
+        logging.debug(
+            f"get_job_output called: job_id={job_id}, offset={offset}, limit={limit}, stream={stream}, "
+            f"output_format={output_format}"
+        )
+        return node_service.get_job_output(
+            job_id=job_id, offset=offset, limit=limit, stream=stream, output_format=output_format
+        )
+
+    @mcp.tool()
+    def cancel_job(job_id: str) -> dict:
+        logging.debug(f"cancel_job called: job_id={job_id}")
+        return node_service.cancel_job(job_id=job_id)
+
+    @mcp.tool()
+    def upload_file_to_node(
+        name: str, remote_path: str, data_b64: str, mode: str = "0644", atomic: bool = False
+    ) -> dict:
+        logging.debug(
+            f"upload_file_to_node called: name={name}, remote_path={remote_path}, mode={mode}, atomic={atomic}"
+        )
+        return node_service.upload_file_to_node(
+            name=name, remote_path=remote_path, data_b64=data_b64, mode=mode, atomic=atomic
+        )
+
+    @mcp.tool()
+    def distribute_file(
+        names: list[str],
+        remote_path: str,
+        data_b64: str,
+        mode: str = "0644",
+        max_parallel: int = 16,
+        atomic: bool = False,
+    ) -> dict:
+        logging.debug(
+            f"distribute_file called: names={names}, remote_path={remote_path}, "
+            f"mode={mode}, max_parallel={max_parallel}, atomic={atomic}"
+        )
+        return node_service.distribute_file(
+            names=names,
+            remote_path=remote_path,
+            data_b64=data_b64,
+            mode=mode,
+            max_parallel=max_parallel,
+            atomic=atomic,
+        )
+
+    @mcp.tool()
+    def copy_between_nodes(
+        src: str, src_path: str, dst: str, dst_path: str, mode: Optional[str] = None
+    ) -> dict:
+        logging.debug(
+            f"copy_between_nodes called: src={src}, src_path={src_path}, dst={dst}, dst_path={dst_path}, mode={mode}"
+        )
+        return node_service.copy_between_nodes(src=src, src_path=src_path, dst=dst, dst_path=dst_path, mode=mode)
+
+    @mcp.tool()
+    def get_transfer_status(transfer_id: Optional[str] = None) -> dict:
+        logging.debug(f"get_transfer_status called: transfer_id={transfer_id}")
+        return node_service.get_transfer_status(transfer_id=transfer_id)
+
+    @mcp.tool()
+    def upload_tree(name: str, remote_dir: str, files: list[dict], compress: bool = False) -> dict:
+        logging.debug(
+            f"upload_tree called: name={name}, remote_dir={remote_dir}, files={len(files)}, compress={compress}"
+        )
+        return node_service.upload_tree(name=name, remote_dir=remote_dir, files=files, compress=compress)
+
+    @mcp.tool()
+    def download_tree(name: str, remote_dir: str, compress: bool = False) -> dict:
+        logging.debug(f"download_tree called: name={name}, remote_dir={remote_dir}, compress={compress}")
+        return node_service.download_tree(name=name, remote_dir=remote_dir, compress=compress)
+
+    @mcp.tool()
+    def sync_file_to_node(
+        name: str, remote_path: str, data_b64: str, mode: str = "0644", block_size: int = 131072
+    ) -> dict:
+        logging.debug(
+            f"sync_file_to_node called: name={name}, remote_path={remote_path}, mode={mode}, block_size={block_size}"
+        )
+        return node_service.sync_file_to_node(
+            name=name, remote_path=remote_path, data_b64=data_b64, mode=mode, block_size=block_size
+        )
+
+    @mcp.tool()
+    def download_file_from_node(
+        name: str,
+        remote_path: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ) -> dict:
+        logging.debug(
+            f"download_file_from_node called: name={name}, remote_path={remote_path}, "
+            f"offset={offset}, length={length}, continuation_token={continuation_token}"
+        )
+        return node_service.download_file_from_node(
+            name=name,
+            remote_path=remote_path,
+            offset=offset,
+            length=length,
+            continuation_token=continuation_token,
+        )
+
+    @mcp.tool()
+    def begin_upload(name: str, remote_path: str, mode: str = "0644") -> dict:
+        logging.debug(f"begin_upload called: name={name}, remote_path={remote_path}, mode={mode}")
+        return node_service.begin_upload(name=name, remote_path=remote_path, mode=mode)
+
+    @mcp.tool()
+    def upload_chunk(upload_id: str, offset: int, data_b64: str) -> dict:
+        logging.debug(f"upload_chunk called: upload_id={upload_id}, offset={offset}")
+        return node_service.upload_chunk(upload_id=upload_id, offset=offset, data_b64=data_b64)
+
+    @mcp.tool()
+    def commit_upload(upload_id: str) -> dict:
+        logging.debug(f"commit_upload called: upload_id={upload_id}")
+        return node_service.commit_upload(upload_id=upload_id)
+
+    @mcp.tool()
+    def abort_upload(upload_id: str) -> dict:
+        logging.debug(f"abort_upload called: upload_id={upload_id}")
+        return node_service.abort_upload(upload_id=upload_id)
@@ -0,0 +1,273 @@
+"""
+JobRegistry — background execution of long-running node commands.
+
+A job wraps one `Connection.execute()` call running on a daemon worker thread.
+Output is streamed into per-job buffers as it arrives, so clients can poll
+status and read output incrementally by byte offset while the command runs.
+
+Retention:
+  - At most `max_running` jobs execute at once; further starts are rejected.
+  - Finished jobs are kept for `retention_seconds` and at most `max_finished`
+    of them are retained (oldest evicted first).
+  - Each output stream keeps its most recent `output_limit` bytes; earlier
+    bytes are dropped and reported through `first_offset`.
+
+Job ids and buffers live only in this registry; an evicted or pre-restart
+job id is reported as job_not_found.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from agent.connectionpool.connection import CommandCancelled
+
+DEFAULT_MAX_RUNNING = 32
+DEFAULT_MAX_FINISHED = 100
+DEFAULT_RETENTION_SECONDS = 3600
+DEFAULT_OUTPUT_LIMIT = 8 * 1024 * 1024  # per stream
+DEFAULT_READ_LIMIT = 64 * 1024
+
+# Output retained inside the CommandResult (and therefore connection history);
+# the job buffers hold the full stream.
+_RESULT_PREVIEW_BYTES = 4096
+
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_TIMEOUT = "timeout"
+JOB_CANCELLED = "cancelled"
+
+
+class _OutputStream:
+    """Append-only byte stream that keeps the most recent *limit* bytes.
+
+    Offsets are absolute positions in the full stream, so they stay valid for
+    pagination even after older bytes are dropped.
+    """
+
+    __slots__ = ("limit", "_data", "_first_offset", "_lock")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._data = bytearray()
+        self._first_offset = 0
+        self._lock = threading.Lock()
+
+    def append(self, chunk: bytes) -> None:
+        with self._lock:
+            self._data += chunk
+            overflow = len(self._data) - self.limit
+            if overflow > 0:
+                del self._data[:overflow]
+                self._first_offset += overflow
+
+    def read(self, offset: int, limit: int) -> tuple[bytes, int, int, int]:
+        """Return (data, start_offset, first_offset, total_bytes) for a read at *offset*."""
+        with self._lock:
+            total = self._first_offset + len(self._data)
+            start = min(max(offset, self._first_offset), total)
+            rel = start - self._first_offset
+            return bytes(self._data[rel:rel + limit]), start, self._first_offset, total
+
+    def read_text(self, offset: int, limit: int, final: bool) -> tuple[bytes, int, int, int]:
+        """Like read(), but the slice starts and ends on UTF-8 character boundaries.
+
+        Continuation bytes at the start (an offset inside a character, e.g.
+        after older output was dropped) are skipped. A character cut off at the
+        end is left for the next read, unless the stream is *final* and it is
+        the last thing in it, or the slice would otherwise be empty.
+        """
+        data, start, first_offset, total = self.read(offset, limit)
+        skip = 0
+        while skip < min(len(data), 3) and data[skip] & 0xC0 == 0x80:
+            skip += 1
+        data, start = data[skip:], start + skip
+        end = _utf8_complete_prefix(data)
+        if end < len(data) and end > 0 and not (final and start + len(data) == total):
+            data = data[:end]
+        return data, start, first_offset, total
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return self._first_offset + len(self._data)
+
+
+def _utf8_complete_prefix(data: bytes) -> int:
+    """Length of *data* without a multi-byte UTF-8 character cut off at its end."""
+    for back in range(1, min(len(data), 4) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:  # lead byte or ASCII
+            needed = 4 if byte >= 0xF0 else 3 if byte >= 0xE0 else 2 if byte >= 0xC0 else 1
+            return len(data) - back if needed > back else len(data)
+    return len(data)
+
+
+class Job:
+    """One background command execution. State fields are guarded by `_lock`."""
+
+    def __init__(self, node: str, command: str, timeout: Optional[float], output_limit: int):
+        self.job_id = uuid.uuid4().hex
+        self.node = node
+        self.command = command
+        self.timeout = timeout
+        self.state = JOB_RUNNING
+        self.exit_code: Optional[int] = None
+        self.error: Optional[str] = None
+        self.started_at = datetime.now(timezone.utc)
+        self.ended_at: Optional[datetime] = None
+        self.finished_monotonic: Optional[float] = None
+        self.stdout = _OutputStream(output_limit)
+        self.stderr = _OutputStream(output_limit)
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def finish(self, state: str, exit_code: Optional[int] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.state = state
+            self.exit_code = exit_code
+            self.error = error
+            self.ended_at = datetime.now(timezone.utc)
+            self.finished_monotonic = time.monotonic()
+
+    @property
+    def finished(self) -> bool:
+        with self._lock:
+            return self.state != JOB_RUNNING
+
+    def to_status(self) -> dict:
+        with self._lock:
+            status = {
+                "job_id": self.job_id,
+                "name": self.node,
+                "command": self.command,
+                "state": self.state,
+                "exit_code": self.exit_code,
+                "started_at": self.started_at.isoformat(),
+                "ended_at": self.ended_at.isoformat() if self.ended_at else None,
+            }
+            if self.error:
+                status["error"] = self.error
+        status["stdout_bytes"] = self.stdout.total
+        status["stderr_bytes"] = self.stderr.total
+        return status
+
+
+class JobRegistry:
+    """Thread-safe registry of background command jobs."""
+
+    def __init__(
+        self,
+        max_running: int = DEFAULT_MAX_RUNNING,
+        max_finished: int = DEFAULT_MAX_FINISHED,
+        retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+        output_limit: int = DEFAULT_OUTPUT_LIMIT,
+    ) -> None:
+        self.max_running = max_running
+        self.max_finished = max_finished
+        self.retention_seconds = retention_seconds
+        self.output_limit = output_limit
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self, node: str, command: str, connection, timeout: Optional[float]) -> Optional[Job]:
+        """Start *command* on *connection* in the background.
+
+        Returns the new Job, or None if `max_running` jobs are already running.
+        """
+        with self._lock:
+            self._prune_locked()
+            running = sum(1 for j in self._jobs.values() if not j.finished)
+            if running >= self.max_running:
+                return None
+            job = Job(node, command, timeout, self.output_limit)
+            self._jobs[job.job_id] = job
+
+        worker = threading.Thread(
+            target=self._run,
+            args=(job, connection),
+            name=f"job-{job.job_id[:8]}",
+            daemon=True,
+        )
+        worker.start()
+        return job
+
+    def _run(self, job: Job, connection) -> None:
+        try:
+            result = connection.execute(
+                job.command,
+                timeout=job.timeout,
+                output_limit=_RESULT_PREVIEW_BYTES,
+                on_stdout=job.stdout.append,
+                on_stderr=job.stderr.append,
+                cancel_event=job.cancel_event,
+            )
+            job.finish(JOB_COMPLETED, exit_code=result.exit_code)
+        except CommandCancelled:
+            job.finish(JOB_CANCELLED)
+        except TimeoutError:
+            job.finish(JOB_TIMEOUT)
+        except Exception as e:
+            logging.error(f"❌ Job {job.job_id} on {job.node} failed: {e}")
+            job.finish(JOB_FAILED, error=str(e))
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation of a running job. Returns the job, or None if unknown."""
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel_event.set()
+        return job
+
+    def cancel_node(self, node: str) -> int:
+        """Request cancellation of every running job on *node*. Returns the number signalled."""
+        with self._lock:
+            running = [j for j in self._jobs.values() if j.node == node and not j.finished]
+        for job in running:
+            job.cancel_event.set()
+        return len(running)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._prune_locked()
+            return self._jobs.get(job_id)
+
+    def all(self) -> list[Job]:
+        with self._lock:
+            self._prune_locked()
+            return list(self._jobs.values())
+
+    # ------------------------------------------------------------------
+    # Retention (called with self._lock held)
+    # ------------------------------------------------------------------
+
+    def _prune_locked(self) -> None:
+        now = time.monotonic()
+        finished = [j for j in self._jobs.values() if j.finished]
+        expired = {
+            j.job_id for j in finished
+            if j.finished_monotonic is not None and now - j.finished_monotonic > self.retention_seconds
+        }
+        overflow = len(finished) - len(expired) - self.max_finished
+        if overflow > 0:
+            # _jobs is insertion-ordered, so the oldest finished jobs come first.
+            for j in finished:
+                if overflow <= 0:
+                    break
+                if j.job_id not in expired:
+                    expired.add(j.job_id)
+                    overflow -= 1
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,80 @@
+"""
+ResultCache — opt-in TTL + LRU cache for read-only command results.
+
+Values are stored as-is (CommandResult objects in NodeService, converted to a
+response dict on every hit) and must be treated as immutable by callers.
+
+Keyed by (node, command). Each entry also records the connection generation
+it was produced on; a lookup against a newer generation (the node reconnected)
+is treated as a miss and drops the entry. NodeService invalidates all of a
+node's entries when the node is removed or disabled.
+
+Callers opt in per call by passing a positive TTL; nothing is cached otherwise.
+Only completed command results are cached — guard errors and timeouts are not.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_MAX_ENTRIES = 512
+MAX_TTL_SECONDS = 3600
+
+
+class ResultCache:
+    """Thread-safe TTL/LRU cache of command results, with hit/miss counters."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple[str, str], tuple[float, float, object, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, node: str, command: str, generation) -> Optional[tuple[object, float]]:
+        """Return (result, age_seconds) for a live entry, or None on a miss."""
+        key = (node, command)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, expires_at, entry_generation, result = entry
+                if now < expires_at and entry_generation == generation:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result, now - stored_at
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, node: str, command: str, generation, result, ttl: float) -> None:
+        ttl = min(ttl, MAX_TTL_SECONDS)
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        key = (node, command)
+        with self._lock:
+            self._entries[key] = (now, now + ttl, generation, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_node(self, node: str) -> int:
+        """Drop every entry for *node*. Returns the number dropped."""
+        with self._lock:
+            doomed = [k for k in self._entries if k[0] == node]
+            for k in doomed:
+                del self._entries[k]
+            return len(doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
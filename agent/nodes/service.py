@@ -8,18 +8,68 @@ Semantic model:
 
 NodeService composes NodeRuntimeState at call time from two live sources:
   1. Registry: NodeConfig + NodeInfoCache (identity, config, cached facts)
-  2. Pool: current ConnectionState queried via pool.get_connection_state() at call time
+  2. Pool: current ConnectionState queried via pool.get_connection_state() (one node)
+     or pool.snapshot_states() (all nodes, one locked pass) at call time
 
 NodeRuntimeState is assembled inline and NEVER stored in the registry.
 The pool_state field is always freshly derived from the pool at call time.
 """
 
+import logging
 from dataclasses import replace
 from dataclasses import dataclass as _dataclass
 from typing import Optional
 
+from agent.connection_result import OUTPUT_FORMATS
+from agent.connectionpool.delta import DEFAULT_BLOCK_SIZE
 from agent.connectionpool.pool import ConnectionPool
+from agent.nodes.jobs import JobRegistry, DEFAULT_READ_LIMIT
 from agent.nodes.registry import NodeRegistry
+from agent.nodes.result_cache import ResultCache
+from agent.nodes.sessions import SessionRegistry
+from agent.nodes.transfers import TransferRegistry
+from agent.nodes.upload_cache import UploadCache, UploadRecord
+from agent.nodes.uploads import UploadRegistry, MAX_CHUNK_BYTES
+
+DEFAULT_FANOUT_PARALLEL = 16
+DEFAULT_FANOUT_DEADLINE = 60
+
+DEFAULT_DOWNLOAD_PAGE_BYTES = 1024 * 1024
+MAX_DOWNLOAD_PAGE_BYTES = 4 * 1024 * 1024
+
+# Bytes moved per read/write step of copy_between_nodes(); the only copy buffer held.
+COPY_CHUNK_BYTES = 2 * 1024 * 1024
+# A copy interrupted by a connection loss is resumed up to this many times,
+# waiting TRANSFER_RESUME_DELAY * attempt seconds before each reconnect.
+MAX_TRANSFER_RESUMES = 3
+TRANSFER_RESUME_DELAY = 1.0
+
+
+def _encode_download_token(name: str, remote_path: str, offset: int) -> str:
+    """Opaque continuation token for the next page of a ranged download."""
+    import base64
+    import json
+
+    raw = json.dumps({"n": name, "p": remote_path, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_download_token(token: str, name: str, remote_path: str) -> Optional[int]:
+    """Return the token's offset, or None if it is malformed or for another node/path."""
+    import base64
+    import binascii
+    import json
+
+    try:
+        fields = json.loads(base64.urlsafe_b64decode(token.encode()))
+        offset = fields["o"]
+        if fields["n"] != name or fields["p"] != remote_path:
+            return None
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        return None
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        return None
+    return offset
 
 
 @_dataclass
@@ -50,11 +100,29 @@ class NodeService:
       - add_node(name, host, port, user, password, mode)
     """
 
-    def __init__(self, registry: NodeRegistry, pool: ConnectionPool, handshake_service, agent_identity_service) -> None:
+    def __init__(
+        self,
+        registry: NodeRegistry,
+        pool: ConnectionPool,
+        handshake_service,
+        agent_identity_service,
+        job_registry: Optional[JobRegistry] = None,
+        session_registry: Optional[SessionRegistry] = None,
+        result_cache: Optional[ResultCache] = None,
+        upload_registry: Optional[UploadRegistry] = None,
+        upload_cache: Optional[UploadCache] = None,
+        transfer_registry: Optional[TransferRegistry] = None,
+    ) -> None:
         self._registry = registry
         self._pool = pool
         self._handshake_service = handshake_service
         self._identity_service = agent_identity_service
+        self._jobs = job_registry if job_registry is not None else JobRegistry()
+        self._sessions = session_registry if session_registry is not None else SessionRegistry()
+        self._result_cache = result_cache if result_cache is not None else ResultCache()
+        self._uploads = upload_registry if upload_registry is not None else UploadRegistry()
+        self._upload_cache = upload_cache if upload_cache is not None else UploadCache()
+        self._transfers = transfer_registry if transfer_registry is not None else TransferRegistry()
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -69,12 +137,16 @@ class NodeService:
         """
         return self._pool.get_connection_state(name)
 
-    def _node_entry_for_status(self, config, cache) -> dict:
+    def _node_entry_for_status(
+        self, config, cache, pool_state: Optional[str] = None, rtt: Optional[dict] = None
+    ) -> dict:
         """Assemble one node entry for get_node_status() response.
 
-        Reads config + cache from registry arguments; derives pool_state live.
+        Reads config + cache from registry arguments; derives pool_state live
+        unless the caller passes one from a pool.snapshot_states() taken for this call.
         """
-        pool_state = self._derive_pool_state(config.name)
+        if pool_state is None:
+            pool_state = self._derive_pool_state(config.name)
         reachable = pool_state == "open"
 
         last_seen_at = cache.facts.get("last_seen_at") if cache.facts else None
@@ -91,14 +163,17 @@ class NodeService:
             "last_seen_at": last_seen_at,
             "last_error": last_error,
             "cached_info_available": cached_info_available,
+            "rtt": rtt,
         }
 
-    def _node_entry_for_info(self, config, cache) -> dict:
+    def _node_entry_for_info(self, config, cache, pool_state: Optional[str] = None) -> dict:
         """Assemble one node entry for get_node_info() response.
 
-        Reads config + cache from registry arguments; derives pool_state live.
+        Reads config + cache from registry arguments; derives pool_state live
+        unless the caller passes one from a pool.snapshot_states() taken for this call.
         """
-        pool_state = self._derive_pool_state(config.name)
+        if pool_state is None:
+            pool_state = self._derive_pool_state(config.name)
         return {
             "name": config.name,
             "enabled": config.enabled,
@@ -114,16 +189,26 @@ class NodeService:
         """Return gateway status and all configured nodes with live pool state.
 
         Reads node config and cache from the registry.
-        Derives pool_state at call time via pool.get_connection_state().
+        Derives pool_state at call time from a single pool.snapshot_states() pass,
+        and each node's "rtt" (keepalive round-trip summary: last_ms, ewma_ms,
+        p95_ms, samples, missed, measured_at; None until measured) from
+        pool.snapshot_rtt(). "scheduler" carries pool.timer_stats(): run,
+        lateness and overrun counters of the shared timer scheduler, which show
+        when health checks and probes fall behind.
         Never copies or caches pool runtime state into the registry.
 
         Returns:
-            {"status": "ok", "nodes": [...]} with one entry per configured node.
-            Empty registry returns {"status": "ok", "nodes": []}.
+            {"status": "ok", "nodes": [...], "scheduler": {...}} with one entry per configured node.
+            Empty registry returns {"status": "ok", "nodes": [], "scheduler": {...}}.
         """
         entries = self._registry.all()
-        nodes = [self._node_entry_for_status(cfg, cache) for cfg, cache in entries]
-        return {"status": "ok", "nodes": nodes}
+        states = self._pool.snapshot_states()
+        rtts = self._pool.snapshot_rtt()
+        nodes = [
+            self._node_entry_for_status(cfg, cache, states.get(cfg.name, "not_in_pool"), rtts.get(cfg.name))
+            for cfg, cache in entries
+        ]
+        return {"status": "ok", "nodes": nodes, "scheduler": self._pool.timer_stats()}
 
     def get_node_info(
         self,
@@ -191,12 +276,14 @@ class NodeService:
                     }
 
             # Step 4 (refresh=False): single named node, normal read
-            entries = [(config, cache)]
-        else:
-            # Step 4 (refresh=False): all nodes
-            entries = self._registry.all()
-
-        nodes = [self._node_entry_for_info(cfg, cache) for cfg, cache in entries]
+            return {"nodes": [self._node_entry_for_info(config, cache)]}
+
+        # Step 4 (refresh=False): all nodes, pool states read in one pass
+        states = self._pool.snapshot_states()
+        nodes = [
+            self._node_entry_for_info(cfg, cache, states.get(cfg.name, "not_in_pool"))
+            for cfg, cache in self._registry.all()
+        ]
         return {"nodes": nodes}
 
     # ------------------------------------------------------------------
@@ -207,7 +294,10 @@ class NodeService:
         """Disable a configured node and close its pool connection.
 
         Sets enabled=False on the node's NodeConfig in the registry.
-        Calls pool.disable_connection(name) to close and prevent reconnect.
+        Closes the node's shell sessions and aborts its chunked uploads (their
+        channels and open remote files would otherwise outlive the
+        connection), then calls pool.disable_connection(name) to close and
+        prevent reconnect.
 
         Returns:
             {"status": "disabled", "name": name} on success.
@@ -219,7 +309,10 @@ class NodeService:
         existing_cfg, _ = self._registry.get(name)
         updated_cfg = replace(existing_cfg, enabled=False)
         self._registry.update_config(name, updated_cfg)
+        self._sessions.close_node(name)
+        self._uploads.abort_node(name)
         self._pool.disable_connection(name)
+        self._result_cache.invalidate_node(name)
         return {"status": "disabled", "name": name}
 
     def enable_node(self, name: str, validate: bool = False) -> dict:
@@ -298,6 +391,7 @@ class NodeService:
     def remove_node(self, name: str) -> dict:
         """Remove a node from the pool and registry entirely.
 
+        Cancels the node's running jobs, closes its sessions and aborts its uploads.
         Calls pool.remove_connection(name) to close and remove from pool.
         Calls registry.remove(name) to remove from registry.
 
@@ -308,6 +402,11 @@ class NodeService:
         if not self._registry.exists(name):
             return {"error": "node not found", "name": name}
 
+        self._jobs.cancel_node(name)
+        self._sessions.close_node(name)
+        self._uploads.abort_node(name)
+        self._result_cache.invalidate_node(name)
+        self._upload_cache.invalidate_node(name)
         self._pool.remove_connection(name)
         self._registry.remove(name)
         return {"status": "removed", "name": name}
@@ -520,62 +619,1083 @@ class NodeService:
     # Execution APIs (Phase 5)
     # ------------------------------------------------------------------
 
-    def run_command_on_node(self, name: str, command: str, timeout: int = 30) -> dict:
+    def run_command_on_node(
+        self,
+        name: str,
+        command: str,
+        timeout: int = 30,
+        cache_ttl: float = 0,
+        output_format: str = "text",
+    ) -> dict:
         """Execute a command on a named node.
 
         Args:
-            name:    Registered node name.
-            command: Shell command string.
-            timeout: Maximum seconds to wait for execution. Default 30.
+            name:          Registered node name.
+            command:       Shell command string.
+            timeout:       Maximum seconds to wait for execution. Default 30.
+            cache_ttl:     Opt-in result caching for read-only commands. When > 0, a
+                           result for the same (node, command) produced on the current
+                           connection within the last cache_ttl seconds is returned
+                           without executing, and a fresh result is cached for
+                           cache_ttl seconds. Default 0 (no caching).
+            output_format: "text" (decoded, invalid bytes replaced) or "base64"
+                           (raw bytes, for binary output). Default "text".
 
         Returns:
-            CommandResult.to_dict() on success.
+            CommandResult.to_dict(output_format) on success. When cache_ttl > 0 the
+            dict also carries "cache": {"hit": bool, "age_seconds": float | None, **counters}.
+            {"error": "invalid_output_format", "output_format": ...} for an unknown format.
             {"error": "...", "name": name} on guard failure or timeout.
         """
+        if output_format not in OUTPUT_FORMATS:
+            return {"error": "invalid_output_format", "output_format": output_format}
+
         ready = self.ensure_node_ready(name)
         if isinstance(ready, dict):
             return ready
 
+        connection = ready.connection
+        if cache_ttl > 0:
+            cached = self._result_cache.get(name, command, connection.generation)
+            if cached is not None:
+                result, age = cached
+                out = result.to_dict(output_format)
+                out["cache"] = {"hit": True, "age_seconds": round(age, 3), **self._result_cache.stats()}
+                return out
+
         try:
-            result = ready.connection.execute(command, timeout=timeout)
-            return result.to_dict()
+            result = connection.execute(command, timeout=timeout)
         except TimeoutError:
             return {"error": "timeout", "name": name, "command": command}
 
+        out = result.to_dict(output_format)
+        if cache_ttl > 0:
+            self._result_cache.put(name, command, connection.generation, result, cache_ttl)
+            out["cache"] = {"hit": False, "age_seconds": None, **self._result_cache.stats()}
+        return out
+
+    def run_command_on_nodes(
+        self,
+        names: list[str],
+        command: str,
+        max_parallel: int = DEFAULT_FANOUT_PARALLEL,
+        deadline: float = DEFAULT_FANOUT_DEADLINE,
+        output_format: str = "text",
+    ) -> dict:
+        """Execute the same command on many nodes concurrently.
+
+        Each node runs through run_command_on_node() on a bounded worker pool.
+        The per-node timeout is whatever remains of the global *deadline* when
+        the node's command starts. When the deadline expires, results gathered
+        so far are returned and unfinished nodes report deadline_exceeded.
+
+        Args:
+            names:        Node names. Duplicates are ignored.
+            command:      Shell command string.
+            max_parallel: Maximum nodes executing at once. Default 16.
+            deadline:     Global deadline in seconds for the whole fan-out. Default 60.
+            output_format: "text" or "base64", as for run_command_on_node().
+
+        Returns:
+            {"status": "ok" | "partial", "command": command,
+             "results": {name: <run_command_on_node result>, ...},
+             "summary": {"total", "succeeded", "failed", "errors", "deadline_exceeded"}}
+            {"error": "invalid_max_parallel", "max_parallel": n} if max_parallel < 1.
+            {"error": "invalid_output_format", "output_format": ...} for an unknown format.
+        """
+        import time
+        from concurrent.futures import ThreadPoolExecutor, wait
+
+        if max_parallel < 1:
+            return {"error": "invalid_max_parallel", "max_parallel": max_parallel}
+        if output_format not in OUTPUT_FORMATS:
+            return {"error": "invalid_output_format", "output_format": output_format}
+
+        unique_names = list(dict.fromkeys(names))
+        expires_at = time.monotonic() + deadline
+
+        def _run_one(node_name: str) -> dict:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                return {"error": "deadline_exceeded", "name": node_name}
+            return self.run_command_on_node(node_name, command, timeout=remaining, output_format=output_format)
+
+        results: dict[str, dict] = {}
+        executor = ThreadPoolExecutor(
+            max_workers=min(max_parallel, max(len(unique_names), 1)),
+            thread_name_prefix="fanout",
+        )
+        try:
+            futures = {executor.submit(_run_one, n): n for n in unique_names}
+            wait(futures, timeout=max(deadline, 0))
+            for future, node_name in futures.items():
+                if not future.done():
+                    results[node_name] = {"error": "deadline_exceeded", "name": node_name}
+                elif future.exception() is not None:
+                    results[node_name] = {"error": "execution_failed", "name": node_name,
+                                          "detail": str(future.exception())}
+                else:
+                    results[node_name] = future.result()
+        finally:
+            # Queued nodes are dropped; running ones stop at their own (remaining) timeout.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        ordered = {n: results[n] for n in unique_names}
+        summary = {"total": len(ordered), "succeeded": 0, "failed": 0, "errors": 0, "deadline_exceeded": 0}
+        for entry in ordered.values():
+            if entry.get("error") == "deadline_exceeded":
+                summary["deadline_exceeded"] += 1
+            elif "error" in entry:
+                summary["errors"] += 1
+            elif entry.get("exit_code") == 0:
+                summary["succeeded"] += 1
+            else:
+                summary["failed"] += 1
+        return {
+            "status": "partial" if summary["deadline_exceeded"] else "ok",
+            "command": command,
+            "results": ordered,
+            "summary": summary,
+        }
+
+    # ------------------------------------------------------------------
+    # Shell session APIs
+    # ------------------------------------------------------------------
+
+    def open_session(self, name: str) -> dict:
+        """Open a persistent shell session on a named node.
+
+        Working directory, environment and shell variables persist across
+        run_in_session() calls until the session is closed.
+
+        Returns:
+            {"status": "opened", "session_id": "...", "name": name} on success.
+            {"error": "too_many_sessions", "name": name, "max_sessions": n} if the per-node cap is reached.
+            {"error": "no_free_channel", "name": name} if the connection has no free channel slot.
+            Error dict on guard failure (see ensure_node_ready).
+        """
+        ready = self.ensure_node_ready(name)
+        if isinstance(ready, dict):
+            return ready
+        if not self._sessions.has_capacity(name):
+            return {"error": "too_many_sessions", "name": name, "max_sessions": self._sessions.max_per_node}
+
+        # Read before opening: a reconnect in between then marks the session stale, never the reverse.
+        generation = ready.connection.generation
+        try:
+            session = ready.connection.open_shell_session()
+        except TimeoutError:
+            return {"error": "no_free_channel", "name": name}
+        entry = self._sessions.add(name, session, ready.connection, generation)
+        return {"status": "opened", "session_id": entry.session_id, "name": name}
+
+    def run_in_session(self, session_id: str, command: str, timeout: int = 30) -> dict:
+        """Run a command inside an open shell session.
+
+        Returns:
+            CommandResult.to_dict() plus "session_id" on success.
+            {"error": "session_not_found", "session_id": ...} if unknown, closed or reaped.
+            {"error": "session_closed", "session_id": ...} if the remote shell has exited.
+            {"error": "timeout", "session_id": ..., "command": ...} on timeout; the session is closed.
+        """
+        from agent.connectionpool.session import SessionClosed
+
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return {"error": "session_not_found", "session_id": session_id}
+
+        try:
+            result = entry.session.run(command, timeout=timeout)
+        except SessionClosed:
+            self._sessions.close(session_id)
+            return {"error": "session_closed", "session_id": session_id}
+        except TimeoutError:
+            self._sessions.close(session_id)
+            return {"error": "timeout", "session_id": session_id, "command": command}
+
+        out = result.to_dict()
+        out["session_id"] = session_id
+        return out
+
+    def close_session(self, session_id: str) -> dict:
+        """Close a shell session and release its channel.
+
+        Returns:
+            {"status": "closed", "session_id": session_id} on success.
+            {"error": "session_not_found", "session_id": session_id} if unknown.
+        """
+        if self._sessions.close(session_id) is None:
+            return {"error": "session_not_found", "session_id": session_id}
+        return {"status": "closed", "session_id": session_id}
+
+    # ------------------------------------------------------------------
+    # Background job APIs
+    # ------------------------------------------------------------------
+
+    def start_command_on_node(self, name: str, command: str, timeout: Optional[int] = None) -> dict:
+        """Start a command on a named node in the background and return immediately.
+
+        Args:
+            name:    Registered node name.
+            command: Shell command string.
+            timeout: Optional maximum seconds the job may run. None = no limit.
+
+        Returns:
+            {"status": "started", "job_id": "...", "name": name} on success.
+            {"error": "too_many_jobs", "name": name, "max_running": n} if the running-job cap is reached.
+            Error dict on guard failure (see ensure_node_ready).
+        """
+        ready = self.ensure_node_ready(name)
+        if isinstance(ready, dict):
+            return ready
+
+        job = self._jobs.start(name, command, ready.connection, timeout)
+        if job is None:
+            return {"error": "too_many_jobs", "name": name, "max_running": self._jobs.max_running}
+        return {"status": "started", "job_id": job.job_id, "name": name}
+
+    def get_job_status(self, job_id: str) -> dict:
+        """Return the state of a background job.
+
+        Returns:
+            {"job_id", "name", "command", "state", "exit_code", "started_at", "ended_at",
+             "stdout_bytes", "stderr_bytes"} — state is one of
+            "running", "completed", "failed", "timeout", "cancelled".
+            {"error": "job_not_found", "job_id": job_id} if unknown or expired.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return {"error": "job_not_found", "job_id": job_id}
+        return job.to_status()
+
+    def get_job_output(
+        self,
+        job_id: str,
+        offset: int = 0,
+        limit: int = DEFAULT_READ_LIMIT,
+        stream: str = "stdout",
+        output_format: str = "text",
+    ) -> dict:
+        """Read a slice of a job's output starting at byte *offset*.
+
+        Args:
+            job_id:        Job identifier from start_command_on_node.
+            offset:        Absolute byte offset into the stream. Pass back next_offset to continue.
+            limit:         Maximum bytes to return.
+            stream:        "stdout" or "stderr".
+            output_format: "text" (pages start and end on UTF-8 character
+                           boundaries, so a character is never split across
+                           two reads) or "base64" (raw bytes, for binary output).
+
+        Returns:
+            {"job_id", "stream", "offset", "next_offset", "data", "first_offset",
+             "total_bytes", "state", "complete"} — offset may be greater than the requested
+            offset if older output was dropped (first_offset marks the oldest retained byte).
+            complete is True once the job has finished and all output has been read.
+            "output_format" is added for base64 pages.
+            {"error": "job_not_found", "job_id": job_id} if unknown or expired.
+            {"error": "invalid_stream", "stream": stream} for an unknown stream name.
+            {"error": "invalid_output_format", "output_format": ...} for an unknown format.
+        """
+        if stream not in ("stdout", "stderr"):
+            return {"error": "invalid_stream", "stream": stream}
+        if output_format not in OUTPUT_FORMATS:
+            return {"error": "invalid_output_format", "output_format": output_format}
+        job = self._jobs.get(job_id)
+        if job is None:
+            return {"error": "job_not_found", "job_id": job_id}
+
+        finished = job.finished  # sample before reading so no output is missed
+        output = job.stdout if stream == "stdout" else job.stderr
+        if output_format == "base64":
+            import base64
+            data, start, first_offset, total = output.read(offset, max(limit, 0))
+            text = base64.b64encode(data).decode("ascii")
+        else:
+            data, start, first_offset, total = output.read_text(offset, max(limit, 0), final=finished)
+            text = data.decode("utf-8", errors="replace")
+        next_offset = start + len(data)
+        page = {
+            "job_id": job_id,
+            "stream": stream,
+            "offset": start,
+            "next_offset": next_offset,
+            "data": text,
+            "first_offset": first_offset,
+            "total_bytes": total,
+            "state": job.to_status()["state"],
+            "complete": finished and next_offset >= total,
+        }
+        if output_format != "text":
+            page["output_format"] = output_format
+        return page
+
+    def cancel_job(self, job_id: str) -> dict:
+        """Request cancellation of a running background job.
+
+        Returns:
+            {"status": "cancelling", "job_id": job_id} if the job was running.
+            {"status": "<state>", "job_id": job_id} if it had already finished.
+            {"error": "job_not_found", "job_id": job_id} if unknown or expired.
+        """
+        job = self._jobs.cancel(job_id)
+        if job is None:
+            return {"error": "job_not_found", "job_id": job_id}
+        if job.finished:
+            return {"status": job.to_status()["state"], "job_id": job_id}
+        return {"status": "cancelling", "job_id": job_id}
+
     # ------------------------------------------------------------------
     # File transfer APIs (Phase 6)
     # ------------------------------------------------------------------
 
-    def upload_file_to_node(self, name: str, remote_path: str, data_b64: str, mode: str = "0644") -> dict:
+    def upload_file_to_node(
+        self, name: str, remote_path: str, data_b64: str, mode: str = "0644", atomic: bool = False
+    ) -> dict:
         """Upload a base64-encoded file to a named node.
 
+        Uploads are deduplicated: if this gateway already uploaded identical
+        content (same sha256) with the same mode to the same path, and the
+        remote file's size, mtime and mode still match what that upload left
+        behind, nothing is transferred (see UploadCache).
+
+        With *atomic*, the file is written to a temporary sibling, checked
+        against the node's own sha256sum and renamed into place, so an
+        interrupted or corrupted transfer never replaces *remote_path*
+        (see Connection.upload_data_atomic).
+
         Args:
             name:        Registered node name.
             remote_path: Absolute path on the remote node.
             data_b64:    Base64-encoded file content.
             mode:        Unix permission mode string. Default "0644".
+            atomic:      Verify and rename into place instead of writing in place.
 
         Returns:
-            {"status": "written", "path": remote_path} on success.
-            Error dict on guard failure or upload error.
+            {"status": "written", "path": remote_path, "sha256": "..."} after an upload;
+                atomic uploads add "verified": True.
+            {"status": "unchanged", "path": remote_path, "sha256": "..."} if the node already
+                has this content.
+            {"error": "invalid_base64", "path": remote_path} on bad base64 input.
+            {"error": "invalid_mode", "path": remote_path, "mode": mode} on bad mode string.
+            {"error": "verification_failed" | "upload_failed", ...} if an atomic upload's check fails.
+            {"error": "timeout", "name": name, "path": remote_path} if the remote check times out.
+            Error dict on guard failure.
         """
+        import base64
+        import binascii
+        import hashlib
+        import re
+
+        try:
+            data = base64.b64decode(data_b64, validate=True)
+        except (binascii.Error, ValueError):
+            return {"error": "invalid_base64", "path": remote_path}
+        if not re.match(r'^[0-7]{3,4}$', mode):
+            return {"error": "invalid_mode", "path": remote_path, "mode": mode}
+
+        return self._upload_bytes(name, remote_path, data, hashlib.sha256(data).hexdigest(), mode, atomic)
+
+    def _upload_bytes(
+        self, name: str, remote_path: str, data: bytes, digest: str, mode: str, atomic: bool = False
+    ) -> dict:
+        """Guarded, deduplicated upload of decoded *data* (sha256 *digest*) with a validated *mode*."""
         ready = self.ensure_node_ready(name)
         if isinstance(ready, dict):
             return ready
-        return ready.connection.upload_file(remote_path, data_b64, mode)
+        connection = ready.connection
 
-    def download_file_from_node(self, name: str, remote_path: str) -> dict:
-        """Download a file from a named node, returning base64-encoded content.
+        cached = self._upload_cache.get(name, remote_path)
+        if cached is not None and cached.sha256 == digest and int(cached.mode, 8) == int(mode, 8):
+            try:
+                current = connection.stat_file(remote_path)
+            except IOError:
+                current = None
+            if current == {"size": cached.size, "mtime": cached.mtime, "mode": int(mode, 8)}:
+                self._upload_cache.record_hit()
+                return {"status": "unchanged", "path": remote_path, "sha256": digest}
+        self._upload_cache.record_miss()
+
+        self._upload_cache.invalidate(name, remote_path)
+        if atomic:
+            try:
+                attrs = connection.upload_data_atomic(remote_path, data, mode)
+            except TimeoutError:
+                return {"error": "timeout", "name": name, "path": remote_path}
+            if "error" in attrs:
+                return attrs
+        else:
+            attrs = connection.upload_data(remote_path, data, mode)
+        self._upload_cache.put(
+            name,
+            remote_path,
+            UploadRecord(sha256=digest, size=attrs["size"], mtime=attrs["mtime"], mode=mode),
+        )
+        result = {"status": "written", "path": remote_path, "sha256": digest}
+        if atomic:
+            result["verified"] = True
+        return result
+
+    def distribute_file(
+        self,
+        names: list[str],
+        remote_path: str,
+        data_b64: str,
+        mode: str = "0644",
+        max_parallel: int = DEFAULT_FANOUT_PARALLEL,
+        atomic: bool = False,
+    ) -> dict:
+        """Upload the same file to many nodes concurrently.
+
+        The payload is decoded and hashed once; every node's SFTP writer reads
+        from the same immutable bytes object. Each node goes through the same
+        guards and upload deduplication as upload_file_to_node().
+
+        Args:
+            names:        Node names. Duplicates are ignored.
+            remote_path:  Absolute path on every node.
+            data_b64:     Base64-encoded file content.
+            mode:         Unix permission mode string. Default "0644".
+            max_parallel: Maximum concurrent uploads. Default 16.
+            atomic:       Verified temp-file-and-rename upload on every node, as for
+                          upload_file_to_node().
+
+        Returns:
+            {"status": "ok" | "partial", "path": remote_path, "sha256": "...", "size_bytes": n,
+             "elapsed_seconds": s,
+             "results": {name: {<upload_file_to_node result>, "elapsed_seconds": s}, ...},
+             "summary": {"total", "written", "unchanged", "errors"}}
+            "partial" means at least one node returned an error.
+            {"error": "invalid_base64" | "invalid_mode", ...} on bad input.
+            {"error": "invalid_max_parallel", "max_parallel": n} if max_parallel < 1.
+        """
+        import base64
+        import binascii
+        import hashlib
+        import re
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        if max_parallel < 1:
+            return {"error": "invalid_max_parallel", "max_parallel": max_parallel}
+        try:
+            data = base64.b64decode(data_b64, validate=True)
+        except (binascii.Error, ValueError):
+            return {"error": "invalid_base64", "path": remote_path}
+        if not re.match(r'^[0-7]{3,4}$', mode):
+            return {"error": "invalid_mode", "path": remote_path, "mode": mode}
+
+        digest = hashlib.sha256(data).hexdigest()
+        unique_names = list(dict.fromkeys(names))
+        started = time.monotonic()
+
+        def _upload_one(node_name: str) -> dict:
+            node_started = time.monotonic()
+            try:
+                result = self._upload_bytes(node_name, remote_path, data, digest, mode, atomic)
+            except Exception as e:
+                result = {"error": "upload_failed", "name": node_name, "path": remote_path, "detail": str(e)}
+            result["elapsed_seconds"] = round(time.monotonic() - node_started, 3)
+            return result
+
+        with ThreadPoolExecutor(
+            max_workers=min(max_parallel, max(len(unique_names), 1)),
+            thread_name_prefix="distribute",
+        ) as executor:
+            results = dict(zip(unique_names, executor.map(_upload_one, unique_names)))
+
+        summary = {"total": len(results), "written": 0, "unchanged": 0, "errors": 0}
+        for entry in results.values():
+            if "error" in entry:
+                summary["errors"] += 1
+            else:
+                summary[entry["status"]] += 1
+        return {
+            "status": "partial" if summary["errors"] else "ok",
+            "path": remote_path,
+            "sha256": digest,
+            "size_bytes": len(data),
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+            "results": results,
+            "summary": summary,
+        }
+
+    def sync_file_to_node(
+        self,
+        name: str,
+        remote_path: str,
+        data_b64: str,
+        mode: str = "0644",
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> dict:
+        """Synchronise a file on a named node, transferring only changed blocks.
+
+        The node computes block digests of its current copy; only differing
+        blocks cross the link, and the new file replaces the old one atomically
+        (see Connection.sync_file).
 
         Args:
             name:        Registered node name.
             remote_path: Absolute path on the remote node.
+            data_b64:    Base64-encoded desired file content.
+            mode:        Unix permission mode string. Default "0644".
+            block_size:  Comparison block size in bytes (4 KiB - 16 MiB). Default 128 KiB;
+                         grown automatically for very large files.
 
         Returns:
-            {"status": "ok", "path": remote_path, "data_b64": "..."} on success.
+            {"status": "synced" | "unchanged", "transfer": "delta" | "full" | "none",
+             "bytes_sent": n, "bytes_total": n, ...} on success.
+            {"error": "invalid_base64" | "invalid_mode" | "invalid_block_size", ...} on bad input.
+            {"error": "timeout", "name": name, "path": remote_path} if a remote step times out.
+            {"error": "sync_failed" | "verification_failed", ...} on remote failure.
+            Error dict on guard failure.
+        """
+        import base64
+        import binascii
+        import re
+        from agent.connectionpool.delta import MIN_BLOCK_SIZE, MAX_BLOCK_SIZE
+
+        try:
+            data = base64.b64decode(data_b64, validate=True)
+        except (binascii.Error, ValueError):
+            return {"error": "invalid_base64", "path": remote_path}
+        if not re.match(r'^[0-7]{3,4}$', mode):
+            return {"error": "invalid_mode", "path": remote_path, "mode": mode}
+        if not MIN_BLOCK_SIZE <= block_size <= MAX_BLOCK_SIZE:
+            return {
+                "error": "invalid_block_size",
+                "block_size": block_size,
+                "min_block_size": MIN_BLOCK_SIZE,
+                "max_block_size": MAX_BLOCK_SIZE,
+            }
+
+        ready = self.ensure_node_ready(name)
+        if isinstance(ready, dict):
+            return ready
+        self._upload_cache.invalidate(name, remote_path)
+        try:
+            return ready.connection.sync_file(remote_path, data, mode, block_size)
+        except TimeoutError:
+            return {"error": "timeout", "name": name, "path": remote_path}
+        except IOError as e:
+            return {"error": "sync_failed", "path": remote_path, "detail": str(e)}
+
+    def download_file_from_node(
+        self,
+        name: str,
+        remote_path: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ) -> dict:
+        """Download a file from a named node, returning base64-encoded content.
+
+        Without offset/length/continuation_token the whole file is returned
+        (subject to the connection's 10 MB limit). Otherwise one page of at
+        most *length* bytes (default 1 MiB, max 4 MiB) starting at *offset* is
+        returned, with no file size limit. Pages that do not reach the end of
+        the file carry a "continuation_token" for the next page.
+
+        Args:
+            name:               Registered node name.
+            remote_path:        Absolute path on the remote node.
+            offset:             Byte offset of the page. Default 0 for ranged reads.
+            length:             Page size in bytes.
+            continuation_token: Token from a previous page; replaces *offset*.
+
+        Returns:
+            {"status": "ok", "path": remote_path, "data_b64": "..."} for a whole-file download.
+            {"status": "ok", "path", "offset", "length", "size_bytes", "eof", "data_b64",
+             "continuation_token": "..." | None} for a ranged read.
+            {"error": "invalid_range", ...} for a negative offset or out-of-range length.
+            {"error": "invalid_continuation_token", ...} for a malformed token or one
+                issued for another node or path.
             Error dict on guard failure or download error.
         """
+        ranged = offset is not None or length is not None or continuation_token is not None
+        if ranged:
+            if continuation_token is not None:
+                offset = _decode_download_token(continuation_token, name, remote_path)
+                if offset is None:
+                    return {"error": "invalid_continuation_token", "name": name, "path": remote_path}
+            offset = 0 if offset is None else offset
+            length = DEFAULT_DOWNLOAD_PAGE_BYTES if length is None else length
+            if offset < 0 or not 0 < length <= MAX_DOWNLOAD_PAGE_BYTES:
+                return {
+                    "error": "invalid_range",
+                    "path": remote_path,
+                    "offset": offset,
+                    "length": length,
+                    "max_length": MAX_DOWNLOAD_PAGE_BYTES,
+                }
+
+        ready = self.ensure_node_ready(name)
+        if isinstance(ready, dict):
+            return ready
+        if not ranged:
+            return ready.connection.download_file(remote_path)
+
+        page = ready.connection.download_file_range(remote_path, offset, length)
+        if "error" not in page:
+            next_offset = page["offset"] + page["length"]
+            page["continuation_token"] = (
+                None if page["eof"] else _encode_download_token(name, remote_path, next_offset)
+            )
+        return page
+
+    def copy_between_nodes(
+        self,
+        src: str,
+        src_path: str,
+        dst: str,
+        dst_path: str,
+        mode: Optional[str] = None,
+    ) -> dict:
+        """Copy a file from one node to another through the gateway.
+
+        The file is piped from an SFTP read handle on *src* into a pipelined
+        SFTP write handle on *dst* in COPY_CHUNK_BYTES steps, so the gateway
+        holds one chunk at a time and nothing crosses the MCP boundary. The
+        data lands in a temporary sibling of *dst_path* that is renamed into
+        place once complete; a failed copy leaves *dst_path* untouched.
+
+        If a step fails (typically a dropped connection), both connections are
+        reopened and the copy resumes from what the temporary file actually
+        holds, up to MAX_TRANSFER_RESUMES times. Progress is visible through
+        get_transfer_status() while the copy runs.
+
+        Args:
+            src:      Source node name.
+            src_path: Absolute path of the file on *src*.
+            dst:      Destination node name (may equal *src*).
+            dst_path: Absolute destination path on *dst*.
+            mode:     Permission mode for the copy. Default: the source file's mode.
+
+        Returns:
+            {"status": "copied", "transfer_id": ..., "src": src, "src_path": ..., "dst": dst,
+             "dst_path": ..., "bytes_copied": n, "mode": "0644", "resumes": n, "elapsed_seconds": s}
+            {"error": "invalid_mode", "path": dst_path, "mode": mode} on bad mode string.
+            {"error": "file_not_found", "name": src, "path": src_path} if the source is missing.
+            {"error": "copy_failed", "transfer_id": ..., "src": src, "dst": dst, "detail": "..."}
+                if a read or write keeps failing.
+            Error dict on guard failure of either node.
+        """
+        import posixpath
+        import re
+        import time
+        import uuid
+
+        if mode is not None and not re.match(r'^[0-7]{3,4}$', mode):
+            return {"error": "invalid_mode", "path": dst_path, "mode": mode}
+
+        src_ready = self.ensure_node_ready(src)
+        if isinstance(src_ready, dict):
+            return src_ready
+        dst_ready = self.ensure_node_ready(dst)
+        if isinstance(dst_ready, dict):
+            return dst_ready
+        source, target = src_ready.connection, dst_ready.connection
+
+        started = time.monotonic()
+        transfer_id = uuid.uuid4().hex
+        failure = {"error": "copy_failed", "transfer_id": transfer_id, "src": src, "dst": dst}
+        try:
+            attrs = source.stat_file(src_path)
+        except IOError as e:
+            return {**failure, "detail": str(e)}
+        if attrs is None:
+            return {"error": "file_not_found", "name": src, "path": src_path}
+        if mode is None:
+            mode = f"{attrs['mode']:04o}"
+        size = attrs["size"]
+
+        directory, base = posixpath.split(dst_path)
+        tmp_path = posixpath.join(directory, f".{base}.copy-{transfer_id[:8]}")
+        self._upload_cache.invalidate(dst, dst_path)
+        self._transfers.start(
+            transfer_id, "copy", dst, dst_path, total_bytes=size, source={"node": src, "path": src_path}
+        )
+        reader = writer = None
+        copied = resumes = 0
+        tmp_created = False
+        try:
+            reader = source.open_remote_file(src_path, "rb")
+            writer = target.open_remote_file(tmp_path, "wb", pipelined=True)
+            tmp_created = True
+            while copied < size:
+                try:
+                    chunk = source.read_remote_file(reader, copied, min(COPY_CHUNK_BYTES, size - copied))
+                    if not chunk:
+                        break  # The source shrank while being copied.
+                    target.write_remote_file(writer, chunk)
+                except Exception as e:
+                    if resumes >= MAX_TRANSFER_RESUMES:
+                        raise
+                    resumes += 1
+                    logging.warning(f"⚠️ Copy {transfer_id} interrupted at {copied} bytes ({e}); resuming")
+                    self._transfers.set_state(transfer_id, "interrupted", str(e))
+                    source.close_remote_file(reader)
+                    target.close_remote_file(writer)
+                    reader = writer = None
+                    time.sleep(TRANSFER_RESUME_DELAY * resumes)
+                    source = self._reopen_connection(src, source)
+                    target = self._reopen_connection(dst, target)
+                    if source is None or target is None:
+                        raise IOError(f"connection lost and could not be reopened: {e}") from e
+                    # Pipelined writes may not all have landed; trust the file, not our counter.
+                    landed = target.stat_file(tmp_path)
+                    copied = min(copied, landed["size"] if landed else 0)
+                    writer = target.reopen_remote_file(tmp_path, copied, pipelined=True)
+                    reader = source.open_remote_file(src_path, "rb")
+                    self._transfers.resumed(transfer_id, copied)
+                    continue
+                copied += len(chunk)
+                self._transfers.checkpoint(transfer_id, copied)
+            target.finish_remote_file(writer, tmp_path, mode)
+            target.rename_remote_file(tmp_path, dst_path)
+        except Exception as e:
+            if target is not None and tmp_created:
+                target.abort_remote_file(writer, tmp_path)
+            self._transfers.set_state(transfer_id, "failed", str(e))
+            return {**failure, "detail": str(e)}
+        finally:
+            if source is not None and reader is not None:
+                source.close_remote_file(reader)
+
+        self._transfers.set_state(transfer_id, "completed")
+        return {
+            "status": "copied",
+            "transfer_id": transfer_id,
+            "src": src,
+            "src_path": src_path,
+            "dst": dst,
+            "dst_path": dst_path,
+            "bytes_copied": copied,
+            "mode": mode,
+            "resumes": resumes,
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+        }
+
+    # ------------------------------------------------------------------
+    # Directory tree transfer APIs
+    # ------------------------------------------------------------------
+
+    def upload_tree(self, name: str, remote_dir: str, files: list[dict], compress: bool = False) -> dict:
+        """Write many files under *remote_dir* on a named node in one tar stream.
+
+        The files travel as a single tar archive (gzip-compressed if *compress*)
+        into `tar -x` on the node, avoiding a per-file SFTP round trip. Missing
+        directories are created; existing files are overwritten.
+
+        Args:
+            name:       Registered node name.
+            remote_dir: Directory on the remote node; created if missing.
+            files:      [{"path": "relative/path", "data_b64": "...", "mode": "0644"}, ...].
+                        "mode" is optional (default "0644"); paths must stay inside remote_dir.
+            compress:   gzip the stream (worthwhile for text over slow links).
+
+        Returns:
+            {"status": "written", "path": remote_dir, "files": n, "bytes_total": n, "bytes_sent": n}
+            {"error": "invalid_tree_entry", "index": i, "detail": "..."} for a malformed entry.
+            {"error": "timeout", "name": name, "path": remote_dir} if the transfer times out.
+            {"error": "tree_failed", "path": remote_dir, "exit_code": n, "stderr": "..."} if tar fails.
+            Error dict on guard failure.
+        """
+        import base64
+        import binascii
+        import posixpath
+        import re
+        from agent.connectionpool.tarstream import is_safe_member_path
+
+        for index, entry in enumerate(files):
+            if not isinstance(entry, dict) or not isinstance(entry.get("path"), str):
+                return {"error": "invalid_tree_entry", "index": index, "detail": "entry needs a string 'path'"}
+            if not is_safe_member_path(entry["path"]):
+                return {"error": "invalid_tree_entry", "index": index, "detail": "path must be relative, inside remote_dir"}
+            if not re.match(r'^[0-7]{3,4}$', str(entry.get("mode", "0644"))):
+                return {"error": "invalid_tree_entry", "index": index, "detail": "invalid mode"}
+            try:
+                # Validate only; entries are decoded again one at a time while streaming.
+                base64.b64decode(entry.get("data_b64", ""), validate=True)
+            except (binascii.Error, ValueError, TypeError):
+                return {"error": "invalid_tree_entry", "index": index, "detail": "invalid base64"}
+
         ready = self.ensure_node_ready(name)
         if isinstance(ready, dict):
             return ready
-        return ready.connection.download_file(remote_path)
+
+        for entry in files:
+            self._upload_cache.invalidate(name, posixpath.join(remote_dir, posixpath.normpath(entry["path"])))
+        entries = (
+            (e["path"], base64.b64decode(e["data_b64"]), int(str(e.get("mode", "0644")), 8)) for e in files
+        )
+        try:
+            return ready.connection.upload_tree(remote_dir, entries, compress)
+        except TimeoutError:
+            return {"error": "timeout", "name": name, "path": remote_dir}
+
+    def download_tree(self, name: str, remote_dir: str, compress: bool = False) -> dict:
+        """Read every regular file under *remote_dir* on a named node in one tar stream.
+
+        Args:
+            name:       Registered node name.
+            remote_dir: Directory on the remote node.
+            compress:   gzip the stream on the node.
+
+        Returns:
+            {"status": "ok", "path": remote_dir,
+             "files": [{"path": "relative/path", "mode": "0644", "size_bytes": n, "data_b64": "..."}, ...],
+             "skipped": ["relative/link", ...], "bytes_total": n, "bytes_received": n}
+            "skipped" lists symlinks and other non-regular files, which are not transferred.
+            {"error": "tree_too_large", "path": remote_dir, "limit_bytes": n} past the 10 MB content limit.
+            {"error": "timeout", "name": name, "path": remote_dir} if the transfer times out.
+            {"error": "tree_failed", "path": remote_dir, "exit_code": n, "stderr": "..."} if tar fails
+                (e.g. the directory does not exist).
+            Error dict on guard failure.
+        """
+        import base64
+
+        ready = self.ensure_node_ready(name)
+        if isinstance(ready, dict):
+            return ready
+        try:
+            result = ready.connection.download_tree(remote_dir, compress)
+        except TimeoutError:
+            return {"error": "timeout", "name": name, "path": remote_dir}
+        if "error" in result:
+            return result
+        result["files"] = [
+            {"path": path, "mode": f"{mode:04o}", "size_bytes": len(data), "data_b64": base64.b64encode(data).decode()}
+            for path, data, mode in result["files"]
+        ]
+        return result
+
+    # ------------------------------------------------------------------
+    # Chunked upload APIs
+    # ------------------------------------------------------------------
+
+    def begin_upload(self, name: str, remote_path: str, mode: str = "0644") -> dict:
+        """Start a chunked upload to a named node.
+
+        Opens *remote_path* for writing; chunks sent with upload_chunk() are
+        written straight to it, so gateway memory is bounded by one chunk.
+        The upload_id doubles as a transfer id for get_transfer_status().
+
+        Returns:
+            {"status": "started", "upload_id": "...", "name": name, "path": remote_path,
+             "max_chunk_bytes": n} on success.
+            {"error": "invalid_mode", "path": remote_path, "mode": mode} on bad mode string.
+            {"error": "too_many_uploads", "max_uploads": n} if the upload cap is reached.
+            {"error": "upload_failed", "path": remote_path, "detail": "..."} if the file cannot be opened.
+            Error dict on guard failure (see ensure_node_ready).
+        """
+        import re
+
+        if not re.match(r'^[0-7]{3,4}$', mode):
+            return {"error": "invalid_mode", "path": remote_path, "mode": mode}
+
+        ready = self.ensure_node_ready(name)
+        if isinstance(ready, dict):
+            return ready
+        if not self._uploads.has_capacity():
+            return {"error": "too_many_uploads", "max_uploads": self._uploads.max_uploads}
+
+        connection = ready.connection
+        self._upload_cache.invalidate(name, remote_path)
+        try:
+            handle = connection.open_remote_file(remote_path, "wb")
+        except IOError as e:
+            return {"error": "upload_failed", "path": remote_path, "detail": str(e)}
+        entry = self._uploads.add(name, remote_path, mode, connection, handle)
+        self._transfers.start(entry.upload_id, "upload", name, remote_path)
+        return {
+            "status": "started",
+            "upload_id": entry.upload_id,
+            "name": name,
+            "path": remote_path,
+            "max_chunk_bytes": MAX_CHUNK_BYTES,
+        }
+
+    def _reopen_connection(self, name: str, connection):
+        """Return an open connection for *name* after a transfer step failed on *connection*, or None.
+
+        A dropped transport is only noticed by the periodic health check, so
+        probe it first; a BROKEN connection is then reopened by the pool.
+        """
+        connection.check_transport()
+        return self._pool.ensure_connection_open(name)
+
+    def _resume_upload(self, entry) -> bool:
+        """Reopen an upload's remote file at its confirmed offset. Caller holds entry.lock.
+
+        Returns False (entry left interrupted, handle None) if the node cannot
+        be reached; raises if the file cannot be reopened.
+        """
+        if entry.handle is not None:
+            entry.connection.close_remote_file(entry.handle)
+            entry.handle = None
+        connection = self._reopen_connection(entry.node, entry.connection)
+        if connection is None:
+            self._transfers.set_state(entry.upload_id, "interrupted", "connection lost; node unreachable")
+            return False
+        entry.connection = connection
+        entry.handle = connection.reopen_remote_file(entry.remote_path, entry.bytes_received)
+        self._transfers.resumed(entry.upload_id, entry.bytes_received)
+        return True
+
+    def upload_chunk(self, upload_id: str, offset: int, data_b64: str) -> dict:
+        """Write one base64-encoded chunk of a chunked upload.
+
+        Chunks must be sent in order: *offset* must equal the bytes received so far.
+
+        A failed write is retried once after reopening the remote file at the
+        last confirmed offset, reconnecting first if the transport dropped. If
+        the node cannot be reached, the upload is kept and reported as
+        interrupted; resend the same chunk later to resume.
+
+        Returns:
+            {"status": "ok", "upload_id": ..., "bytes_received": n} on success
+                ("resumed": True if the upload had to be reopened).
+            {"error": "upload_not_found", "upload_id": ...} if unknown, finished or reaped.
+            {"error": "offset_mismatch", "upload_id": ..., "expected_offset": n} for an out-of-order chunk.
+            {"error": "invalid_base64", "upload_id": ...} on bad base64 input.
+            {"error": "chunk_too_large", "upload_id": ..., "max_chunk_bytes": n} if the chunk is too big.
+            {"error": "upload_interrupted", "upload_id": ..., "expected_offset": n} if the connection
+                was lost and cannot be reopened yet.
+            {"error": "upload_failed", "upload_id": ..., "detail": "..."} if the write still fails
+                after reopening; the upload is aborted.
+        """
+        import base64
+        import binascii
+
+        entry = self._uploads.get(upload_id)
+        if entry is None:
+            return {"error": "upload_not_found", "upload_id": upload_id}
+        # Reject oversized chunks before decoding them (4 base64 chars per 3 bytes).
+        if len(data_b64) > (MAX_CHUNK_BYTES + 2) // 3 * 4:
+            return {"error": "chunk_too_large", "upload_id": upload_id, "max_chunk_bytes": MAX_CHUNK_BYTES}
+        try:
+            data = base64.b64decode(data_b64, validate=True)
+        except (binascii.Error, ValueError):
+            return {"error": "invalid_base64", "upload_id": upload_id}
+
+        with entry.lock:
+            if offset != entry.bytes_received:
+                return {"error": "offset_mismatch", "upload_id": upload_id, "expected_offset": entry.bytes_received}
+            resumed = False
+            try:
+                try:
+                    if entry.handle is None:
+                        raise IOError("upload was interrupted")
+                    entry.connection.write_remote_file(entry.handle, data)
+                except Exception:
+                    if not self._resume_upload(entry):
+                        return {
+                            "error": "upload_interrupted",
+                            "upload_id": upload_id,
+                            "expected_offset": entry.bytes_received,
+                        }
+                    resumed = True
+                    entry.connection.write_remote_file(entry.handle, data)
+            except Exception as e:
+                error = {"error": "upload_failed", "upload_id": upload_id, "detail": str(e)}
+            else:
+                entry.bytes_received += len(data)
+                self._transfers.checkpoint(upload_id, entry.bytes_received)
+                out = {"status": "ok", "upload_id": upload_id, "bytes_received": entry.bytes_received}
+                if resumed:
+                    out["resumed"] = True
+                return out
+        # Abort outside entry.lock: the registry takes it while discarding.
+        self._uploads.abort(upload_id)
+        self._transfers.set_state(upload_id, "failed", error["detail"])
+        return error
+
+    def commit_upload(self, upload_id: str) -> dict:
+        """Finish a chunked upload: close the remote file and apply its mode.
+
+        An interrupted upload is reopened first, so a commit after a
+        reconnect needs no extra step.
+
+        Returns:
+            {"status": "written", "upload_id": ..., "path": ..., "bytes_written": n} on success.
+            {"error": "upload_not_found", "upload_id": ...} if unknown, finished or reaped.
+            {"error": "upload_interrupted", "upload_id": ..., "expected_offset": n} if the node
+                is still unreachable; the upload is kept.
+            {"error": "upload_failed", "upload_id": ..., "detail": "..."} if closing fails;
+                the upload is aborted.
+        """
+        entry = self._uploads.get(upload_id)
+        if entry is None:
+            return {"error": "upload_not_found", "upload_id": upload_id}
+        with entry.lock:
+            try:
+                if entry.handle is None and not self._resume_upload(entry):
+                    return {"error": "upload_interrupted", "upload_id": upload_id, "expected_offset": entry.bytes_received}
+                if self._uploads.pop(upload_id) is None:
+                    # Reaped or aborted while we waited for the entry lock.
+                    return {"error": "upload_not_found", "upload_id": upload_id}
+                entry.connection.finish_remote_file(entry.handle, entry.remote_path, entry.mode)
+            except Exception as e:
+                self._uploads.pop(upload_id)
+                entry.connection.abort_remote_file(entry.handle, entry.remote_path)
+                self._transfers.set_state(upload_id, "failed", str(e))
+                return {"error": "upload_failed", "upload_id": upload_id, "detail": str(e)}
+        self._transfers.set_state(upload_id, "completed")
+        return {
+            "status": "written",
+            "upload_id": upload_id,
+            "path": entry.remote_path,
+            "bytes_written": entry.bytes_received,
+        }
+
+    def abort_upload(self, upload_id: str) -> dict:
+        """Abandon a chunked upload and remove the partial remote file.
+
+        Returns:
+            {"status": "aborted", "upload_id": upload_id} on success.
+            {"error": "upload_not_found", "upload_id": upload_id} if unknown.
+        """
+        if self._uploads.abort(upload_id) is None:
+            return {"error": "upload_not_found", "upload_id": upload_id}
+        self._transfers.set_state(upload_id, "aborted")
+        return {"status": "aborted", "upload_id": upload_id}
+
+    # ------------------------------------------------------------------
+    # Transfer progress
+    # ------------------------------------------------------------------
+
+    def get_transfer_status(self, transfer_id: Optional[str] = None) -> dict:
+        """Report progress of chunked uploads and node-to-node copies.
+
+        Args:
+            transfer_id: An upload_id or a copy's transfer_id. None lists every known transfer.
+
+        Returns:
+            {"transfer_id", "kind": "upload" | "copy", "state", "node", "path", "confirmed_bytes",
+             "total_bytes", "resumes", "started_at", "updated_at", ["source"], ["detail"]}
+            {"transfers": [<record>, ...]} when transfer_id is None.
+            {"error": "transfer_not_found", "transfer_id": ...} if unknown or pruned.
+
+            "state" is running, interrupted, completed, failed, aborted or expired
+            (a chunked upload reaped for inactivity).
+        """
+        if transfer_id is None:
+            records = self._transfers.list()
+            for record in records:
+                self._expire_if_reaped(record)
+            return {"transfers": records}
+        record = self._transfers.get(transfer_id)
+        if record is None:
+            return {"error": "transfer_not_found", "transfer_id": transfer_id}
+        self._expire_if_reaped(record)
+        return record
+
+    def _expire_if_reaped(self, record: dict) -> None:
+        if (
+            record["kind"] == "upload"
+            and record["state"] in ("running", "interrupted")
+            and not self._uploads.exists(record["transfer_id"])
+        ):
+            self._transfers.set_state(record["transfer_id"], "expired")
+            record["state"] = "expired"
@@ -0,0 +1,107 @@
+"""
+SessionRegistry — tracks persistent shell sessions opened on nodes.
+
+Each entry maps a session id to a `ShellSession` (connection layer) plus the
+owning node name. Sessions hold a channel slot on their connection, so the
+registry caps sessions per node.
+
+Reaping:
+  - There is no reaper thread; `has_capacity()` and `get()` first close
+    sessions unused for longer than `idle_timeout` seconds, sessions whose
+    shell or channel has ended, and sessions opened before their connection
+    reconnected (recorded `generation` is stale), releasing their slots.
+  - `close_node()` closes every session of a node at once (node disable
+    and removal).
+"""
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+DEFAULT_MAX_SESSIONS_PER_NODE = 4
+DEFAULT_IDLE_TIMEOUT = 900  # seconds
+
+
+@dataclass
+class SessionEntry:
+    """Registry record for one open shell session."""
+
+    session_id: str
+    node: str
+    session: object  # ShellSession
+    connection: object = None  # owning connection, for its generation
+    generation: Optional[int] = None  # connection generation the session was opened on
+    last_used: float = field(default_factory=time.monotonic)
+
+    def stale(self) -> bool:
+        """True once the shell has ended or the connection has reconnected since the open."""
+        if not self.session.alive:
+            return True
+        return self.connection is not None and self.connection.generation != self.generation
+
+
+class SessionRegistry:
+    """Thread-safe registry of open shell sessions."""
+
+    def __init__(
+        self,
+        max_per_node: int = DEFAULT_MAX_SESSIONS_PER_NODE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ) -> None:
+        self.max_per_node = max_per_node
+        self.idle_timeout = idle_timeout
+        self._entries: dict[str, SessionEntry] = {}
+        self._lock = threading.Lock()
+
+    def has_capacity(self, node: str) -> bool:
+        """Return True if another session may be opened on *node*."""
+        self._reap()
+        with self._lock:
+            return sum(1 for e in self._entries.values() if e.node == node) < self.max_per_node
+
+    def add(self, node: str, session, connection=None, generation: Optional[int] = None) -> SessionEntry:
+        """Register *session*, opened on *connection* while it was at *generation*."""
+        entry = SessionEntry(
+            session_id=uuid.uuid4().hex, node=node, session=session, connection=connection, generation=generation
+        )
+        with self._lock:
+            self._entries[entry.session_id] = entry
+        return entry
+
+    def get(self, session_id: str) -> Optional[SessionEntry]:
+        """Return the entry and mark it used, or None if unknown (or reaped)."""
+        self._reap()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+            return entry
+
+    def close(self, session_id: str) -> Optional[SessionEntry]:
+        """Remove and close a session. Returns the entry, or None if unknown."""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            entry.session.close()
+        return entry
+
+    def close_node(self, node: str) -> int:
+        """Close every session on *node*. Returns the number closed."""
+        with self._lock:
+            doomed = [e for e in self._entries.values() if e.node == node]
+            for e in doomed:
+                del self._entries[e.session_id]
+        for e in doomed:
+            e.session.close()
+        return len(doomed)
+
+    def _reap(self) -> None:
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            doomed = [e for e in self._entries.values() if e.last_used < cutoff or e.stale()]
+            for e in doomed:
+                del self._entries[e.session_id]
+        for e in doomed:
+            e.session.close()
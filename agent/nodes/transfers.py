@@ -0,0 +1,125 @@
+"""
+TransferRegistry — progress records for resumable gateway transfers.
+
+A record is kept for every chunked upload (keyed by its upload_id) and every
+node-to-node copy. It tracks the confirmed offset (bytes known to be on the
+destination), how often the transfer had to resume after a connection loss,
+and its state:
+
+  running      data is flowing
+  interrupted  the connection dropped and could not be reopened yet; a
+               chunked upload resumes on the client's next upload_chunk
+  completed / failed / aborted / expired   terminal
+
+NodeService owns the resume logic; this module only records progress so it
+can be queried by transfer id while the transfer runs and for a while after.
+Terminal records are pruned oldest-first beyond `max_finished`; a pruned
+id is reported as transfer_not_found.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+DEFAULT_MAX_FINISHED = 256
+TERMINAL_STATES = ("completed", "failed", "aborted", "expired")
+
+
+@dataclass
+class TransferRecord:
+    """Progress of one upload or copy."""
+
+    transfer_id: str
+    kind: str  # "upload" | "copy"
+    node: str  # destination node
+    path: str  # destination path
+    total_bytes: Optional[int] = None  # None while unknown (chunked uploads)
+    confirmed_bytes: int = 0
+    state: str = "running"
+    resumes: int = 0
+    detail: Optional[str] = None
+    source: Optional[dict] = None  # copies: {"node": ..., "path": ...}
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        out = {
+            "transfer_id": self.transfer_id,
+            "kind": self.kind,
+            "state": self.state,
+            "node": self.node,
+            "path": self.path,
+            "confirmed_bytes": self.confirmed_bytes,
+            "total_bytes": self.total_bytes,
+            "resumes": self.resumes,
+            "started_at": self.started_at,
+            "updated_at": self.updated_at,
+        }
+        if self.source is not None:
+            out["source"] = dict(self.source)
+        if self.detail is not None:
+            out["detail"] = self.detail
+        return out
+
+
+class TransferRegistry:
+    """Thread-safe registry of TransferRecords."""
+
+    def __init__(self, max_finished: int = DEFAULT_MAX_FINISHED) -> None:
+        self.max_finished = max_finished
+        self._records: dict[str, TransferRecord] = {}
+        self._lock = threading.Lock()
+
+    def start(self, transfer_id: str, kind: str, node: str, path: str, **fields) -> TransferRecord:
+        record = TransferRecord(transfer_id=transfer_id, kind=kind, node=node, path=path, **fields)
+        with self._lock:
+            self._records[transfer_id] = record
+        return record
+
+    def checkpoint(self, transfer_id: str, confirmed_bytes: int) -> None:
+        """Record the offset up to which the destination is known to hold the data."""
+        with self._lock:
+            record = self._records.get(transfer_id)
+            if record is not None:
+                record.confirmed_bytes = confirmed_bytes
+                record.state = "running"
+                record.updated_at = time.time()
+
+    def resumed(self, transfer_id: str, confirmed_bytes: int) -> None:
+        with self._lock:
+            record = self._records.get(transfer_id)
+            if record is not None:
+                record.resumes += 1
+                record.confirmed_bytes = confirmed_bytes
+                record.state = "running"
+                record.updated_at = time.time()
+
+    def set_state(self, transfer_id: str, state: str, detail: Optional[str] = None) -> None:
+        with self._lock:
+            record = self._records.get(transfer_id)
+            if record is None:
+                return
+            record.state = state
+            record.detail = detail
+            record.updated_at = time.time()
+            if state in TERMINAL_STATES:
+                self._prune_locked()
+
+    def get(self, transfer_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get(transfer_id)
+            return None if record is None else record.to_dict()
+
+    def list(self) -> list[dict]:
+        """All records, oldest first."""
+        with self._lock:
+            return [r.to_dict() for r in sorted(self._records.values(), key=lambda r: r.started_at)]
+
+    def _prune_locked(self) -> None:
+        finished = sorted(
+            (r for r in self._records.values() if r.state in TERMINAL_STATES),
+            key=lambda r: r.updated_at,
+        )
+        for record in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._records[record.transfer_id]
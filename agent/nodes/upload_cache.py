@@ -0,0 +1,176 @@
+"""
+UploadCache — remembers what content each completed upload left on a node.
+
+Keyed by (node, remote_path). Each entry records the sha256 of the uploaded
+content plus the remote size, mtime and mode observed right after the write.
+NodeService consults it before an upload: if the digest and mode match and
+a fresh remote stat still shows the same size and mtime, the upload is
+skipped and reported as {"status": "unchanged"}.
+
+The stat check is what makes a hit trustworthy: a file edited, replaced or
+deleted on the node since the upload no longer matches and is re-uploaded.
+Remote mtimes have one-second resolution, so a same-size rewrite within the
+second of the original upload is not detected.
+
+Memory is bounded by an LRU limit on entries. When *path* is given the cache
+is loaded from and saved to that JSON file, so it survives gateway restarts;
+a missing or unreadable file just starts an empty cache. Changes only mark
+the cache dirty: one write, from a snapshot taken outside the cache lock,
+follows `flush_delay` seconds later on the shared timer scheduler, and
+close() writes whatever is still pending at shutdown.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from agent.connectionpool.scheduler import ScheduledTask, TimerScheduler, default_scheduler
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_FLUSH_DELAY = 2.0
+
+
+@dataclass(frozen=True)
+class UploadRecord:
+    """What a completed upload left at one remote path."""
+
+    sha256: str
+    size: int
+    mtime: int
+    mode: str
+
+
+class UploadCache:
+    """Thread-safe LRU of UploadRecords, optionally persisted to a JSON file."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        path: Optional[str] = None,
+        flush_delay: float = DEFAULT_FLUSH_DELAY,
+        scheduler: Optional[TimerScheduler] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.path = path
+        self.flush_delay = flush_delay
+        self._scheduler = scheduler
+        self._entries: "OrderedDict[tuple[str, str], UploadRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serialises file writes so a later snapshot is never overwritten by an earlier one.
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._flush_task: Optional[ScheduledTask] = None
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._load()
+
+    def get(self, node: str, remote_path: str) -> Optional[UploadRecord]:
+        key = (node, remote_path)
+        with self._lock:
+            record = self._entries.get(key)
+            if record is not None:
+                self._entries.move_to_end(key)
+            return record
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def put(self, node: str, remote_path: str, record: UploadRecord) -> None:
+        key = (node, remote_path)
+        with self._lock:
+            self._entries[key] = record
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._mark_dirty_locked()
+
+    def invalidate(self, node: str, remote_path: str) -> bool:
+        """Forget one path. Returns True if an entry was dropped."""
+        with self._lock:
+            if self._entries.pop((node, remote_path), None) is None:
+                return False
+            self._mark_dirty_locked()
+            return True
+
+    def invalidate_node(self, node: str) -> int:
+        """Forget every path on *node*. Returns the number dropped."""
+        with self._lock:
+            doomed = [k for k in self._entries if k[0] == node]
+            for k in doomed:
+                del self._entries[k]
+            if doomed:
+                self._mark_dirty_locked()
+            return len(doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+            for row in rows[-self.max_entries:]:
+                record = UploadRecord(
+                    sha256=str(row["sha256"]),
+                    size=int(row["size"]),
+                    mtime=int(row["mtime"]),
+                    mode=str(row["mode"]),
+                )
+                self._entries[(str(row["node"]), str(row["path"]))] = record
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logging.warning(f"⚠️ Ignoring unreadable upload cache {self.path}: {e}")
+            self._entries.clear()
+
+    def flush(self) -> None:
+        """Write pending changes to *path* now. No-op when nothing changed."""
+        with self._write_lock:
+            with self._lock:
+                self._flush_task = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Oldest first, so reloading with a smaller max_entries keeps the newest.
+                items = list(self._entries.items())
+            rows = [{"node": node, "path": path, **asdict(record)} for (node, path), record in items]
+            tmp = f"{self.path}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(rows, f, separators=(",", ":"))
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logging.warning(f"⚠️ Could not persist upload cache to {self.path}: {e}")
+                with self._lock:
+                    self._dirty = True  # retried by the next flush or close()
+
+    def close(self) -> None:
+        """Cancel the pending timer flush and write any unsaved changes."""
+        with self._lock:
+            task, self._flush_task = self._flush_task, None
+        if task is not None:
+            task.cancel()
+        self.flush()
+
+    def _mark_dirty_locked(self) -> None:
+        if not self.path:
+            return
+        self._dirty = True
+        if self._flush_task is None:
+            scheduler = self._scheduler or default_scheduler()
+            self._flush_task = scheduler.call_later(self.flush_delay, self.flush, name="upload-cache-flush")
@@ -0,0 +1,127 @@
+"""
+UploadRegistry — tracks chunked uploads in progress.
+
+Each entry owns an open remote file handle (connection layer) that chunks are
+written straight into, so gateway memory per upload is bounded by one chunk
+regardless of file size. Chunks must arrive in order: each one is accepted
+only at the current `bytes_received` offset, which also makes a retried chunk
+detectable.
+
+The registry caps concurrent uploads. An upload idle longer than
+`idle_timeout` seconds is aborted the next time the registry is queried
+(`has_capacity()`, `get()`, `exists()`); aborting closes the handle and
+removes the partial remote file.
+
+If the connection drops mid-upload, NodeService reopens the remote file at
+`bytes_received` (the last confirmed offset) on the reconnected connection;
+while the node is unreachable the entry stays registered with `handle` None.
+"""
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+DEFAULT_MAX_UPLOADS = 64
+DEFAULT_IDLE_TIMEOUT = 900  # seconds
+MAX_CHUNK_BYTES = 4 * 1024 * 1024  # decoded bytes per upload_chunk call
+
+
+@dataclass
+class UploadEntry:
+    """Registry record for one chunked upload."""
+
+    upload_id: str
+    node: str
+    remote_path: str
+    mode: str
+    connection: object  # Connection that owns `handle`
+    handle: object  # SFTPFile; None while interrupted by a connection loss
+    bytes_received: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    # Serialises chunk writes and commit/abort for this upload.
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class UploadRegistry:
+    """Thread-safe registry of chunked uploads in progress."""
+
+    def __init__(
+        self,
+        max_uploads: int = DEFAULT_MAX_UPLOADS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ) -> None:
+        self.max_uploads = max_uploads
+        self.idle_timeout = idle_timeout
+        self._entries: dict[str, UploadEntry] = {}
+        self._lock = threading.Lock()
+
+    def has_capacity(self) -> bool:
+        self._reap_idle()
+        with self._lock:
+            return len(self._entries) < self.max_uploads
+
+    def add(self, node: str, remote_path: str, mode: str, connection, handle) -> UploadEntry:
+        entry = UploadEntry(
+            upload_id=uuid.uuid4().hex,
+            node=node,
+            remote_path=remote_path,
+            mode=mode,
+            connection=connection,
+            handle=handle,
+        )
+        with self._lock:
+            self._entries[entry.upload_id] = entry
+        return entry
+
+    def get(self, upload_id: str) -> Optional[UploadEntry]:
+        """Return the entry and mark it used, or None if unknown (or reaped)."""
+        self._reap_idle()
+        with self._lock:
+            entry = self._entries.get(upload_id)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+            return entry
+
+    def exists(self, upload_id: str) -> bool:
+        """True if the upload is still registered. Does not count as use."""
+        self._reap_idle()
+        with self._lock:
+            return upload_id in self._entries
+
+    def pop(self, upload_id: str) -> Optional[UploadEntry]:
+        """Remove an entry without touching its handle (used on commit)."""
+        with self._lock:
+            return self._entries.pop(upload_id, None)
+
+    def abort(self, upload_id: str) -> Optional[UploadEntry]:
+        """Remove an upload and discard its partial remote file. Returns the entry, or None."""
+        entry = self.pop(upload_id)
+        if entry is not None:
+            _discard(entry)
+        return entry
+
+    def abort_node(self, node: str) -> int:
+        """Abort every upload to *node*. Returns the number aborted."""
+        with self._lock:
+            doomed = [e for e in self._entries.values() if e.node == node]
+            for e in doomed:
+                del self._entries[e.upload_id]
+        for e in doomed:
+            _discard(e)
+        return len(doomed)
+
+    def _reap_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            doomed = [e for e in self._entries.values() if e.last_used < cutoff]
+            for e in doomed:
+                del self._entries[e.upload_id]
+        for e in doomed:
+            _discard(e)
+
+
+def _discard(entry: UploadEntry) -> None:
+    with entry.lock:
+        entry.connection.abort_remote_file(entry.handle, entry.remote_path)
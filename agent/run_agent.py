@@ -7,6 +7,7 @@ from agent import mcp_handlers
 from agent.nodes.models import NodeConfig
 from agent.nodes.registry import NodeRegistry
 from agent.nodes.service import NodeService
+from agent.nodes.upload_cache import UploadCache
 from agent.nodes.handshake import NodeHandshakeService
 from agent.identity.service import AgentIdentityService
 
@@ -16,6 +17,8 @@ def run_agent(
     host="127.0.0.1",
     port=8000,
     agent_key_dir="/data/keys",
+    upload_cache_path="",
+    start_parallel=None,
 ):
     from agent.connectionpool.config_loader import load_and_parse_connections
     from agent.connectionpool.pool import ConnectionPool
@@ -39,11 +42,15 @@ def run_agent(
         logging.warning("No connection configuration supplied. Starting with an empty pool.")
         connections = []
 
-    pool = ConnectionPool(connections)
+    pool = ConnectionPool(connections) if start_parallel is None else ConnectionPool(
+        connections, start_parallel=start_parallel
+    )
+    upload_cache = UploadCache(path=upload_cache_path or None)
 
     def shutdown_handler(sig, frame):
         logging.info("\n🔻 Received shutdown signal. Cleaning up...")
         pool.stop()
+        upload_cache.close()
 
         os._exit(0)
 
@@ -69,7 +76,13 @@ def run_agent(
         registry.add(cfg)
 
     handshake_service = NodeHandshakeService()
-    node_service = NodeService(registry=registry, pool=pool, handshake_service=handshake_service, agent_identity_service=agent_identity_service)
+    node_service = NodeService(
+        registry=registry,
+        pool=pool,
+        handshake_service=handshake_service,
+        agent_identity_service=agent_identity_service,
+        upload_cache=upload_cache,
+    )
 
     # Start MCP loop (blocking)
     mcp = FastMCP(name="mcp-ssh-gateway", host=host, port=port, stateless_http=True, json_response=True)
@@ -47,6 +47,18 @@ def parse_args() -> argparse.Namespace:
         default="/data/keys",
         help="Directory where the agent's persistent SSH keypair is stored.",
     )
+    parser.add_argument(
+        "--upload-cache-file",
+        type=str,
+        default="",
+        help="JSON file persisting the upload deduplication cache. Empty keeps it in memory only.",
+    )
+    parser.add_argument(
+        "--start-parallel",
+        type=int,
+        default=None,
+        help="Connections opened concurrently at startup (default: 32).",
+    )
     return parser.parse_args()
 
 if __name__ == "__main__":
@@ -60,4 +72,6 @@ if __name__ == "__main__":
         host=args.host,
         port=args.port,
         agent_key_dir=args.agent_key_dir,
+        upload_cache_path=args.upload_cache_file,
+        start_parallel=args.start_parallel,
     )
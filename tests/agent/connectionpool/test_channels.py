@@ -0,0 +1,51 @@
+"""Unit tests for wait_readable() (channel notification pipe waits)."""
+
+import os
+import resource
+
+import pytest
+
+from agent.connectionpool.channels import wait_readable
+
+
+class _PipeChannel:
+    def __init__(self, fd):
+        self._fd = fd
+
+    def fileno(self):
+        return self._fd
+
+
+def _high_fd_pipe(target=1500):
+    """A pipe whose read end is renumbered above select()'s FD_SETSIZE (1024)."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft <= target:
+        if hard != resource.RLIM_INFINITY and hard <= target:
+            pytest.skip("RLIMIT_NOFILE too low to open a descriptor above 1024")
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target + 1, hard))
+    r, w = os.pipe()
+    os.dup2(r, target)
+    os.close(r)
+    return target, w
+
+
+def test_wait_readable_times_out_on_idle_channel():
+    r, w = os.pipe()
+    try:
+        assert wait_readable(_PipeChannel(r), 0.01) is False
+        os.write(w, b"x")
+        assert wait_readable(_PipeChannel(r), 1) is True
+    finally:
+        os.close(r)
+        os.close(w)
+
+
+def test_wait_readable_handles_descriptors_above_1024():
+    r, w = _high_fd_pipe()
+    try:
+        assert wait_readable(_PipeChannel(r), 0.01) is False
+        os.write(w, b"x")
+        assert wait_readable(_PipeChannel(r), 1) is True
+    finally:
+        os.close(r)
+        os.close(w)
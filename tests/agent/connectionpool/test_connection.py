@@ -1,6 +1,7 @@
 import pytest
 import subprocess
 import threading
+import time
 from agent.connectionpool.connection import Connection
 from agent.connectionpool.config_loader import ConnectionConfig
 
@@ -111,54 +112,673 @@ def _make_direct_connection_with_mock_ssh():
     return conn, mock_ssh
 
 
-def test_execute_with_timeout_completes_when_command_finishes_quickly():
-    """execute(cmd, timeout=5) returns CommandResult when command completes before deadline."""
+class _FakeChannel:
+    """Minimal stand-in for a Paramiko exec channel.
+
+    stdout/stderr chunks are served one per recv() call. By default all output
+    is already delivered (EOF received) and the exit status becomes ready once
+    *release* is set (immediately if release is None). With eof_received=False
+    the channel behaves like a still-running command until deliver() is called.
+    """
+
+    def __init__(self, stdout_chunks=(), stderr_chunks=(), exit_status=0, release=None, eof_received=True):
+        self._stdout = list(stdout_chunks)
+        self._stderr = list(stderr_chunks)
+        self._exit_status = exit_status
+        self.status_event = release if release is not None else threading.Event()
+        if release is None and eof_received:
+            self.status_event.set()
+        self.eof_received = eof_received
+        self.closed = False
+        self._pipe = None
+
+    def recv_ready(self):
+        return bool(self._stdout)
+
+    def recv(self, nbytes):
+        return self._stdout.pop(0)
+
+    def recv_stderr_ready(self):
+        return bool(self._stderr)
+
+    def recv_stderr(self, nbytes):
+        return self._stderr.pop(0)
+
+    def exit_status_ready(self):
+        return self.status_event.is_set()
+
+    def recv_exit_status(self):
+        return self._exit_status
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def fileno(self):
+        import os
+        if self._pipe is None:
+            self._pipe = os.pipe()
+        return self._pipe[0]
+
+    def deliver(self, stdout=b""):
+        """Simulate the remaining output, EOF and exit-status arriving from the server."""
+        import os
+        self._stdout.append(stdout)
+        self.eof_received = True
+        if self._pipe is not None:
+            os.write(self._pipe[1], b"x")
+        self.status_event.set()
+
+    def close(self):
+        import os
+        self.closed = True
+        if self._pipe is not None:
+            os.close(self._pipe[0])
+            os.close(self._pipe[1])
+            self._pipe = None
+
+
+def _mock_exec_streams(channel):
+    """Return an (stdin, stdout, stderr) triple as exec_command() would, backed by *channel*."""
     from unittest.mock import MagicMock
 
-    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
-
-    mock_stdin = MagicMock()
     mock_stdout = MagicMock()
     mock_stderr = MagicMock()
-    mock_stdout.channel.recv_exit_status.return_value = 0
-    mock_stdout.read.return_value = b"hello"
-    mock_stderr.read.return_value = b""
-    mock_ssh.exec_command.return_value = (mock_stdin, mock_stdout, mock_stderr)
+    mock_stdout.channel = channel
+    mock_stderr.channel = channel
+    return MagicMock(), mock_stdout, mock_stderr
+
+
+def test_execute_with_timeout_completes_when_command_finishes_quickly():
+    """execute(cmd, timeout=5) returns CommandResult when command completes before deadline."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_ssh.exec_command.return_value = _mock_exec_streams(_FakeChannel([b"hello"]))
 
     result = conn.execute("echo hello", timeout=5)
 
-    mock_ssh.exec_command.assert_called_once_with("echo hello")
+    mock_ssh.exec_command.assert_called_once_with("echo hello", timeout=conn.connect_timeout)
     assert result.exit_code == 0
+    assert result.stdout == "hello"
 
 
-def test_execute_raises_timeout_error_on_channel_timeout():
-    """execute() raises TimeoutError when command does not complete within the deadline."""
+def test_execute_does_not_hold_connection_lock_while_opening_channel():
+    """A channel open stuck on a half-open transport must not block the lock (health checks, other callers)."""
     import threading
-    from unittest.mock import MagicMock
 
     conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    opening = threading.Event()
+    release = threading.Event()
 
-    mock_stdin = MagicMock()
-    mock_stdout = MagicMock()
-    mock_stderr = MagicMock()
+    def _exec(cmd, timeout=None):
+        opening.set()
+        release.wait(5)
+        return _mock_exec_streams(_FakeChannel([b"ok"]))
 
-    # Make recv_exit_status block indefinitely so the thread join times out
-    block_event = threading.Event()
+    mock_ssh.exec_command.side_effect = _exec
+    worker = threading.Thread(target=conn.execute, args=("true",), kwargs={"timeout": 5})
+    worker.start()
+    try:
+        assert opening.wait(5)
+        assert conn._lock.acquire(timeout=1)
+        conn._lock.release()
+    finally:
+        release.set()
+        worker.join(5)
 
-    def _blocking_recv():
-        block_event.wait()
-        return 0
 
-    mock_stdout.channel.recv_exit_status.side_effect = _blocking_recv
-    mock_stdout.read.return_value = b""
-    mock_stderr.read.return_value = b""
-    mock_ssh.exec_command.return_value = (mock_stdin, mock_stdout, mock_stderr)
+def test_execute_raises_timeout_error_on_channel_timeout():
+    """execute() raises TimeoutError when command does not complete within the deadline."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeChannel(release=threading.Event())
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
 
     with pytest.raises(TimeoutError):
         conn.execute("sleep 10", timeout=0.1)
 
-    # Unblock the daemon thread so it can exit cleanly
-    block_event.set()
+    assert channel.closed
+
+
+class _EndlessChannel(_FakeChannel):
+    """Channel whose command never exits and always has more stdout buffered."""
+
+    def recv_ready(self):
+        return True
+
+    def recv(self, nbytes):
+        return b"y" * nbytes
+
+
+def test_execute_times_out_while_output_keeps_arriving():
+    """A producer faster than the reader cannot keep execute() from reaching its deadline."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_ssh.exec_command.return_value = _mock_exec_streams(_EndlessChannel(release=threading.Event()))
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        conn.execute("yes", timeout=0.2)
+    assert time.monotonic() - started < 2
+
+
+def test_execute_cancels_while_output_keeps_arriving():
+    from agent.connectionpool.connection import CommandCancelled
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _EndlessChannel(release=threading.Event())
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+    cancel = threading.Event()
+    timer = threading.Timer(0.05, cancel.set)
+    timer.start()
+    try:
+        with pytest.raises(CommandCancelled):
+            conn.execute("yes", cancel_event=cancel)
+    finally:
+        timer.join(5)
+    assert channel.closed
+
+
+# ---------------------------------------------------------------------------
+# BaseConnection.execute() — output draining tests
+# ---------------------------------------------------------------------------
+
+
+def test_execute_drains_output_written_before_exit():
+    """Output arriving in many chunks on both streams is collected in order."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeChannel(
+        stdout_chunks=[b"line1\n", b"line2\n", b"line3\n"],
+        stderr_chunks=[b"warn\n"],
+        exit_status=3,
+    )
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+
+    result = conn.execute("noisy", timeout=5)
+
+    assert result.exit_code == 3
+    assert result.stdout == "line1\nline2\nline3\n"
+    assert result.stderr == "warn\n"
+    assert result.stdout_truncated is False
+    assert result.stdout_total_bytes == 18
+
+
+def test_execute_truncates_output_beyond_limit_and_reports_totals():
+    """Bytes past output_limit are drained and counted but not retained."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeChannel(stdout_chunks=[b"a" * 6, b"b" * 6], stderr_chunks=[b"e" * 4])
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+
+    result = conn.execute("journalctl", timeout=5, output_limit=8)
+
+    assert result.stdout == "aaaaaabb"
+    assert result.stdout_truncated is True
+    assert result.stdout_total_bytes == 12
+    assert result.stderr == "eeee"
+    assert result.stderr_truncated is False
+    assert channel.recv_ready() is False
+
+
+def test_execute_keeps_non_utf8_output_as_raw_bytes():
+    """Non-UTF-8 output does not raise; raw bytes are kept and decoded on access."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeChannel(stdout_chunks=[b"\x89PNG\xff"])
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+
+    result = conn.execute("cat image.png", timeout=5)
+
+    assert result.stdout_bytes == b"\x89PNG\xff"
+    assert result.stdout == "\ufffdPNG\ufffd"
+
+
+def test_execute_waits_on_channel_without_helper_thread():
+    """A running command is awaited via select() on the calling thread — no extra threads."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeChannel(eof_received=False)
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+
+    threads_seen = []
+
+    def _deliver_later():
+        threads_seen.append(threading.active_count())
+        channel.deliver(b"done\n")
+
+    baseline = threading.active_count()
+    timer = threading.Timer(0.05, _deliver_later)
+    timer.start()
+    try:
+        result = conn.execute("sleep 0.05; echo done", timeout=5)
+    finally:
+        timer.join(5)
+
+    assert result.stdout == "done\n"
+    assert channel.closed
+    # The only thread added while the command ran is the test's own timer.
+    assert threads_seen == [baseline + 1]
+
+
+def test_execute_streams_chunks_to_callbacks_beyond_output_limit():
+    """on_stdout/on_stderr see every chunk even when the retained output is truncated."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeChannel(stdout_chunks=[b"abc", b"def"], stderr_chunks=[b"e"])
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+    seen_out, seen_err = [], []
+
+    result = conn.execute("x", timeout=5, output_limit=2, on_stdout=seen_out.append, on_stderr=seen_err.append)
+
+    assert seen_out == [b"abc", b"def"]
+    assert seen_err == [b"e"]
+    assert result.stdout == "ab"
+
+
+def test_execute_raises_command_cancelled_when_cancel_event_set():
+    """Setting cancel_event aborts the wait and closes the channel."""
+    from agent.connectionpool.connection import CommandCancelled
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeChannel(release=threading.Event())
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+    cancel = threading.Event()
+    timer = threading.Timer(0.05, cancel.set)
+    timer.start()
+    try:
+        with pytest.raises(CommandCancelled):
+            conn.execute("sleep 100", timeout=5, cancel_event=cancel)
+    finally:
+        timer.join(5)
+
+    assert channel.closed
+
+
+# ---------------------------------------------------------------------------
+# BaseConnection.execute() — channel multiplexing tests
+# ---------------------------------------------------------------------------
+
+
+def test_execute_runs_commands_concurrently_on_one_connection():
+    """A slow command does not block a second command on the same connection."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+
+    release_slow = threading.Event()
+
+    mock_ssh.exec_command.side_effect = lambda cmd, timeout=None: _mock_exec_streams(
+        _FakeChannel(release=release_slow if cmd == "slow" else None)
+    )
+
+    slow_thread = threading.Thread(target=conn.execute, args=("slow",), kwargs={"timeout": 5})
+    slow_thread.start()
+    try:
+        result = conn.execute("fast", timeout=1)
+        assert result.exit_code == 0
+        assert slow_thread.is_alive()
+    finally:
+        release_slow.set()
+        slow_thread.join(5)
+
+
+def test_execute_times_out_when_all_channel_slots_busy():
+    """execute() raises TimeoutError if no channel slot frees up within the deadline."""
+    from agent.connectionpool.connection import DirectConnection, ConnectionState
+    from unittest.mock import MagicMock
+
+    config = ConnectionConfig(
+        name="one-slot",
+        mode="direct",
+        user="u",
+        host="127.0.0.1",
+        port=22,
+        id_file="/tmp/id_rsa",
+        max_channels=1,
+    )
+    conn = DirectConnection(config)
+    conn._ssh = MagicMock()
+    conn.state = ConnectionState.OPEN
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def _exec(cmd, timeout=None):
+        started.set()
+        return _mock_exec_streams(_FakeChannel(release=release))
+
+    conn._ssh.exec_command.side_effect = _exec
+
+    busy = threading.Thread(target=conn.execute, args=("busy",), kwargs={"timeout": 5})
+    busy.start()
+    try:
+        assert started.wait(5)
+        with pytest.raises(TimeoutError, match="No free channel"):
+            conn.execute("queued", timeout=0.1)
+    finally:
+        release.set()
+        busy.join(5)
+
+
+def test_execute_cancelled_while_queued_for_a_slot_never_opens_a_channel():
+    from agent.connectionpool.connection import CommandCancelled
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    for _ in range(conn.max_channels):
+        conn._channel_slots.acquire()  # saturated by other jobs and sessions
+    cancel = threading.Event()
+    timer = threading.Timer(0.05, cancel.set)
+    timer.start()
+    try:
+        with pytest.raises(CommandCancelled):
+            conn.execute("rm -rf /tmp/scratch", cancel_event=cancel)
+    finally:
+        timer.join(5)
+
+    mock_ssh.exec_command.assert_not_called()
+
+
+def test_execute_timeout_covers_slot_wait_and_run():
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    for _ in range(conn.max_channels):
+        conn._channel_slots.acquire()
+    threading.Timer(0.3, conn._channel_slots.release).start()
+    mock_ssh.exec_command.return_value = _mock_exec_streams(_FakeChannel(release=threading.Event()))
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        conn.execute("sleep 100", timeout=0.5, cancel_event=threading.Event())
+    assert time.monotonic() - started < 0.8
+
+
+def test_connection_default_max_channels_below_sshd_max_sessions():
+    """The default channel cap stays below OpenSSH's default MaxSessions (10)."""
+    from agent.connectionpool.config_loader import DEFAULT_MAX_CHANNELS
+
+    conn, _ = _make_direct_connection_with_mock_ssh()
+    assert conn.max_channels == DEFAULT_MAX_CHANNELS
+    assert DEFAULT_MAX_CHANNELS < 10
+
+
+def test_check_transport_non_blocking_skips_while_lock_is_held():
+    from agent.connectionpool.connection import ConnectionState
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_ssh.get_transport.return_value.is_active.return_value = False
+
+    with conn._lock:  # e.g. an open() in progress on another thread
+        assert conn.check_transport(blocking=False) is True
+    assert conn.state == ConnectionState.OPEN
+    assert conn.check_transport(blocking=False) is False
+
+
+class _KeepaliveExecutor:
+    """Runs keepalive round trips inline when `answer` is set; otherwise leaves them pending."""
+
+    def __init__(self):
+        self.answer = False
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+
+        self.submitted += 1
+        future = Future()
+        if self.answer:
+            future.set_result(fn(*args))
+        return future
+
+
+def _keepalive_connection(monkeypatch):
+    """Connection with a mock transport, a keepalive executor and a mock scheduler capturing the reply deadline check."""
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    transport = mock_ssh.get_transport.return_value
+    transport.is_active.return_value = True
+    transport.in_kex = False
+    transport.H = b"exchange-hash"
+    executor = _KeepaliveExecutor()
+    monkeypatch.setattr("agent.connectionpool.connection._keepalive_executor", lambda: executor)
+    scheduler = MagicMock()
+    monkeypatch.setattr("agent.connectionpool.connection.default_scheduler", lambda: scheduler)
+    return conn, mock_ssh, transport, scheduler, executor
+
+
+def test_send_keepalive_records_rtt_when_reply_arrives(monkeypatch):
+    from agent.connectionpool.connection import ConnectionState, KEEPALIVE_REQUEST
+
+    conn, _, transport, scheduler, executor = _keepalive_connection(monkeypatch)
+    executor.answer = True  # the node replies as soon as the request is sent
+
+    assert conn.send_keepalive() is True
+
+    transport.global_request.assert_called_once_with(KEEPALIVE_REQUEST, wait=True)
+    assert transport.completion_event is not None  # paramiko's own, never replaced by the probe
+    assert conn.rtt.snapshot()["samples"] == 1
+    assert scheduler.call_later.call_args.args[0] == conn.keepalive_timeout
+
+    scheduler.call_later.call_args.args[1]()  # deadline check: reply already in
+    assert conn.state == ConnectionState.OPEN
+    assert conn.rtt.snapshot()["missed"] == 0
+
+
+def test_keepalive_is_not_sent_during_key_exchange(monkeypatch):
+    conn, _, transport, scheduler, executor = _keepalive_connection(monkeypatch)
+    transport.in_kex = True
+
+    assert conn.send_keepalive() is False
+
+    assert executor.submitted == 0
+    scheduler.call_later.assert_not_called()
+
+
+def test_rekey_during_keepalive_records_no_rtt(monkeypatch):
+    from agent.connectionpool.connection import ConnectionState
+
+    conn, _, transport, scheduler, executor = _keepalive_connection(monkeypatch)
+    executor.answer = True
+
+    def rekey(*args, **kwargs):
+        transport.H = b"new-exchange-hash"  # completing the exchange ends paramiko's wait
+
+    transport.global_request.side_effect = rekey
+
+    assert conn.send_keepalive() is True
+    scheduler.call_later.call_args.args[1]()
+
+    assert conn.rtt.snapshot() is None  # neither a sample nor a miss
+    assert conn.state == ConnectionState.OPEN
+
+
+def test_keepalive_records_no_rtt_when_transport_dies(monkeypatch):
+    conn, _, transport, _, executor = _keepalive_connection(monkeypatch)
+    executor.answer = True
+    transport.global_request.side_effect = lambda *a, **k: transport.is_active.configure_mock(return_value=False)
+
+    assert conn.send_keepalive() is True
+
+    assert conn.rtt.snapshot() is None
+
+
+def test_unanswered_keepalive_marks_connection_broken(monkeypatch):
+    from agent.connectionpool.connection import ConnectionState
+
+    conn, mock_ssh, transport, scheduler, _ = _keepalive_connection(monkeypatch)
+
+    assert conn.send_keepalive() is True
+    scheduler.call_later.call_args.args[1]()  # deadline passes without a reply
+
+    assert conn.state == ConnectionState.BROKEN
+    mock_ssh.close.assert_called_once()
+    assert conn.rtt.snapshot()["missed"] == 1
+
+
+def test_keepalive_check_retries_later_instead_of_blocking_on_lock(monkeypatch):
+    from agent.connectionpool.connection import ConnectionState
+
+    monkeypatch.setattr("agent.connectionpool.connection._CALLBACK_LOCK_TIMEOUT", 0.01)
+    conn, mock_ssh, transport, scheduler, _ = _keepalive_connection(monkeypatch)
+    assert conn.send_keepalive() is True
+
+    with conn._lock:
+        scheduler.call_later.call_args.args[1]()  # deadline passes while the lock is busy
+    assert conn.state == ConnectionState.OPEN
+    assert scheduler.call_later.call_count == 2
+
+    scheduler.call_later.call_args.args[1]()  # retry
+    assert conn.state == ConnectionState.BROKEN
+    mock_ssh.close.assert_called_once()
+    assert conn.rtt.snapshot()["missed"] == 1
+
+
+def test_unanswered_keepalive_discards_sftp_under_sftp_lock(monkeypatch):
+    import base64
+
+    conn, mock_ssh, _, scheduler, _ = _keepalive_connection(monkeypatch)
+    conn.upload_file("/tmp/test.txt", base64.b64encode(b"x").decode())
+    sftp = conn._sftp
+
+    assert conn.send_keepalive() is True
+    scheduler.call_later.call_args.args[1]()
+
+    sftp.close.assert_called_once()
+    assert conn._sftp is None
+    assert not conn._sftp_lock.locked()
+
+
+def test_unanswered_keepalive_leaves_busy_sftp_to_its_transfer(monkeypatch):
+    import base64
+    from agent.connectionpool.connection import ConnectionState
+
+    monkeypatch.setattr("agent.connectionpool.connection._CALLBACK_LOCK_TIMEOUT", 0.01)
+    conn, mock_ssh, _, scheduler, _ = _keepalive_connection(monkeypatch)
+    conn.upload_file("/tmp/test.txt", base64.b64encode(b"x").decode())
+    sftp = conn._sftp
+
+    assert conn.send_keepalive() is True
+    with conn._sftp_lock:  # a transfer hung on the half-open session
+        scheduler.call_later.call_args.args[1]()
+
+    assert conn.state == ConnectionState.BROKEN
+    mock_ssh.close.assert_called_once()
+    sftp.close.assert_not_called()
+
+
+def test_keepalive_is_sent_while_connection_lock_is_held(monkeypatch):
+    conn, _, _, _, executor = _keepalive_connection(monkeypatch)
+
+    with conn._lock:  # e.g. another caller stuck on the half-open session
+        conn._health_check_tick()
+
+    assert executor.submitted == 1
+
+
+def test_passive_health_check_sends_no_keepalive(monkeypatch):
+    conn, _, _, _, executor = _keepalive_connection(monkeypatch)
+    conn.health_check = "passive"
+
+    conn._health_check_tick()
+
+    assert executor.submitted == 0
+
+
+def test_direct_open_bounds_connect_banner_and_auth_by_connect_timeout(monkeypatch):
+    from unittest.mock import MagicMock
+    from agent.connectionpool.connection import DirectConnection
+
+    mock_client_cls = MagicMock()
+    monkeypatch.setattr("agent.connectionpool.connection.SSHClient", mock_client_cls)
+    conn = DirectConnection(ConnectionConfig(
+        name="c", mode="direct", user="u", host="10.0.0.1", port=22, id_file="/tmp/id", connect_timeout=2.5,
+    ))
+
+    conn.open()
+    conn.close()
+
+    kwargs = mock_client_cls.return_value.connect.call_args.kwargs
+    assert (kwargs["timeout"], kwargs["banner_timeout"], kwargs["auth_timeout"]) == (2.5, 2.5, 2.5)
+
+
+def test_direct_open_closes_the_client_it_replaces(monkeypatch):
+    import base64
+    from unittest.mock import MagicMock
+
+    conn, old_ssh = _make_direct_connection_with_mock_ssh()
+    conn.upload_file("/tmp/test.txt", base64.b64encode(b"x").decode())
+    old_sftp = conn._sftp
+    monkeypatch.setattr("agent.connectionpool.connection.SSHClient", MagicMock())
+
+    conn.open()
+    conn.close()
+
+    old_ssh.close.assert_called_once()
+    old_sftp.close.assert_called_once()
+
+
+def _opening_tunnel(monkeypatch):
+    """TunnelConnection in OPENING state with a mock probe timer and a mock connect executor."""
+    from unittest.mock import MagicMock
+    from agent.connectionpool.connection import TunnelConnection, ConnectionState
+
+    executor = MagicMock()
+    monkeypatch.setattr("agent.connectionpool.connection._tunnel_connect_executor", lambda: executor)
+    monkeypatch.setattr("agent.connectionpool.connection.OneShotRepeatingTimer", MagicMock())
+    conn = TunnelConnection(ConnectionConfig(name="t", mode="tunnel", user="u", host=None, port=2222, id_file="/tmp/id"))
+    conn.open()
+    assert conn.state == ConnectionState.OPENING
+    return conn, executor
+
+
+def test_tunnel_probe_hands_connect_to_executor(monkeypatch):
+    conn, executor = _opening_tunnel(monkeypatch)
+
+    conn._probe()
+    conn._probe()  # the first attempt is still in flight
+
+    executor.submit.assert_called_once_with(conn._connect_tunnel)
+
+
+def test_tunnel_probe_does_not_block_on_busy_lock(monkeypatch):
+    monkeypatch.setattr("agent.connectionpool.connection._CALLBACK_LOCK_TIMEOUT", 0.01)
+    conn, executor = _opening_tunnel(monkeypatch)
+
+    with conn._lock:
+        conn._probe()
+
+    executor.submit.assert_not_called()
+    assert conn._connecting is False
+
+
+def test_tunnel_connect_opens_outside_the_lock(monkeypatch):
+    from unittest.mock import MagicMock
+    from agent.connectionpool.connection import ConnectionState
+
+    conn, _ = _opening_tunnel(monkeypatch)
+    monkeypatch.setattr("agent.connectionpool.connection.socket.create_connection", MagicMock())
+    client_cls = MagicMock()
+    client_cls.return_value.connect.side_effect = lambda **kwargs: assert_unlocked(conn)
+    monkeypatch.setattr("agent.connectionpool.connection.SSHClient", client_cls)
+
+    def assert_unlocked(c):
+        assert not c._lock.locked()
+
+    conn._probe()
+    conn._connect_tunnel()
+
+    assert conn.state == ConnectionState.OPEN
+    assert conn._ssh is client_cls.return_value
+    assert conn.generation == 1
+    assert conn._connecting is False
+    conn.close()
+
+
+def test_tunnel_connect_drops_client_when_closed_meanwhile(monkeypatch):
+    from unittest.mock import MagicMock
+    from agent.connectionpool.connection import ConnectionState
+
+    conn, _ = _opening_tunnel(monkeypatch)
+    monkeypatch.setattr("agent.connectionpool.connection.socket.create_connection", MagicMock())
+    client_cls = MagicMock()
+    client_cls.return_value.connect.side_effect = lambda **kwargs: conn.close()
+    monkeypatch.setattr("agent.connectionpool.connection.SSHClient", client_cls)
+
+    conn._probe()
+    conn._connect_tunnel()
+
+    assert conn.state == ConnectionState.CLOSED
+    assert conn._ssh is None
+    client_cls.return_value.close.assert_called_once()
 
 
 # ---------------------------------------------------------------------------
@@ -189,8 +809,40 @@ def test_upload_file_uses_sftp_putfo():
     assert call_args[0][1] == "/tmp/test.txt"
 
 
-def test_upload_file_closes_sftp_on_success():
-    """upload_file() calls sftp.close() on success."""
+def test_upload_data_returns_attributes_from_putfo():
+    """upload_data() writes raw bytes, applies mode and reports putfo()'s size/mtime."""
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_sftp.putfo.return_value = MagicMock(st_size=3, st_mtime=1700000000)
+    mock_ssh.open_sftp.return_value = mock_sftp
+
+    attrs = conn.upload_data("/tmp/x", b"abc", "0755")
+
+    assert attrs == {"size": 3, "mtime": 1700000000, "mode": 0o755}
+    mock_sftp.chmod.assert_called_once_with("/tmp/x", 0o755)
+    mock_sftp.stat.assert_not_called()
+
+
+def test_stat_file_returns_permission_bits_or_none_when_missing():
+    """stat_file() masks st_mode to permission bits and maps a missing file to None."""
+    import errno
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_sftp.stat.return_value = MagicMock(st_size=3, st_mtime=1700000000, st_mode=0o100644)
+    mock_ssh.open_sftp.return_value = mock_sftp
+
+    assert conn.stat_file("/tmp/x") == {"size": 3, "mtime": 1700000000, "mode": 0o644}
+
+    mock_sftp.stat.side_effect = IOError(errno.ENOENT, "No such file")
+    assert conn.stat_file("/tmp/x") is None
+
+
+def test_upload_file_reuses_sftp_client_across_calls():
+    """upload_file() opens SFTP once and keeps the client for later transfers."""
     import base64
     from unittest.mock import MagicMock
 
@@ -199,13 +851,16 @@ def test_upload_file_closes_sftp_on_success():
     mock_ssh.open_sftp.return_value = mock_sftp
 
     data_b64 = base64.b64encode(b"content").decode()
-    conn.upload_file("/tmp/test.txt", data_b64)
+    conn.upload_file("/tmp/a.txt", data_b64)
+    conn.upload_file("/tmp/b.txt", data_b64)
 
-    mock_sftp.close.assert_called_once()
+    mock_ssh.open_sftp.assert_called_once()
+    assert mock_sftp.putfo.call_count == 2
+    mock_sftp.close.assert_not_called()
 
 
-def test_upload_file_closes_sftp_on_error():
-    """upload_file() calls sftp.close() even when putfo raises."""
+def test_upload_file_keeps_sftp_after_remote_io_error():
+    """A remote IOError (e.g. permission denied) propagates but keeps the SFTP client."""
     import base64
     from unittest.mock import MagicMock
 
@@ -218,7 +873,152 @@ def test_upload_file_closes_sftp_on_error():
     with pytest.raises(IOError):
         conn.upload_file("/tmp/test.txt", data_b64)
 
+    mock_sftp.close.assert_not_called()
+    assert conn._sftp is mock_sftp
+
+
+def test_upload_file_discards_sftp_on_channel_failure():
+    """An SSHException drops the SFTP client so the next transfer reopens it."""
+    import base64
+    from unittest.mock import MagicMock
+    from paramiko import SSHException
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    broken, fresh = MagicMock(), MagicMock()
+    broken.putfo.side_effect = SSHException("Server connection dropped")
+    mock_ssh.open_sftp.side_effect = [broken, fresh]
+
+    data_b64 = base64.b64encode(b"content").decode()
+    with pytest.raises(SSHException):
+        conn.upload_file("/tmp/test.txt", data_b64)
+    conn.upload_file("/tmp/test.txt", data_b64)
+
+    broken.close.assert_called_once()
+    fresh.putfo.assert_called_once()
+
+
+def test_sftp_client_reopened_after_reconnect():
+    """A new connection generation causes the cached SFTP client to be replaced."""
+    import base64
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    first, second = MagicMock(), MagicMock()
+    mock_ssh.open_sftp.side_effect = [first, second]
+
+    data_b64 = base64.b64encode(b"content").decode()
+    conn.upload_file("/tmp/test.txt", data_b64)
+    conn.generation += 1
+    conn.upload_file("/tmp/test.txt", data_b64)
+
+    first.close.assert_called_once()
+    second.putfo.assert_called_once()
+
+
+def test_close_tears_down_sftp_client():
+    """close() closes the cached SFTP client."""
+    import base64
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_ssh.open_sftp.return_value = mock_sftp
+    conn.upload_file("/tmp/test.txt", base64.b64encode(b"x").decode())
+
+    conn.close()
+
     mock_sftp.close.assert_called_once()
+    assert conn._sftp is None
+
+
+def test_sftp_client_holds_one_channel_slot_for_its_lifetime():
+    """Queued SFTP callers take no slot; the open client holds one until it is discarded."""
+    import base64
+    from unittest.mock import MagicMock
+    from agent.connectionpool.connection import DirectConnection, ConnectionState
+
+    config = ConnectionConfig(
+        name="two-slots", mode="direct", user="u", host="127.0.0.1", port=22, id_file="/tmp/id_rsa", max_channels=2
+    )
+    conn = DirectConnection(config)
+    conn._ssh = MagicMock()
+    conn.state = ConnectionState.OPEN
+    started = threading.Event()
+    release = threading.Event()
+
+    def _putfo(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return MagicMock(st_size=1, st_mtime=0)
+
+    conn._ssh.open_sftp.return_value.putfo.side_effect = _putfo
+    conn._ssh.exec_command.side_effect = lambda cmd, timeout=None: _mock_exec_streams(_FakeChannel([b"ok"]))
+
+    data_b64 = base64.b64encode(b"x").decode()
+    uploads = [threading.Thread(target=conn.upload_file, args=(f"/tmp/{i}", data_b64)) for i in range(4)]
+    for t in uploads:
+        t.start()
+    try:
+        assert started.wait(5)
+        assert conn.execute("echo ok", timeout=1).exit_code == 0
+    finally:
+        release.set()
+        for t in uploads:
+            t.join(5)
+
+    assert conn._channel_slots.acquire(blocking=False)
+    assert not conn._channel_slots.acquire(blocking=False)
+    conn._channel_slots.release()
+    conn.close()
+    assert conn._channel_slots.acquire(blocking=False)
+    assert conn._channel_slots.acquire(blocking=False)
+
+
+def test_sftp_open_gives_up_when_no_channel_slot_frees_up():
+    """With every slot taken, opening the SFTP client fails after connect_timeout without holding _sftp_lock."""
+    import base64
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    conn.connect_timeout = 0.2
+    for _ in range(conn.max_channels):
+        conn._channel_slots.acquire()  # e.g. jobs and shell sessions
+    lock_free_while_waiting = []
+    threading.Timer(0.05, lambda: lock_free_while_waiting.append(not conn._sftp_lock.locked())).start()
+
+    with pytest.raises(TimeoutError, match="No free channel"):
+        conn.upload_file("/tmp/test.txt", base64.b64encode(b"x").decode())
+
+    assert lock_free_while_waiting == [True]
+    mock_ssh.open_sftp.assert_not_called()
+
+
+def test_sftp_callers_share_an_open_client_while_slots_are_saturated():
+    import base64
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    conn.upload_file("/tmp/a", base64.b64encode(b"x").decode())
+    while conn._channel_slots.acquire(blocking=False):
+        pass
+
+    conn.upload_file("/tmp/b", base64.b64encode(b"y").decode())
+
+    mock_ssh.open_sftp.assert_called_once()
+
+
+def test_discard_sftp_releases_its_slot_once_when_raced():
+    """close() and a failing transfer both discarding the client release its slot once."""
+    import base64
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    conn.upload_file("/tmp/test.txt", base64.b64encode(b"x").decode())
+
+    conn._discard_sftp()
+    conn._discard_sftp()
+
+    for _ in range(conn.max_channels):
+        assert conn._channel_slots.acquire(blocking=False)
+    assert not conn._channel_slots.acquire(blocking=False)
 
 
 def test_upload_file_invalid_base64_returns_error():
@@ -250,6 +1050,49 @@ def test_upload_file_invalid_mode_returns_error():
     mock_ssh.open_sftp.assert_not_called()
 
 
+# ---------------------------------------------------------------------------
+# BaseConnection remote file handle tests (chunked uploads)
+# ---------------------------------------------------------------------------
+
+
+def test_remote_file_handle_writes_through_shared_sftp():
+    """open/write/finish use the shared SFTP client; finish applies the mode."""
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_ssh.open_sftp.return_value = mock_sftp
+    handle = mock_sftp.open.return_value
+    handle.sftp = mock_sftp
+
+    opened = conn.open_remote_file("/tmp/big.bin")
+    conn.write_remote_file(opened, b"chunk")
+    conn.finish_remote_file(opened, "/tmp/big.bin", "0600")
+
+    mock_ssh.open_sftp.assert_called_once()
+    mock_sftp.open.assert_called_once_with("/tmp/big.bin", "wb")
+    handle.write.assert_called_once_with(b"chunk")
+    handle.close.assert_called_once()
+    mock_sftp.chmod.assert_called_once_with("/tmp/big.bin", 0o600)
+
+
+def test_write_remote_file_rejects_handle_from_previous_sftp_session():
+    """After a reconnect the old handle is refused instead of writing to a dead client."""
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    old_sftp, new_sftp = MagicMock(), MagicMock()
+    mock_ssh.open_sftp.side_effect = [old_sftp, new_sftp]
+    old_sftp.open.return_value.sftp = old_sftp
+
+    handle = conn.open_remote_file("/tmp/big.bin")
+    conn.generation += 1
+
+    with pytest.raises(IOError):
+        conn.write_remote_file(handle, b"chunk")
+    handle.write.assert_not_called()
+
+
 # ---------------------------------------------------------------------------
 # BaseConnection.download_file() tests
 # ---------------------------------------------------------------------------
@@ -272,7 +1115,7 @@ def test_download_file_uses_sftp_getfo():
     # getfo writes bytes into buf
     original_data = b"file content here"
 
-    def fake_getfo(path, buf):
+    def fake_getfo(path, buf, **kwargs):
         buf.write(original_data)
 
     mock_sftp.getfo.side_effect = fake_getfo
@@ -284,6 +1127,7 @@ def test_download_file_uses_sftp_getfo():
     assert "data_b64" in result
     assert base64.b64decode(result["data_b64"]) == original_data
     mock_sftp.getfo.assert_called_once()
+    assert mock_sftp.getfo.call_args.kwargs["max_concurrent_prefetch_requests"] == conn.sftp_prefetch_window
 
 
 def test_download_file_size_guard_stat_too_large():
@@ -307,8 +1151,8 @@ def test_download_file_size_guard_stat_too_large():
     mock_sftp.getfo.assert_not_called()
 
 
-def test_download_file_closes_sftp_on_success():
-    """download_file() calls sftp.close() on success."""
+def test_download_file_not_found_returns_error():
+    """download_file() returns file_not_found when getfo raises IOError."""
     from unittest.mock import MagicMock
 
     conn, mock_ssh = _make_direct_connection_with_mock_ssh()
@@ -318,32 +1162,455 @@ def test_download_file_closes_sftp_on_success():
     mock_stat = MagicMock()
     mock_stat.st_size = 50
     mock_sftp.stat.return_value = mock_stat
+    mock_sftp.getfo.side_effect = IOError("No such file")
 
-    def fake_getfo(path, buf):
-        buf.write(b"data")
+    result = conn.download_file("/tmp/missing.txt")
 
-    mock_sftp.getfo.side_effect = fake_getfo
+    assert result["error"] == "file_not_found"
+    assert result["path"] == "/tmp/missing.txt"
+    mock_sftp.close.assert_not_called()
 
-    conn.download_file("/tmp/test.txt")
 
-    mock_sftp.close.assert_called_once()
+def test_download_file_range_reads_only_requested_bytes():
+    """download_file_range() prefetches just [offset, offset + length) with the configured window."""
+    import base64
+    from unittest.mock import MagicMock
 
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_ssh.open_sftp.return_value = mock_sftp
+    mock_sftp.stat.return_value.st_size = 50 * 1024 * 1024  # beyond the whole-file limit
+    fh = mock_sftp.open.return_value.__enter__.return_value
+    fh.readv.return_value = iter([b"page"])
 
-def test_download_file_not_found_returns_error():
-    """download_file() returns file_not_found when getfo raises IOError."""
+    result = conn.download_file_range("/var/log/huge.log", 1000, 4)
+
+    fh.readv.assert_called_once_with([(1000, 4)], conn.sftp_prefetch_window)
+    assert base64.b64decode(result["data_b64"]) == b"page"
+    assert result["offset"] == 1000
+    assert result["length"] == 4
+    assert result["size_bytes"] == 50 * 1024 * 1024
+    assert result["eof"] is False
+
+
+def test_download_file_range_past_end_returns_empty_eof_page():
+    """Reading at or past the end of the file returns no data and eof=True."""
     from unittest.mock import MagicMock
 
     conn, mock_ssh = _make_direct_connection_with_mock_ssh()
     mock_sftp = MagicMock()
     mock_ssh.open_sftp.return_value = mock_sftp
+    mock_sftp.stat.return_value.st_size = 10
 
-    mock_stat = MagicMock()
-    mock_stat.st_size = 50
-    mock_sftp.stat.return_value = mock_stat
-    mock_sftp.getfo.side_effect = IOError("No such file")
+    result = conn.download_file_range("/tmp/small", 10, 100)
 
-    result = conn.download_file("/tmp/missing.txt")
+    mock_sftp.open.assert_not_called()
+    assert result["length"] == 0
+    assert result["data_b64"] == ""
+    assert result["eof"] is True
 
-    assert result["error"] == "file_not_found"
-    assert result["path"] == "/tmp/missing.txt"
-    mock_sftp.close.assert_called_once()
+
+def test_download_file_range_missing_file_returns_error():
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_ssh.open_sftp.return_value = mock_sftp
+    mock_sftp.stat.side_effect = IOError("No such file")
+
+    assert conn.download_file_range("/nope", 0, 10) == {"error": "file_not_found", "path": "/nope"}
+
+
+def test_download_file_range_clamps_page_to_file_end():
+    """A page reaching past EOF only requests the bytes that exist."""
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_ssh.open_sftp.return_value = mock_sftp
+    mock_sftp.stat.return_value.st_size = 10
+    fh = mock_sftp.open.return_value.__enter__.return_value
+    fh.readv.return_value = iter([b"6789"])
+
+    result = conn.download_file_range("/tmp/small", 6, 100)
+
+    fh.readv.assert_called_once_with([(6, 4)], conn.sftp_prefetch_window)
+    assert result["eof"] is True
+
+
+# ---------------------------------------------------------------------------
+# BaseConnection.sync_file() tests
+# ---------------------------------------------------------------------------
+
+
+def _sync_connection(old: bytes, block_size: int, tool="sha256sum"):
+    """Connection whose execute() fakes the remote digest listing, cp and final hash check."""
+    import hashlib
+    from datetime import datetime, timezone
+    from unittest.mock import MagicMock
+    from agent.connection_result import CommandResult
+    from agent.connectionpool import delta
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_ssh.open_sftp.return_value = mock_sftp
+    assembled = {"data": None}
+    now = datetime.now(timezone.utc)
+
+    def fake_execute(command, timeout=None):
+        if command.startswith("f="):
+            lines = [f"tool {tool}", f"size {len(old)}"]
+            lines += [f"{d}  -" for d in delta.local_digests(old, block_size, tool)]
+            out = "\n".join(lines) + "\n"
+        elif command.startswith(tool):
+            out = hashlib.new(tool[:-3], assembled["data"]).hexdigest() + "  x\n"
+        else:
+            out = ""
+        return CommandResult(command, 0, out, "", now, now)
+
+    conn.execute = MagicMock(side_effect=fake_execute)
+    return conn, mock_sftp, assembled
+
+
+def test_sync_file_sends_only_changed_blocks_and_renames_atomically():
+    old = b"A" * 4096 + b"B" * 4096 + b"C" * 4096
+    new = b"A" * 4096 + b"X" * 4096 + b"C" * 4096
+    conn, mock_sftp, assembled = _sync_connection(old, 4096)
+    assembled["data"] = new
+    fh = mock_sftp.open.return_value.__enter__.return_value
+
+    result = conn.sync_file("/srv/model.bin", new, "0644", block_size=4096)
+
+    assert result["status"] == "synced"
+    assert result["transfer"] == "delta"
+    assert result["blocks_sent"] == 1
+    assert result["bytes_sent"] == 4096
+    tmp_path = mock_sftp.open.call_args.args[0]
+    assert tmp_path.startswith("/srv/.model.bin.sync-")
+    assert mock_sftp.open.call_args.args[1] == "r+b"
+    fh.seek.assert_called_once_with(4096)
+    fh.write.assert_called_once_with(b"X" * 4096)
+    assert any(c.args[0].startswith("cp -- /srv/model.bin ") for c in conn.execute.call_args_list)
+    mock_sftp.truncate.assert_called_once_with(tmp_path, len(new))
+    mock_sftp.posix_rename.assert_called_once_with(tmp_path, "/srv/model.bin")
+
+
+def test_sync_file_unchanged_content_transfers_nothing():
+    data = b"same" * 2048
+    conn, mock_sftp, _ = _sync_connection(data, 4096)
+
+    result = conn.sync_file("/srv/cfg", data, "0600", block_size=4096)
+
+    assert result["status"] == "unchanged"
+    assert result["bytes_sent"] == 0
+    mock_sftp.open.assert_not_called()
+    mock_sftp.chmod.assert_called_once_with("/srv/cfg", 0o600)
+
+
+def test_sync_file_verification_failure_removes_temp_file():
+    old = b"A" * 8192
+    new = b"B" * 8192
+    conn, mock_sftp, assembled = _sync_connection(old, 4096)
+    assembled["data"] = b"corrupted"
+
+    result = conn.sync_file("/srv/f", new, block_size=4096)
+
+    assert result == {"error": "verification_failed", "path": "/srv/f"}
+    tmp_path = mock_sftp.open.call_args.args[0]
+    mock_sftp.remove.assert_called_once_with(tmp_path)
+    mock_sftp.posix_rename.assert_not_called()
+
+
+def test_remote_read_handle_reads_ranges_over_prefetch_window():
+    """read_remote_file() uses readv with the connection's window; stale handles are rejected."""
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    conn.sftp_prefetch_window = 8
+    mock_sftp = MagicMock()
+    mock_ssh.open_sftp.return_value = mock_sftp
+    handle = conn.open_remote_file("/f", "rb")
+    handle.sftp = mock_sftp
+    handle.readv.return_value = iter([b"ab", b"cd"])
+
+    assert conn.read_remote_file(handle, 100, 4) == b"abcd"
+    handle.readv.assert_called_once_with([(100, 4)], 8)
+
+    conn.close_remote_file(handle)
+    handle.close.assert_called_once()
+
+    stale = MagicMock()
+    with pytest.raises(IOError):
+        conn.read_remote_file(stale, 0, 1)
+
+
+def test_open_remote_file_pipelined_and_rename():
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_ssh.open_sftp.return_value = mock_sftp
+
+    handle = conn.open_remote_file("/tmp/x", "wb", pipelined=True)
+    conn.rename_remote_file("/tmp/x", "/tmp/y")
+
+    handle.set_pipelined.assert_called_once_with(True)
+    mock_sftp.posix_rename.assert_called_once_with("/tmp/x", "/tmp/y")
+
+
+def test_reopen_remote_file_truncates_to_offset_and_seeks():
+    from unittest.mock import MagicMock
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_ssh.open_sftp.return_value = mock_sftp
+
+    handle = conn.reopen_remote_file("/tmp/x", 4096, pipelined=True)
+
+    mock_sftp.open.assert_called_once_with("/tmp/x", "r+b")
+    handle.truncate.assert_called_once_with(4096)
+    handle.seek.assert_called_once_with(4096)
+    handle.set_pipelined.assert_called_once_with(True)
+
+
+def test_check_transport_marks_dead_transport_broken():
+    from agent.connectionpool.connection import ConnectionState
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    assert conn.check_transport() is True
+
+    mock_ssh.get_transport.return_value.is_active.return_value = False
+
+    assert conn.check_transport() is False
+    assert conn.state == ConnectionState.BROKEN
+
+
+# ---------------------------------------------------------------------------
+# BaseConnection.upload_data_atomic() tests
+# ---------------------------------------------------------------------------
+
+
+def _atomic_connection(remote_digest=None, exit_code=0, stderr=""):
+    """Connection with a mock SFTP client whose execute() fakes `sha256sum` of the written bytes."""
+    import hashlib
+    from datetime import datetime, timezone
+    from unittest.mock import MagicMock
+    from agent.connection_result import CommandResult
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    mock_sftp = MagicMock()
+    mock_sftp.stat.return_value = MagicMock(st_size=0, st_mtime=1700000000)
+    mock_ssh.open_sftp.return_value = mock_sftp
+    fh = mock_sftp.open.return_value.__enter__.return_value
+    now = datetime.now(timezone.utc)
+
+    def fake_execute(command, timeout=None):
+        written = b"".join(c.args[0] for c in fh.write.call_args_list)
+        digest = remote_digest if remote_digest is not None else hashlib.sha256(written).hexdigest()
+        out = f"{digest}  x\n" if exit_code == 0 else ""
+        return CommandResult(command, exit_code, out, stderr, now, now)
+
+    conn.execute = MagicMock(side_effect=fake_execute)
+    return conn, mock_sftp, fh
+
+
+def test_upload_data_atomic_verifies_then_renames_into_place(monkeypatch):
+    import hashlib
+    import agent.connectionpool.connection as mod
+
+    monkeypatch.setattr(mod, "_SFTP_WRITE_CHUNK", 4)
+    conn, mock_sftp, fh = _atomic_connection()
+    data = b"0123456789"
+
+    result = conn.upload_data_atomic("/srv/app/tool", data, "0755")
+
+    tmp_path = mock_sftp.open.call_args.args[0]
+    assert tmp_path.startswith("/srv/app/.tool.upload-")
+    assert [c.args[0] for c in fh.write.call_args_list] == [b"0123", b"4567", b"89"]
+    fh.set_pipelined.assert_called_once_with(True)
+    mock_sftp.chmod.assert_called_once_with(tmp_path, 0o755)
+    assert conn.execute.call_args.args[0] == f"sha256sum {tmp_path}"
+    mock_sftp.posix_rename.assert_called_once_with(tmp_path, "/srv/app/tool")
+    assert result == {
+        "status": "written",
+        "path": "/srv/app/tool",
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": 0,
+        "mtime": 1700000000,
+        "mode": 0o755,
+    }
+
+
+def test_upload_data_atomic_digest_mismatch_removes_temp_file():
+    import hashlib
+
+    conn, mock_sftp, _ = _atomic_connection(remote_digest="0" * 64)
+
+    result = conn.upload_data_atomic("/srv/f", b"data")
+
+    tmp_path = mock_sftp.open.call_args.args[0]
+    assert result == {
+        "error": "verification_failed",
+        "path": "/srv/f",
+        "expected_sha256": hashlib.sha256(b"data").hexdigest(),
+        "remote_sha256": "0" * 64,
+    }
+    mock_sftp.remove.assert_called_once_with(tmp_path)
+    mock_sftp.posix_rename.assert_not_called()
+
+
+def test_upload_data_atomic_without_remote_sha256sum_fails_cleanly():
+    conn, mock_sftp, _ = _atomic_connection(exit_code=127, stderr="sha256sum: not found\n")
+
+    result = conn.upload_data_atomic("/srv/f", b"data")
+
+    assert result == {"error": "upload_failed", "path": "/srv/f", "detail": "sha256sum: not found"}
+    mock_sftp.remove.assert_called_once()
+    mock_sftp.posix_rename.assert_not_called()
+
+
+def test_upload_data_atomic_write_failure_leaves_target_untouched():
+    conn, mock_sftp, fh = _atomic_connection()
+    fh.write.side_effect = EOFError("connection dropped")
+
+    with pytest.raises(EOFError):
+        conn.upload_data_atomic("/srv/f", b"data")
+
+    mock_sftp.posix_rename.assert_not_called()
+    conn.execute.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# BaseConnection.upload_tree() / download_tree() tests
+# ---------------------------------------------------------------------------
+
+
+class _FakeTarChannel(_FakeChannel):
+    """_FakeChannel that also accepts stdin writes and reports EOF on stdout as b""."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = bytearray()
+        self.write_shut = False
+
+    def settimeout(self, timeout):
+        pass
+
+    def sendall(self, data):
+        self.sent += data
+
+    def shutdown_write(self):
+        self.write_shut = True
+
+    def recv(self, nbytes):
+        return self._stdout.pop(0) if self._stdout else b""
+
+
+def _tar_bytes(members, compress=False):
+    """Build a tar archive from (name, data_or_None_for_dir, mode) tuples."""
+    import io
+    import tarfile
+
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz" if compress else "w") as tar:
+        for name, data, mode in members:
+            info = tarfile.TarInfo(name)
+            info.mode = mode
+            if data is None:
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+            elif isinstance(data, str):
+                info.type = tarfile.SYMTYPE
+                info.linkname = data
+                tar.addfile(info)
+            else:
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_upload_tree_streams_archive_into_remote_tar(compress):
+    """upload_tree() writes a tar of the entries to `tar -x` stdin over one channel."""
+    import io
+    import tarfile
+
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeTarChannel()
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+    entries = [("bin/run.sh", b"#!/bin/sh\n", 0o755), ("etc/app.conf", b"x=1\n", 0o644)]
+
+    result = conn.upload_tree("/opt/app", iter(entries), compress=compress)
+
+    command = mock_ssh.exec_command.call_args[0][0]
+    assert command == f"mkdir -p /opt/app && tar -x{'z' if compress else ''} -f - -C /opt/app"
+    assert channel.write_shut and channel.closed
+    assert result == {
+        "status": "written",
+        "path": "/opt/app",
+        "files": 2,
+        "bytes_total": 14,
+        "bytes_sent": len(channel.sent),
+    }
+    with tarfile.open(fileobj=io.BytesIO(bytes(channel.sent)), mode="r:*") as tar:
+        got = [(m.name, tar.extractfile(m).read(), m.mode) for m in tar.getmembers()]
+    assert got == entries
+
+
+def test_upload_tree_reports_remote_tar_failure():
+    """A non-zero tar exit becomes a tree_failed error carrying stderr."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeTarChannel(stderr_chunks=[b"mkdir: permission denied\n"], exit_status=1)
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+
+    result = conn.upload_tree("/root/x", iter([("a", b"a", 0o644)]))
+
+    assert result == {"error": "tree_failed", "path": "/root/x", "exit_code": 1,
+                      "stderr": "mkdir: permission denied\n"}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_download_tree_returns_regular_files_and_skips_links(compress):
+    """download_tree() parses the `tar -c` stream into files and skipped entries."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    archive = _tar_bytes(
+        [(".", None, 0o755), ("./bin", None, 0o755), ("./bin/run.sh", b"echo hi\n", 0o755),
+         ("./latest", "bin/run.sh", 0o777)],
+        compress=compress,
+    )
+    channel = _FakeTarChannel([archive[i:i + 1000] for i in range(0, len(archive), 1000)])
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+
+    result = conn.download_tree("/opt/app", compress=compress)
+
+    assert mock_ssh.exec_command.call_args[0][0] == f"tar -c{'z' if compress else ''} -f - -C /opt/app ."
+    assert result == {
+        "status": "ok",
+        "path": "/opt/app",
+        "files": [("bin/run.sh", b"echo hi\n", 0o755)],
+        "skipped": ["latest"],
+        "bytes_total": 8,
+        "bytes_received": len(archive),
+    }
+
+
+def test_download_tree_enforces_size_limit():
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeTarChannel([_tar_bytes([("./a", b"12345", 0o644), ("./b", b"67890", 0o644)])])
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+
+    result = conn.download_tree("/d", max_bytes=8)
+
+    assert result == {"error": "tree_too_large", "path": "/d", "limit_bytes": 8}
+    assert channel.closed
+
+
+def test_download_tree_reports_missing_directory():
+    """An empty stream plus a failing tar exit becomes tree_failed with tar's stderr."""
+    conn, mock_ssh = _make_direct_connection_with_mock_ssh()
+    channel = _FakeTarChannel(stderr_chunks=[b"tar: /nope: Cannot open\n"], exit_status=2)
+    mock_ssh.exec_command.return_value = _mock_exec_streams(channel)
+
+    result = conn.download_tree("/nope")
+
+    assert result == {"error": "tree_failed", "path": "/nope", "exit_code": 2, "stderr": "tar: /nope: Cannot open\n"}
@@ -0,0 +1,66 @@
+"""Unit tests for delta sync block-digest helpers."""
+
+import hashlib
+import subprocess
+
+import pytest
+
+from agent.connectionpool import delta
+
+
+def _listing(tool, data, block_size):
+    lines = [f"tool {tool}", f"size {len(data)}"]
+    lines += [f"{d}  -" for d in delta.local_digests(data, block_size, tool)]
+    return "\n".join(lines) + "\n"
+
+
+def test_parse_remote_digests_with_blocks():
+    data = b"a" * 10 + b"b" * 10
+    remote = delta.parse_remote_digests(_listing("sha256sum", data, 10))
+
+    assert remote.exists and remote.tool == "sha256sum"
+    assert remote.size == 20
+    assert remote.digests == [hashlib.sha256(b"a" * 10).hexdigest(), hashlib.sha256(b"b" * 10).hexdigest()]
+
+
+def test_parse_remote_digests_missing_and_nohash():
+    missing = delta.parse_remote_digests("tool md5sum\nmissing\n")
+    nohash = delta.parse_remote_digests("tool none\n")
+
+    assert (missing.exists, missing.tool) == (False, "md5sum")
+    assert (nohash.exists, nohash.tool) == (True, None)
+
+
+def test_parse_remote_digests_rejects_garbage():
+    with pytest.raises(ValueError):
+        delta.parse_remote_digests("sh: dd: not found\n")
+
+
+def test_changed_runs_coalesces_adjacent_blocks_and_appended_tail():
+    local = ["a", "X", "Y", "d", "e", "f"]
+    remote = ["a", "b", "c", "d"]
+
+    assert delta.changed_runs(local, remote) == [(1, 2), (4, 2)]
+    assert delta.changed_runs(remote, remote) == []
+
+
+def test_effective_block_size_caps_block_count():
+    assert delta.effective_block_size(4096, 100) == 4096
+    huge = delta.MAX_BLOCKS * 4096 * 10
+    assert delta.effective_block_size(4096, huge) == 40960
+
+
+def test_remote_digest_script_matches_local_digests(tmp_path):
+    """The POSIX script's listing agrees with local_digests() for the same content."""
+    data = bytes(range(256)) * 50
+    target = tmp_path / "file.bin"
+    target.write_bytes(data)
+
+    out = subprocess.run(
+        ["sh", "-c", delta.remote_digest_script(str(target), 4096)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    remote = delta.parse_remote_digests(out)
+
+    assert remote.size == len(data)
+    assert remote.digests == delta.local_digests(data, 4096, remote.tool)
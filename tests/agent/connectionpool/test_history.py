@@ -0,0 +1,95 @@
+"""Unit tests for the bounded per-connection CommandHistory."""
+
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from agent.connection_result import CommandResult
+from agent.connectionpool.history import CommandHistory
+
+
+def _result(command="echo hi", stdout="hi\n", stderr=""):
+    now = datetime.now(timezone.utc)
+    return CommandResult(
+        command=command,
+        exit_code=0,
+        stdout=stdout,
+        stderr=stderr,
+        started_at=now,
+        ended_at=now,
+    )
+
+
+def test_history_evicts_oldest_when_capacity_reached():
+    history = CommandHistory(capacity=3)
+    for i in range(5):
+        history.record(_result(command=f"cmd-{i}"))
+
+    page = history.page(0, 10)
+
+    assert len(history) == 3
+    assert page["total_recorded"] == 5
+    assert [r["command"] for r in page["records"]] == ["cmd-4", "cmd-3", "cmd-2"]
+
+
+def test_history_page_is_newest_first_with_next_offset():
+    history = CommandHistory(capacity=10)
+    for i in range(5):
+        history.record(_result(command=f"cmd-{i}"))
+
+    first = history.page(0, 2)
+    second = history.page(first["next_offset"], 2)
+    last = history.page(second["next_offset"], 2)
+
+    assert [r["command"] for r in first["records"]] == ["cmd-4", "cmd-3"]
+    assert [r["command"] for r in second["records"]] == ["cmd-2", "cmd-1"]
+    assert [r["command"] for r in last["records"]] == ["cmd-0"]
+    assert last["next_offset"] is None
+
+
+def test_history_keeps_only_output_preview():
+    history = CommandHistory(capacity=2, preview_chars=4)
+
+    rec = history.record(_result(stdout="abcdefgh", stderr="xy"))
+
+    assert rec.stdout == "abcd"
+    assert rec.stdout_truncated is True
+    assert rec.stderr == "xy"
+    assert rec.stderr_truncated is False
+    assert rec.spill_path is None
+
+
+def test_history_record_uses_slots():
+    rec = CommandHistory().record(_result())
+    with pytest.raises(AttributeError):
+        rec.extra = 1
+
+
+def test_history_spills_large_output_and_removes_file_on_eviction(tmp_path):
+    history = CommandHistory(capacity=1, preview_chars=4, spill_dir=str(tmp_path))
+
+    rec = history.record(_result(stdout="0123456789"))
+    assert rec.spill_path is not None
+    with open(rec.spill_path, encoding="utf-8") as f:
+        assert "0123456789" in f.read()
+
+    history.record(_result(stdout="ok"))
+    assert not os.path.exists(rec.spill_path)
+
+
+def test_describe_returns_one_history_page():
+    from agent.connectionpool.config_loader import ConnectionConfig
+    from agent.connectionpool.connection import DirectConnection
+
+    conn = DirectConnection(ConnectionConfig(
+        name="hist", mode="direct", user="u", host="127.0.0.1", port=22, id_file="/tmp/id_rsa",
+    ))
+    for i in range(30):
+        conn._history.record(_result(command=f"cmd-{i}"))
+
+    described = conn.describe(history_limit=5)
+
+    assert described["history"]["total_recorded"] == 30
+    assert len(described["history"]["records"]) == 5
+    assert described["history"]["records"][0]["command"] == "cmd-29"
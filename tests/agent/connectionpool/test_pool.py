@@ -1,4 +1,5 @@
 import logging
+from concurrent.futures import wait
 from unittest.mock import MagicMock, patch
 
 from agent.connectionpool.config_loader import ConnectionConfig
@@ -11,17 +12,17 @@ from agent.connectionpool.pool import ConnectionPool
 # ---------------------------------------------------------------------------
 
 def _make_pool_with_fake_connections(names):
-    """Return a ConnectionPool whose self.connections are MagicMock objects.
+    """Return a ConnectionPool whose connections are MagicMock objects.
 
     The pool is built with an empty config list so no real Connection objects
-    are created, then the fake connections are injected directly.
+    are created, then the fake connections are injected into the name index.
     """
     pool = ConnectionPool([])
     for name in names:
         conn = MagicMock()
         conn.name = name
         conn.get_state.return_value = ConnectionState.OPEN
-        pool.connections.append(conn)
+        pool._connections[name] = conn
     return pool
 
 
@@ -187,7 +188,7 @@ def test_monitor_reopens_enabled_connection():
     # _stopping so the monitor body actually runs.
     with patch.object(pool, "_schedule_monitor"), \
          patch.object(pool, "gather_os_info"):
-        pool._monitor_once()
+        wait(pool._monitor_once())
 
     conn.open.assert_called_once()
 
@@ -216,6 +217,31 @@ def test_get_connection_state_broken():
     assert pool.get_connection_state("zeta") == "broken"
 
 
+def test_snapshot_states_returns_every_state_in_one_pass():
+    pool = _make_pool_with_fake_connections(["alpha", "beta", "gamma"])
+    pool.get_connection("beta").get_state.return_value = ConnectionState.BROKEN
+    pool.remove_connection("gamma")
+
+    assert pool.snapshot_states() == {"alpha": "open", "beta": "broken"}
+
+
+def test_snapshot_rtt_returns_each_connection_summary():
+    pool = _make_pool_with_fake_connections(["alpha", "beta"])
+    pool.get_connection("alpha").rtt.snapshot.return_value = {"last_ms": 4.0}
+    pool.get_connection("beta").rtt.snapshot.return_value = None
+
+    assert pool.snapshot_rtt() == {"alpha": {"last_ms": 4.0}, "beta": None}
+
+
+def test_connections_property_is_a_snapshot_in_insertion_order():
+    pool = _make_pool_with_fake_connections(["b", "a"])
+    snapshot = pool.connections
+    pool.remove_connection("b")
+
+    assert [c.name for c in snapshot] == ["b", "a"]
+    assert [c.name for c in pool.connections] == ["a"]
+
+
 # ---------------------------------------------------------------------------
 # query_pool tests (Cleanup 3)
 # ---------------------------------------------------------------------------
@@ -362,3 +388,155 @@ def test_add_connection_rejects_duplicate():
 
     # Pool must still contain only one connection named "xi"
     assert sum(1 for c in pool.connections if c.name == "xi") == 1
+
+
+# ---------------------------------------------------------------------------
+# start() tests
+# ---------------------------------------------------------------------------
+
+def _start_pool(pool):
+    """Run start() with OS info gathering stubbed out; stop the monitor afterwards."""
+    pool.gather_os_info = MagicMock()
+    try:
+        return pool.start()
+    finally:
+        pool.stop()
+
+
+def test_start_opens_connections_in_parallel():
+    import threading
+
+    names = ["a", "b", "c", "d"]
+    pool = _make_pool_with_fake_connections(names)
+    pool.start_parallel = len(names)
+    # Every open() waits until all four are in flight at once; serial opens would time out.
+    barrier = threading.Barrier(len(names), timeout=2)
+    for conn in pool.connections:
+        conn.open.side_effect = lambda: barrier.wait()
+
+    report = _start_pool(pool)
+
+    assert (report["open"], report["failed"], report["pending"]) == (4, 0, 0)
+    assert [n["name"] for n in report["nodes"]] == names
+    assert all(n["elapsed_seconds"] < 2 for n in report["nodes"])
+
+
+def test_start_reports_failed_open_with_detail():
+    pool = _make_pool_with_fake_connections(["ok", "down"])
+    down = pool.get_connection("down")
+    down.open.side_effect = OSError("No route to host")
+    down.get_state.return_value = ConnectionState.BROKEN
+
+    report = _start_pool(pool)
+
+    assert (report["open"], report["failed"]) == (1, 1)
+    assert report["nodes"][1] == {
+        "name": "down", "state": "broken", "detail": "No route to host",
+        "elapsed_seconds": report["nodes"][1]["elapsed_seconds"],
+    }
+
+
+def test_start_returns_after_start_timeout_with_pending_nodes():
+    import threading
+
+    pool = _make_pool_with_fake_connections(["slow", "fast"])
+    pool.start_timeout = 0.1
+    release = threading.Event()
+    pool.get_connection("slow").open.side_effect = lambda: release.wait(5)
+    try:
+        report = _start_pool(pool)
+    finally:
+        release.set()
+
+    assert (report["open"], report["pending"]) == (1, 1)
+    assert report["nodes"][0] == {"name": "slow", "state": "pending", "elapsed_seconds": None}
+
+
+# ---------------------------------------------------------------------------
+# Reconnect scheduling
+# ---------------------------------------------------------------------------
+
+def _tick(pool):
+    """Run one monitor tick without rescheduling and wait for its reconnects."""
+    with patch.object(pool, "_schedule_monitor"):
+        futures = pool._monitor_once()
+    wait(futures)
+    return futures
+
+
+def test_monitor_reconnects_down_connections_in_parallel():
+    import threading
+
+    names = ["r1", "r2", "r3"]
+    pool = _make_pool_with_fake_connections(names)
+    pool.gather_os_info = MagicMock()
+    barrier = threading.Barrier(len(names), timeout=2)
+    for conn in pool.connections:
+        conn.get_state.return_value = ConnectionState.BROKEN
+
+        def _open(conn=conn):
+            barrier.wait()  # all three attempts must be in flight together
+            conn.get_state.return_value = ConnectionState.OPEN
+
+        conn.open.side_effect = _open
+    try:
+        futures = _tick(pool)
+    finally:
+        pool._reconnect_pool.shutdown(wait=True)
+
+    assert len(futures) == 3
+    assert all(f.exception() is None for f in futures)
+    assert pool.snapshot_states() == {"r1": "open", "r2": "open", "r3": "open"}
+
+
+def test_failing_connection_backs_off_and_recovers_after_enable():
+    pool = _make_pool_with_fake_connections(["dead"])
+    pool.gather_os_info = MagicMock()
+    conn = pool.get_connection("dead")
+    conn.get_state.return_value = ConnectionState.BROKEN
+    conn.open.side_effect = OSError("timed out")
+    try:
+        assert len(_tick(pool)) == 1
+        # Backing off: the following ticks do not retry the dead host.
+        assert _tick(pool) == []
+        assert _tick(pool) == []
+        assert conn.open.call_count == 1
+        assert pool._backoff.failures("dead") == 1
+
+        pool.disable_connection("dead")
+        pool.enable_connection("dead")  # re-enabling clears the backoff
+        assert len(_tick(pool)) == 1
+        assert conn.open.call_count == 2
+    finally:
+        pool._reconnect_pool.shutdown(wait=True)
+
+
+def test_monitor_skips_opening_connection():
+    pool = _make_pool_with_fake_connections(["tunnel"])
+    pool.get_connection("tunnel").get_state.return_value = ConnectionState.OPENING
+
+    assert _tick(pool) == []
+    pool.get_connection("tunnel").open.assert_not_called()
+
+
+def test_queued_reconnect_skips_connection_reopened_meanwhile():
+    import threading
+
+    pool = _make_pool_with_fake_connections(["busy", "node"])
+    pool.gather_os_info = MagicMock()
+    pool.reconnect_parallel = 1
+    busy, conn = pool.get_connection("busy"), pool.get_connection("node")
+    release = threading.Event()
+    busy.get_state.return_value = ConnectionState.BROKEN
+    busy.open.side_effect = lambda: release.wait(5)
+    conn.get_state.return_value = ConnectionState.BROKEN
+    try:
+        with patch.object(pool, "_schedule_monitor"):
+            futures = pool._monitor_once()  # "node" waits behind "busy" in the one worker
+        conn.get_state.return_value = ConnectionState.OPEN  # e.g. ensure_connection_open()
+        release.set()
+        wait(futures)
+    finally:
+        pool._reconnect_pool.shutdown(wait=True)
+
+    conn.open.assert_not_called()
@@ -0,0 +1,51 @@
+"""Unit tests for ReconnectBackoff (per-connection reconnect schedule)."""
+
+import random
+
+from agent.connectionpool.reconnect import ReconnectBackoff
+
+
+def test_unknown_connection_is_due_immediately():
+    backoff = ReconnectBackoff(base_delay=5)
+    assert backoff.is_due("n1", now=0) is True
+
+
+def test_delay_doubles_per_failure_up_to_max():
+    backoff = ReconnectBackoff(base_delay=2, max_delay=10, jitter=0)
+
+    delays = [backoff.failed("n1", now=0) for _ in range(5)]
+
+    assert delays == [2, 4, 8, 10, 10]
+    assert backoff.is_due("n1", now=9.9) is False
+    assert backoff.is_due("n1", now=10) is True
+    assert backoff.failures("n1") == 5
+
+
+def test_jitter_only_shortens_the_delay():
+    backoff = ReconnectBackoff(base_delay=8, jitter=0.5, rng=random.Random(7))
+
+    delays = [backoff.failed(f"n{i}", now=0) for i in range(50)]
+
+    assert all(4 <= d <= 8 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_success_resets_history():
+    backoff = ReconnectBackoff(base_delay=5, jitter=0)
+    backoff.failed("n1", now=0)
+
+    backoff.succeeded("n1")
+
+    assert backoff.is_due("n1", now=0) is True
+    assert backoff.failures("n1") == 0
+    assert backoff.failed("n1", now=0) == 5
+
+
+def test_delay_stays_capped_after_many_failures():
+    backoff = ReconnectBackoff(base_delay=5, max_delay=300, jitter=0)
+
+    delays = [backoff.failed("n1", now=0) for _ in range(1100)]
+
+    assert delays[-1] == 300
+    assert backoff.failures("n1") == 1100
+    assert backoff.is_due("n1", now=299) is False
@@ -0,0 +1,40 @@
+"""Unit tests for RttTracker (keepalive round-trip statistics)."""
+
+from agent.connectionpool.rtt import RttTracker
+
+
+def test_snapshot_is_none_before_any_data():
+    assert RttTracker().snapshot() is None
+
+
+def test_last_ewma_and_p95():
+    tracker = RttTracker(alpha=0.5)
+    for rtt in (0.010, 0.020):
+        tracker.record(rtt)
+
+    snap = tracker.snapshot()
+
+    assert snap["last_ms"] == 20.0
+    assert snap["ewma_ms"] == 15.0
+    assert snap["p95_ms"] == 20.0
+    assert (snap["samples"], snap["missed"]) == (2, 0)
+    assert snap["measured_at"] is not None
+
+
+def test_p95_over_sliding_window():
+    tracker = RttTracker(window=20)
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+
+    # Only the last 20 samples (81..100 ms) remain in the window.
+    assert tracker.snapshot()["p95_ms"] == 99.0
+    assert tracker.snapshot()["samples"] == 100
+
+
+def test_misses_are_reported_without_samples():
+    tracker = RttTracker()
+    tracker.record_miss()
+
+    assert tracker.snapshot() == {
+        "last_ms": None, "ewma_ms": None, "p95_ms": None, "samples": 0, "missed": 1, "measured_at": None,
+    }
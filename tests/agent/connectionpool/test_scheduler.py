@@ -0,0 +1,119 @@
+"""Unit tests for TimerScheduler (shared heap-based timer scheduler)."""
+
+import threading
+import time
+
+import pytest
+
+from agent.connectionpool.connection import OneShotRepeatingTimer
+from agent.connectionpool.scheduler import TimerScheduler
+
+
+@pytest.fixture
+def scheduler():
+    sched = TimerScheduler(workers=2, late_threshold=0.05)
+    yield sched
+    sched.shutdown()
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_call_later_runs_once(scheduler):
+    fired = threading.Event()
+    calls = []
+    scheduler.call_later(0.01, lambda: (calls.append(1), fired.set()))
+
+    assert fired.wait(2)
+    time.sleep(0.05)
+    assert calls == [1]
+
+
+def test_call_every_repeats_until_cancelled(scheduler):
+    calls = []
+    task = scheduler.call_every(0.01, lambda: calls.append(1))
+
+    assert _wait_until(lambda: len(calls) >= 3)
+    task.cancel()
+    time.sleep(0.03)
+    count = len(calls)
+    time.sleep(0.05)
+    assert len(calls) == count
+
+
+def test_many_tasks_share_a_fixed_thread_set(scheduler):
+    before = threading.active_count()
+    counts = [0] * 500
+
+    def _make(i):
+        def _tick():
+            counts[i] += 1
+        return _tick
+
+    tasks = [scheduler.call_every(0.01, _make(i), first_delay=0) for i in range(500)]
+
+    assert _wait_until(lambda: all(c >= 2 for c in counts))
+    assert threading.active_count() - before <= scheduler.workers + 1
+    for task in tasks:
+        task.cancel()
+
+
+def test_runs_of_one_task_never_overlap(scheduler):
+    active = []
+    overlap = []
+
+    def _slow():
+        active.append(1)
+        overlap.append(len(active) > 1)
+        time.sleep(0.03)
+        active.pop()
+
+    task = scheduler.call_every(0.001, _slow, first_delay=0)
+    assert _wait_until(lambda: len(overlap) >= 3)
+    task.cancel()
+
+    assert not any(overlap)
+
+
+def test_stats_report_overruns_late_runs_and_errors():
+    sched = TimerScheduler(workers=1, late_threshold=0.05)
+    try:
+        blocker = sched.call_every(0.01, lambda: time.sleep(0.1), first_delay=0)
+        late = threading.Event()
+        sched.call_later(0.0, late.set)
+        sched.call_later(0.0, lambda: 1 / 0)
+
+        assert late.wait(2)
+        assert _wait_until(lambda: sched.stats()["errors"] == 1)
+        blocker.cancel()
+        stats = sched.stats()
+    finally:
+        sched.shutdown()
+
+    assert stats["overruns"] >= 1
+    assert stats["late_runs"] >= 1
+    assert stats["max_lateness_seconds"] >= 0.05
+    assert stats["max_run_seconds"] >= 0.1
+    assert stats["workers"] == 1
+
+
+def test_one_shot_repeating_timer_uses_given_scheduler(scheduler):
+    calls = []
+    timer = OneShotRepeatingTimer(0.01, lambda: calls.append(1), scheduler=scheduler)
+    timer.start()
+    timer.start()  # idempotent
+
+    assert _wait_until(lambda: len(calls) >= 2)
+    timer.cancel()
+    timer.start()  # no restart after cancel
+    time.sleep(0.03)
+    count = len(calls)
+    time.sleep(0.05)
+    assert len(calls) == count
+    assert scheduler.stats()["pending"] == 0
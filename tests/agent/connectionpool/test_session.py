@@ -0,0 +1,190 @@
+"""Unit tests for ShellSession sentinel framing over a fake `sh` channel."""
+
+import re
+import threading
+
+import pytest
+
+from agent.connectionpool.session import SessionClosed, ShellSession, _FramedStream
+
+
+class _FakeShellChannel:
+    """Fake channel running `sh`: answers each framed command from a script.
+
+    script maps command -> (stdout bytes, stderr bytes, exit code). Replies are
+    delivered in *chunk*-byte pieces to exercise sentinel detection across reads.
+    A command mapped to None never answers (simulates a hang).
+    """
+
+    def __init__(self, script, chunk=3):
+        self.script = script
+        self.chunk = chunk
+        self.sent = []
+        self._stdout = bytearray()
+        self._stderr = bytearray()
+        self.closed = False
+        self.eof_received = False
+
+    def sendall(self, data):
+        text = data.decode()
+        self.sent.append(text)
+        command = re.match(r"\{ (.*)\n\} </dev/null\n", text, re.S).group(1)
+        token = re.search(r"'(__MCP_END_[0-9a-f]+__)'", text).group(1).encode()
+        reply = self.script[command]
+        if reply is None:
+            return
+        out, err, rc = reply
+        self._stdout += out + b"\n" + token + b" " + str(rc).encode() + b"\n"
+        self._stderr += err + b"\n" + token + b"\n"
+
+    def recv_ready(self):
+        return bool(self._stdout)
+
+    def recv(self, nbytes):
+        piece = bytes(self._stdout[:self.chunk])
+        del self._stdout[:self.chunk]
+        return piece
+
+    def recv_stderr_ready(self):
+        return bool(self._stderr)
+
+    def recv_stderr(self, nbytes):
+        piece = bytes(self._stderr[:self.chunk])
+        del self._stderr[:self.chunk]
+        return piece
+
+    def fileno(self):
+        # Only reached while waiting on a hung command; an idle socketpair never becomes readable.
+        import socket
+        if not hasattr(self, "_pair"):
+            self._pair = socket.socketpair()
+        return self._pair[0].fileno()
+
+    def close(self):
+        self.closed = True
+        if hasattr(self, "_pair"):
+            for s in self._pair:
+                s.close()
+
+
+def test_framed_stream_detects_marker_split_across_chunks():
+    stream = _FramedStream(b"\nEND ", limit=100)
+    for piece in (b"hel", b"lo\nE", b"ND 0", b"\n"):
+        stream.feed(piece)
+
+    assert stream.done
+    assert stream.getvalue() == b"hello"
+    assert bytes(stream.trailer) == b"0\n"
+
+
+def test_session_run_returns_output_and_exit_code():
+    channel = _FakeShellChannel({"ls /nope": (b"", b"ls: /nope: No such file", 2)})
+    session = ShellSession("n1", channel)
+
+    result = session.run("ls /nope", timeout=5)
+
+    assert result.exit_code == 2
+    assert result.stdout == ""
+    assert result.stderr == "ls: /nope: No such file"
+
+
+def test_session_runs_successive_commands_on_same_channel():
+    channel = _FakeShellChannel({
+        "cd /tmp": (b"", b"", 0),
+        "pwd": (b"/tmp\n", b"", 0),
+    })
+    session = ShellSession("n1", channel)
+
+    session.run("cd /tmp", timeout=5)
+    result = session.run("pwd", timeout=5)
+
+    assert result.stdout == "/tmp\n"
+    assert len(channel.sent) == 2
+    assert not channel.closed
+
+
+def test_session_truncates_output_beyond_limit():
+    channel = _FakeShellChannel({"yes": (b"y\n" * 10, b"", 0)})
+    session = ShellSession("n1", channel)
+
+    result = session.run("yes", timeout=5, output_limit=4)
+
+    assert result.stdout == "y\ny\n"
+    assert result.stdout_truncated is True
+    assert result.stdout_total_bytes == 20
+
+
+def test_session_timeout_closes_session_and_releases_slot():
+    released = threading.Event()
+    channel = _FakeShellChannel({"sleep 100": None})
+    session = ShellSession("n1", channel, on_close=released.set)
+
+    with pytest.raises(TimeoutError):
+        session.run("sleep 100", timeout=0.1)
+
+    assert channel.closed
+    assert released.is_set()
+    with pytest.raises(SessionClosed):
+        session.run("true", timeout=1)
+
+
+def test_session_reports_closed_when_shell_exited():
+    channel = _FakeShellChannel({})
+    channel.eof_received = True
+    session = ShellSession("n1", channel)
+
+    with pytest.raises(SessionClosed):
+        session.run("true", timeout=1)
+
+
+def test_session_records_results_via_callback():
+    recorded = []
+    channel = _FakeShellChannel({"true": (b"", b"", 0)})
+    session = ShellSession("n1", channel, on_result=recorded.append)
+
+    session.run("true", timeout=5)
+
+    assert [r.command for r in recorded] == ["true"]
+
+
+def test_open_shell_session_holds_channel_slot_until_closed():
+    from unittest.mock import MagicMock
+    from agent.connectionpool.config_loader import ConnectionConfig
+    from agent.connectionpool.connection import DirectConnection, ConnectionState
+
+    conn = DirectConnection(ConnectionConfig(
+        name="s", mode="direct", user="u", host="127.0.0.1", port=22, id_file="/tmp/id", max_channels=1,
+    ))
+    conn._ssh = MagicMock()
+    conn.state = ConnectionState.OPEN
+
+    session = conn.open_shell_session()
+    conn._ssh.get_transport.return_value.open_session.return_value.exec_command.assert_called_once_with("sh")
+    with pytest.raises(TimeoutError):
+        conn.open_shell_session(timeout=0.05)
+
+    session.close()
+    conn.open_shell_session(timeout=0.05).close()
+
+
+def test_session_wait_handles_channel_descriptor_above_1024():
+    """A hung command on a channel whose pipe fd is >= 1024 still times out cleanly."""
+    import os
+    import resource
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft <= 1500:
+        if hard != resource.RLIM_INFINITY and hard <= 1500:
+            pytest.skip("RLIMIT_NOFILE too low to open a descriptor above 1024")
+        resource.setrlimit(resource.RLIMIT_NOFILE, (1501, hard))
+    r, w = os.pipe()
+    os.dup2(r, 1500)
+    os.close(r)
+    channel = _FakeShellChannel({"sleep 60": None})
+    channel.fileno = lambda: 1500
+    try:
+        with pytest.raises(TimeoutError):
+            ShellSession("n1", channel).run("sleep 60", timeout=0.05)
+    finally:
+        os.close(1500)
+        os.close(w)
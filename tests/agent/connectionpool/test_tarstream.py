@@ -0,0 +1,64 @@
+"""Unit tests for streaming tar tree-transfer helpers."""
+
+import io
+import shutil
+import subprocess
+
+import pytest
+
+from agent.connectionpool import tarstream
+
+
+@pytest.mark.parametrize(
+    "path, ok",
+    [
+        ("a.txt", True),
+        ("dir/./b", True),
+        ("", False),
+        ("/etc/passwd", False),
+        ("../x", False),
+        ("a/../../x", False),
+        (".", False),
+    ],
+)
+def test_is_safe_member_path(path, ok):
+    assert tarstream.is_safe_member_path(path) is ok
+
+
+def test_archive_round_trip_through_stream_modes():
+    entries = [("bin/run.sh", b"#!/bin/sh\n", 0o755), ("data.bin", bytes(range(256)) * 100, 0o600)]
+    for compress in (False, True):
+        buf = io.BytesIO()
+
+        assert tarstream.write_archive(buf, iter(entries), compress) == (2, 10 + 25600)
+
+        buf.seek(0)
+        assert tarstream.read_archive(buf, compress, max_bytes=1 << 20) == (entries, [])
+
+
+def test_read_archive_raises_past_limit():
+    buf = io.BytesIO()
+    tarstream.write_archive(buf, [("a", b"x" * 10, 0o644), ("b", b"y" * 10, 0o644)], False)
+    buf.seek(0)
+
+    with pytest.raises(tarstream.TreeTooLarge):
+        tarstream.read_archive(buf, False, max_bytes=15)
+
+
+@pytest.mark.skipif(shutil.which("tar") is None, reason="tar not available")
+@pytest.mark.parametrize("compress", [False, True])
+def test_commands_round_trip_with_local_tar(tmp_path, compress):
+    """The generated tar -x / tar -c command lines work against a real tar."""
+    target = tmp_path / "tree dir"
+    buf = io.BytesIO()
+    tarstream.write_archive(buf, [("a/b.txt", b"hello", 0o640), ("c", b"", 0o755)], compress)
+
+    subprocess.run(["sh", "-c", tarstream.extract_command(str(target), compress)], input=buf.getvalue(), check=True)
+    out = subprocess.run(
+        ["sh", "-c", tarstream.create_command(str(target), compress)], capture_output=True, check=True
+    ).stdout
+    files, skipped = tarstream.read_archive(io.BytesIO(out), compress, max_bytes=1024)
+
+    assert (target / "a" / "b.txt").read_bytes() == b"hello"
+    assert sorted(files) == [("a/b.txt", b"hello", 0o640), ("c", b"", 0o755)]
+    assert skipped == []
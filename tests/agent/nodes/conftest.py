@@ -1,7 +1,8 @@
 """Shared helpers for agent/nodes unit tests.
 
 These are used across test_registry.py, test_node_status_info.py,
-test_node_lifecycle.py, test_node_readiness.py, and test_node_execution_service.py.
+test_node_lifecycle.py, test_node_readiness.py, test_node_execution_service.py,
+test_jobs.py, test_session_service.py and test_upload_service.py.
 """
 
 from agent.nodes.models import NodeConfig, NodeInfoCache
@@ -35,9 +36,10 @@ def make_mock_connection(name, state):
 
 
 def make_mock_pool(connections=None):
-    """Build a mock pool whose get_connection_state() delegates to mock connections.
+    """Build a mock pool whose get_connection_state()/snapshot_states() delegate to mock connections.
 
-    NodeService calls pool.get_connection_state(name) — never pool.connections directly.
+    NodeService calls pool.get_connection_state(name) or pool.snapshot_states() —
+    never pool.connections directly.
     """
     from unittest.mock import MagicMock
     from agent.connectionpool.connection import ConnectionState
@@ -59,7 +61,13 @@ def make_mock_pool(connections=None):
                 return _STATE_MAP.get(state, "closed")
         return "not_in_pool"
 
+    def snapshot_states():
+        return {conn.name: _STATE_MAP.get(conn.get_state(), "closed") for conn in conns}
+
     pool.get_connection_state.side_effect = get_connection_state
+    pool.snapshot_states.side_effect = snapshot_states
+    pool.snapshot_rtt.return_value = {}
+    pool.timer_stats.return_value = {"workers": 4, "pending": 0, "runs": 0, "late_runs": 0, "overruns": 0}
     return pool
 
 
@@ -95,6 +103,70 @@ def make_service(nodes=None, pool_connections=None, identity_service=None):
     return NodeService(registry=registry, pool=pool, handshake_service=handshake, agent_identity_service=effective_identity)
 
 
+def _open_node_registry(names):
+    registry = NodeRegistry()
+    for name in names:
+        registry.add(NodeConfig(
+            name=name, mode="direct", enabled=True,
+            host="192.168.1.10", port=22, user="pi", id_file=None,
+        ))
+    return registry
+
+
+def _noop_handshake():
+    from unittest.mock import MagicMock
+    hs = MagicMock()
+    hs.run.return_value = {}
+    return hs
+
+
+def make_service_with_open_connection(name="lab-pi-01", connection=None, **service_kwargs):
+    """Build a NodeService where the named node is enabled and has an open connection.
+
+    connection: the connection the pool hands out (defaults to a MagicMock named *name*).
+    service_kwargs: passed through to NodeService (job_registry, upload_cache, ...).
+    Returns (svc, connection). The pool's get_connection/ensure_connection_open
+    use return_value, so a test can swap the connection or return None later.
+    """
+    from unittest.mock import MagicMock
+
+    if connection is None:
+        connection = MagicMock()
+        connection.name = name
+    pool = MagicMock()
+    pool.get_connection_state.return_value = "open"
+    pool.get_connection.return_value = connection
+    pool.ensure_connection_open.return_value = connection
+    svc = NodeService(
+        registry=_open_node_registry([name]), pool=pool, handshake_service=_noop_handshake(),
+        agent_identity_service=MagicMock(), **service_kwargs
+    )
+    return svc, connection
+
+
+def make_service_with_open_connections(names, **service_kwargs):
+    """Build a NodeService with one enabled node and open MagicMock connection per name.
+
+    service_kwargs: passed through to NodeService.
+    Returns (svc, {name: connection}).
+    """
+    from unittest.mock import MagicMock
+
+    conns = {}
+    for name in names:
+        conns[name] = MagicMock()
+        conns[name].name = name
+    pool = MagicMock()
+    pool.get_connection_state.side_effect = lambda name: "open" if name in conns else "not_in_pool"
+    pool.get_connection.side_effect = conns.get
+    pool.ensure_connection_open.side_effect = conns.get
+    svc = NodeService(
+        registry=_open_node_registry(names), pool=pool, handshake_service=_noop_handshake(),
+        agent_identity_service=MagicMock(), **service_kwargs
+    )
+    return svc, conns
+
+
 def make_mock_identity_service(public_key="ssh-ed25519 AAAAC3NzaC1lZDI1NTE5 agent@test"):
     """Build a mock AgentIdentityService whose get_identity() returns a mock identity."""
     from unittest.mock import MagicMock
@@ -0,0 +1,289 @@
+"""Unit tests for JobRegistry and the NodeService background job APIs."""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from agent.connection_result import CommandResult
+from agent.connectionpool.connection import CommandCancelled
+from agent.nodes.jobs import JobRegistry, _OutputStream
+from tests.agent.nodes.conftest import make_service_with_open_connection
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+class _ScriptedConnection:
+    """Fake connection whose execute() streams *chunks* and then waits for *release*."""
+
+    def __init__(self, chunks=(), exit_code=0, release=None, error=None):
+        self.chunks = list(chunks)
+        self.exit_code = exit_code
+        self.release = release
+        self.error = error
+
+    def execute(self, command, timeout=None, output_limit=None, on_stdout=None, on_stderr=None, cancel_event=None):
+        for chunk in self.chunks:
+            on_stdout(chunk)
+        on_stderr(b"err")
+        if self.release is not None:
+            deadline = time.monotonic() + (timeout or 5)
+            while not self.release.is_set():
+                if cancel_event.is_set():
+                    raise CommandCancelled("cancelled")
+                if time.monotonic() > deadline:
+                    raise TimeoutError("timed out")
+                time.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        now = datetime.now(timezone.utc)
+        return CommandResult(command, self.exit_code, "", "", now, now)
+
+
+def _wait_finished(registry, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = registry.get(job_id)
+        if job is not None and job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish within {timeout}s")
+
+
+# ---------------------------------------------------------------------------
+# _OutputStream
+# ---------------------------------------------------------------------------
+
+
+def test_output_stream_keeps_most_recent_bytes_with_absolute_offsets():
+    stream = _OutputStream(limit=4)
+    stream.append(b"abc")
+    stream.append(b"defg")
+
+    data, start, first, total = stream.read(0, 100)
+
+    assert (data, start, first, total) == (b"defg", 3, 3, 7)
+    assert stream.read(5, 1)[0] == b"f"
+
+
+def test_output_stream_text_pages_never_split_utf8_characters():
+    text = "a\u00e9\u20ac\U0001f600b" * 3
+    stream = _OutputStream(limit=1024)
+    stream.append(text.encode())
+
+    for limit in range(4, 9):
+        pages, offset = [], 0
+        while offset < stream.total:
+            data, start, _, _ = stream.read_text(offset, limit, final=True)
+            pages.append(data.decode())  # strict: each page is valid UTF-8 on its own
+            offset = start + len(data)
+        assert "".join(pages) == text
+
+
+def test_output_stream_text_skips_partial_character_after_drop():
+    stream = _OutputStream(limit=3)
+    stream.append("xx\u20acy".encode())  # the euro sign's lead byte is dropped
+
+    data, start, first, total = stream.read_text(0, 100, final=False)
+
+    assert (data, start, first, total) == (b"y", 5, 3, 6)
+
+
+def test_output_stream_text_returns_trailing_bytes_once_final():
+    stream = _OutputStream(limit=1024)
+    stream.append(b"ok\xe2\x82")  # incomplete character at the end
+
+    assert stream.read_text(0, 100, final=False)[0] == b"ok"
+    assert stream.read_text(0, 100, final=True)[0] == b"ok\xe2\x82"
+
+
+# ---------------------------------------------------------------------------
+# JobRegistry
+# ---------------------------------------------------------------------------
+
+
+def test_job_completes_and_records_exit_code_and_output():
+    registry = JobRegistry()
+    job = registry.start("n1", "make", _ScriptedConnection([b"building\n"], exit_code=2), timeout=5)
+
+    _wait_finished(registry, job.job_id)
+
+    status = job.to_status()
+    assert status["state"] == "completed"
+    assert status["exit_code"] == 2
+    assert job.stdout.read(0, 100)[0] == b"building\n"
+
+
+def test_job_cancel_stops_running_command():
+    registry = JobRegistry()
+    job = registry.start("n1", "sleep 100", _ScriptedConnection(release=threading.Event()), timeout=None)
+
+    registry.cancel(job.job_id)
+
+    assert _wait_finished(registry, job.job_id).to_status()["state"] == "cancelled"
+
+
+def test_job_failure_is_reported():
+    registry = JobRegistry()
+    job = registry.start("n1", "x", _ScriptedConnection(error=RuntimeError("Connection is not open.")), timeout=5)
+
+    status = _wait_finished(registry, job.job_id).to_status()
+
+    assert status["state"] == "failed"
+    assert status["error"] == "Connection is not open."
+
+
+def test_registry_rejects_starts_beyond_max_running():
+    release = threading.Event()
+    registry = JobRegistry(max_running=1)
+    first = registry.start("n1", "a", _ScriptedConnection(release=release), timeout=5)
+    try:
+        assert registry.start("n1", "b", _ScriptedConnection(), timeout=5) is None
+    finally:
+        release.set()
+        _wait_finished(registry, first.job_id)
+
+
+def test_registry_evicts_oldest_finished_jobs_beyond_max_finished():
+    registry = JobRegistry(max_finished=2)
+    ids = []
+    for i in range(3):
+        job = registry.start("n1", f"cmd-{i}", _ScriptedConnection(), timeout=5)
+        _wait_finished(registry, job.job_id)
+        ids.append(job.job_id)
+
+    assert registry.get(ids[0]) is None
+    assert registry.get(ids[1]) is not None
+    assert registry.get(ids[2]) is not None
+
+
+def test_registry_expires_finished_jobs_after_retention():
+    registry = JobRegistry(retention_seconds=0)
+    job = registry.start("n1", "x", _ScriptedConnection(), timeout=5)
+    deadline = time.monotonic() + 5
+    while registry.get(job.job_id) is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert registry.get(job.job_id) is None
+
+
+# ---------------------------------------------------------------------------
+# NodeService job APIs
+# ---------------------------------------------------------------------------
+
+
+def test_start_command_on_node_returns_job_id_and_output_is_pageable():
+    jobs = JobRegistry()
+    svc, _ = make_service_with_open_connection(connection=_ScriptedConnection([b"hello ", b"world\n"]), job_registry=jobs)
+
+    started = svc.start_command_on_node("lab-pi-01", "echo hello world")
+    assert started["status"] == "started"
+    _wait_finished(jobs, started["job_id"])
+
+    first = svc.get_job_output(started["job_id"], offset=0, limit=6)
+    rest = svc.get_job_output(started["job_id"], offset=first["next_offset"])
+
+    assert first["data"] == "hello "
+    assert first["complete"] is False
+    assert rest["data"] == "world\n"
+    assert rest["complete"] is True
+    assert svc.get_job_output(started["job_id"], stream="stderr")["data"] == "err"
+
+
+def test_start_command_on_node_unknown_node_returns_error():
+    svc, _ = make_service_with_open_connection(connection=_ScriptedConnection(), job_registry=JobRegistry())
+
+    assert svc.start_command_on_node("nope", "true") == {"error": "node not found", "name": "nope"}
+
+
+def test_job_apis_unknown_job_return_job_not_found():
+    svc, _ = make_service_with_open_connection(connection=_ScriptedConnection(), job_registry=JobRegistry())
+
+    assert svc.get_job_status("missing") == {"error": "job_not_found", "job_id": "missing"}
+    assert svc.get_job_output("missing") == {"error": "job_not_found", "job_id": "missing"}
+    assert svc.cancel_job("missing") == {"error": "job_not_found", "job_id": "missing"}
+
+
+def test_get_job_output_rejects_unknown_stream():
+    svc, _ = make_service_with_open_connection(connection=_ScriptedConnection(), job_registry=JobRegistry())
+
+    assert svc.get_job_output("any", stream="stdin") == {"error": "invalid_stream", "stream": "stdin"}
+
+
+def test_get_job_output_pages_multibyte_output_without_replacement_characters():
+    jobs = JobRegistry()
+    output = "gr\u00fc\u00dfe \u4e16\u754c\n".encode()
+    svc, _ = make_service_with_open_connection(connection=_ScriptedConnection([output]), job_registry=jobs)
+    job_id = svc.start_command_on_node("lab-pi-01", "echo")["job_id"]
+    _wait_finished(jobs, job_id)
+
+    pages, offset = [], 0
+    while True:
+        page = svc.get_job_output(job_id, offset=offset, limit=4)
+        pages.append(page["data"])
+        offset = page["next_offset"]
+        if page["complete"]:
+            break
+
+    assert "".join(pages) == output.decode()
+
+
+def test_get_job_output_base64_returns_raw_bytes():
+    import base64
+
+    jobs = JobRegistry()
+    svc, _ = make_service_with_open_connection(connection=_ScriptedConnection([b"\xff\x00\xe2"]), job_registry=jobs)
+    job_id = svc.start_command_on_node("lab-pi-01", "cat blob")["job_id"]
+    _wait_finished(jobs, job_id)
+
+    page = svc.get_job_output(job_id, limit=2, output_format="base64")
+
+    assert base64.b64decode(page["data"]) == b"\xff\x00"
+    assert (page["next_offset"], page["output_format"]) == (2, "base64")
+    assert svc.get_job_output(job_id, output_format="hex") == {
+        "error": "invalid_output_format", "output_format": "hex"
+    }
+
+
+def test_remove_node_cancels_its_running_jobs():
+    release = threading.Event()
+    jobs = JobRegistry()
+    svc, _ = make_service_with_open_connection(connection=_ScriptedConnection(release=release), job_registry=jobs)
+    job_id = svc.start_command_on_node("lab-pi-01", "sleep 100")["job_id"]
+
+    svc.remove_node("lab-pi-01")
+
+    assert _wait_finished(jobs, job_id).to_status()["state"] == "cancelled"
+
+
+def test_cancel_job_reports_cancelling_for_running_job():
+    release = threading.Event()
+    jobs = JobRegistry()
+    svc, _ = make_service_with_open_connection(connection=_ScriptedConnection(release=release), job_registry=jobs)
+    job_id = svc.start_command_on_node("lab-pi-01", "sleep 100")["job_id"]
+
+    assert svc.cancel_job(job_id) == {"status": "cancelling", "job_id": job_id}
+    assert _wait_finished(jobs, job_id).to_status()["state"] == "cancelled"
+
+
+def test_cancel_job_queued_behind_saturated_channel_slots():
+    from unittest.mock import MagicMock
+    from agent.connectionpool.config_loader import ConnectionConfig
+    from agent.connectionpool.connection import DirectConnection, ConnectionState
+
+    conn = DirectConnection(ConnectionConfig(
+        name="lab-pi-01", mode="direct", user="pi", host="192.168.1.10", port=22, id_file=None, max_channels=1,
+    ))
+    conn._ssh = MagicMock()
+    conn.state = ConnectionState.OPEN
+    conn._channel_slots.acquire()  # the only slot is busy
+    jobs = JobRegistry()
+    job = jobs.start("lab-pi-01", "reboot", conn, timeout=None)
+
+    time.sleep(0.05)
+    jobs.cancel(job.job_id)
+
+    assert _wait_finished(jobs, job.job_id).to_status()["state"] == "cancelled"
+    conn._ssh.exec_command.assert_not_called()
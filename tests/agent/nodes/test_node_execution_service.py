@@ -7,7 +7,12 @@ import pytest
 from agent.nodes.models import NodeConfig
 from agent.nodes.registry import NodeRegistry
 from agent.nodes.service import NodeService
-from tests.agent.nodes.conftest import make_node_config, make_mock_pool
+from tests.agent.nodes.conftest import (
+    make_node_config,
+    make_mock_pool,
+    make_service_with_open_connection,
+    make_service_with_open_connections,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -23,37 +28,6 @@ def _make_noop_handshake():
     return hs
 
 
-def _make_service_with_open_connection(name="lab-pi-01"):
-    """Build a NodeService where the named node is enabled and has an open mock connection."""
-    from unittest.mock import MagicMock
-    from agent.connectionpool.connection import ConnectionState
-
-    registry = NodeRegistry()
-    cfg = NodeConfig(
-        name=name,
-        mode="direct",
-        enabled=True,
-        host="192.168.1.10",
-        port=22,
-        user="pi",
-        id_file=None,
-    )
-    registry.add(cfg)
-
-    mock_conn = MagicMock()
-    mock_conn.name = name
-
-    pool = MagicMock()
-    pool.get_connection_state.return_value = "open"
-    pool.get_connection.return_value = mock_conn
-    pool.ensure_connection_open.return_value = mock_conn
-
-    hs = _make_noop_handshake()
-    from unittest.mock import MagicMock as _MagicMock
-    svc = NodeService(registry=registry, pool=pool, handshake_service=hs, agent_identity_service=_MagicMock())
-    return svc, mock_conn
-
-
 # ---------------------------------------------------------------------------
 # NodeService — run_command_on_node() tests
 # ---------------------------------------------------------------------------
@@ -65,7 +39,7 @@ def test_run_command_on_node_delegates_to_connection():
     from datetime import datetime, timezone
     from agent.connection_result import CommandResult
 
-    svc, mock_conn = _make_service_with_open_connection()
+    svc, mock_conn = make_service_with_open_connection()
 
     fake_result = CommandResult(
         command="echo hi",
@@ -149,7 +123,7 @@ def test_run_command_on_node_not_in_pool_returns_error():
 
 def test_run_command_on_node_timeout_returns_error():
     """run_command_on_node() returns timeout error when connection.execute raises TimeoutError."""
-    svc, mock_conn = _make_service_with_open_connection()
+    svc, mock_conn = make_service_with_open_connection()
     mock_conn.execute.side_effect = TimeoutError("timed out")
 
     result = svc.run_command_on_node("lab-pi-01", "sleep 100", timeout=1)
@@ -159,23 +133,278 @@ def test_run_command_on_node_timeout_returns_error():
     assert result["command"] == "sleep 100"
 
 
+# ---------------------------------------------------------------------------
+# NodeService — run_command_on_node() result cache tests
+# ---------------------------------------------------------------------------
+
+
+def _fake_command_result(command="uname -a", stdout="Linux\n"):
+    from datetime import datetime, timezone
+    from agent.connection_result import CommandResult
+
+    return CommandResult(
+        command=command,
+        exit_code=0,
+        stdout=stdout,
+        stderr="",
+        started_at=datetime.now(timezone.utc),
+        ended_at=datetime.now(timezone.utc),
+    )
+
+
+def test_run_command_on_node_without_cache_ttl_always_executes():
+    """cache_ttl defaults to 0: every call executes and no cache info is added."""
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.generation = 1
+    mock_conn.execute.return_value = _fake_command_result()
+
+    first = svc.run_command_on_node("lab-pi-01", "uname -a")
+    second = svc.run_command_on_node("lab-pi-01", "uname -a")
+
+    assert mock_conn.execute.call_count == 2
+    assert "cache" not in first
+    assert "cache" not in second
+
+
+def test_run_command_on_node_cache_hit_skips_execution():
+    """A second call within cache_ttl is served from the cache."""
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.generation = 1
+    mock_conn.execute.return_value = _fake_command_result()
+
+    first = svc.run_command_on_node("lab-pi-01", "uname -a", cache_ttl=60)
+    second = svc.run_command_on_node("lab-pi-01", "uname -a", cache_ttl=60)
+
+    assert mock_conn.execute.call_count == 1
+    assert first["cache"]["hit"] is False
+    assert second["cache"]["hit"] is True
+    assert second["cache"]["hits"] == 1
+    assert second["cache"]["misses"] == 1
+    assert second["stdout"] == "Linux\n"
+
+
+def test_run_command_on_node_cache_misses_after_reconnect():
+    """A new connection generation invalidates cached results."""
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.generation = 1
+    mock_conn.execute.return_value = _fake_command_result()
+
+    svc.run_command_on_node("lab-pi-01", "uname -a", cache_ttl=60)
+    mock_conn.generation = 2
+    result = svc.run_command_on_node("lab-pi-01", "uname -a", cache_ttl=60)
+
+    assert mock_conn.execute.call_count == 2
+    assert result["cache"]["hit"] is False
+
+
+def test_run_command_on_node_timeout_is_not_cached():
+    """Timeouts are never cached."""
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.generation = 1
+    mock_conn.execute.side_effect = [TimeoutError("timed out"), _fake_command_result()]
+
+    first = svc.run_command_on_node("lab-pi-01", "uname -a", cache_ttl=60)
+    second = svc.run_command_on_node("lab-pi-01", "uname -a", cache_ttl=60)
+
+    assert first["error"] == "timeout"
+    assert second["cache"]["hit"] is False
+    assert mock_conn.execute.call_count == 2
+
+
+def test_run_command_on_node_base64_output_format():
+    """output_format="base64" returns the raw output bytes base64-encoded."""
+    import base64
+
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.execute.return_value = _fake_command_result(stdout=b"\x00\xffbin")
+
+    result = svc.run_command_on_node("lab-pi-01", "cat blob", output_format="base64")
+
+    assert base64.b64decode(result["stdout"]) == b"\x00\xffbin"
+    assert result["output_format"] == "base64"
+
+
+def test_run_command_on_node_rejects_unknown_output_format():
+    """An unknown output_format is rejected before anything executes."""
+    svc, mock_conn = make_service_with_open_connection()
+
+    result = svc.run_command_on_node("lab-pi-01", "uname -a", output_format="hex")
+
+    assert result == {"error": "invalid_output_format", "output_format": "hex"}
+    mock_conn.execute.assert_not_called()
+
+
+def test_remove_node_invalidates_cached_results():
+    """remove_node() drops the node's cached results."""
+    from agent.nodes.result_cache import ResultCache
+
+    cache = ResultCache()
+    cache.put("lab-pi-01", "uname -a", 1, {"stdout": "Linux\n"}, ttl=60)
+    cache.put("other", "uname -a", 1, {"stdout": "Linux\n"}, ttl=60)
+    svc, _ = make_service_with_open_connection(result_cache=cache)
+
+    svc.remove_node("lab-pi-01")
+
+    assert cache.get("lab-pi-01", "uname -a", 1) is None
+    assert cache.get("other", "uname -a", 1) is not None
+
+
 # ---------------------------------------------------------------------------
 # NodeService — upload_file_to_node() / download_file_from_node() tests
 # ---------------------------------------------------------------------------
 
 
-def test_upload_file_to_node_delegates_to_connection():
-    """upload_file_to_node() calls connection.upload_file() with correct args and returns result."""
+def test_upload_file_to_node_writes_decoded_data_via_connection():
+    """upload_file_to_node() decodes once and hands raw bytes to connection.upload_data()."""
     import base64
+    import hashlib
 
-    svc, mock_conn = _make_service_with_open_connection()
-    mock_conn.upload_file.return_value = {"status": "written", "path": "/tmp/test"}
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.upload_data.return_value = {"size": 5, "mtime": 1700000000, "mode": 0o644}
 
     valid_b64 = base64.b64encode(b"hello").decode()
     result = svc.upload_file_to_node("lab-pi-01", "/tmp/test", valid_b64, "0644")
 
-    assert result == {"status": "written", "path": "/tmp/test"}
-    mock_conn.upload_file.assert_called_once_with("/tmp/test", valid_b64, "0644")
+    assert result == {"status": "written", "path": "/tmp/test", "sha256": hashlib.sha256(b"hello").hexdigest()}
+    mock_conn.upload_data.assert_called_once_with("/tmp/test", b"hello", "0644")
+    mock_conn.stat_file.assert_not_called()
+
+
+def test_upload_file_to_node_rejects_bad_input_before_guard():
+    """Invalid base64 and mode strings are rejected without touching the connection."""
+    svc, mock_conn = make_service_with_open_connection()
+
+    assert svc.upload_file_to_node("lab-pi-01", "/tmp/test", "not base64!!") == {
+        "error": "invalid_base64",
+        "path": "/tmp/test",
+    }
+    assert svc.upload_file_to_node("lab-pi-01", "/tmp/test", "aGVsbG8=", "999") == {
+        "error": "invalid_mode",
+        "path": "/tmp/test",
+        "mode": "999",
+    }
+    mock_conn.upload_data.assert_not_called()
+
+
+def test_upload_file_to_node_skips_identical_reupload():
+    """Identical content whose remote size/mtime/mode are unchanged is not re-sent."""
+    import base64
+
+    svc, mock_conn = make_service_with_open_connection()
+    attrs = {"size": 5, "mtime": 1700000000, "mode": 0o644}
+    mock_conn.upload_data.return_value = attrs
+    mock_conn.stat_file.return_value = dict(attrs)
+    data_b64 = base64.b64encode(b"hello").decode()
+
+    first = svc.upload_file_to_node("lab-pi-01", "/tmp/test", data_b64)
+    second = svc.upload_file_to_node("lab-pi-01", "/tmp/test", data_b64)
+
+    assert first["status"] == "written"
+    assert second == {"status": "unchanged", "path": "/tmp/test", "sha256": first["sha256"]}
+    mock_conn.upload_data.assert_called_once()
+    mock_conn.stat_file.assert_called_once_with("/tmp/test")
+
+
+@pytest.mark.parametrize(
+    "remote",
+    [
+        None,
+        {"size": 5, "mtime": 1700000099, "mode": 0o644},
+        {"size": 6, "mtime": 1700000000, "mode": 0o644},
+        {"size": 5, "mtime": 1700000000, "mode": 0o600},
+    ],
+    ids=["deleted", "touched", "resized", "chmodded"],
+)
+def test_upload_file_to_node_reuploads_when_remote_file_changed(remote):
+    """A cache hit is only trusted if the remote stat still matches the recorded upload."""
+    import base64
+
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.upload_data.return_value = {"size": 5, "mtime": 1700000000, "mode": 0o644}
+    mock_conn.stat_file.return_value = remote
+    data_b64 = base64.b64encode(b"hello").decode()
+
+    svc.upload_file_to_node("lab-pi-01", "/tmp/test", data_b64)
+    result = svc.upload_file_to_node("lab-pi-01", "/tmp/test", data_b64)
+
+    assert result["status"] == "written"
+    assert mock_conn.upload_data.call_count == 2
+
+
+def test_upload_file_to_node_reuploads_on_new_content_or_mode():
+    """Different content or a different requested mode bypasses the stat check."""
+    import base64
+
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.upload_data.return_value = {"size": 5, "mtime": 1700000000, "mode": 0o644}
+
+    svc.upload_file_to_node("lab-pi-01", "/tmp/test", base64.b64encode(b"hello").decode())
+    svc.upload_file_to_node("lab-pi-01", "/tmp/test", base64.b64encode(b"world").decode())
+    svc.upload_file_to_node("lab-pi-01", "/tmp/test", base64.b64encode(b"world").decode(), "0755")
+
+    assert mock_conn.upload_data.call_count == 3
+    mock_conn.stat_file.assert_not_called()
+
+
+def test_upload_file_to_node_atomic_uses_verified_upload():
+    """atomic=True goes through upload_data_atomic() and reports the verified digest."""
+    import base64
+    import hashlib
+
+    svc, mock_conn = make_service_with_open_connection()
+    digest = hashlib.sha256(b"hello").hexdigest()
+    mock_conn.upload_data_atomic.return_value = {
+        "status": "written", "path": "/tmp/test", "sha256": digest, "size": 5, "mtime": 1, "mode": 0o644,
+    }
+
+    result = svc.upload_file_to_node("lab-pi-01", "/tmp/test", base64.b64encode(b"hello").decode(), atomic=True)
+
+    assert result == {"status": "written", "path": "/tmp/test", "sha256": digest, "verified": True}
+    mock_conn.upload_data_atomic.assert_called_once_with("/tmp/test", b"hello", "0644")
+    mock_conn.upload_data.assert_not_called()
+
+
+def test_upload_file_to_node_atomic_failure_is_not_cached():
+    """A failed verification is returned as-is and leaves no cache entry behind."""
+    import base64
+    from agent.nodes.upload_cache import UploadCache
+
+    cache = UploadCache()
+    svc, mock_conn = make_service_with_open_connection(upload_cache=cache)
+    failure = {"error": "verification_failed", "path": "/tmp/test", "expected_sha256": "a", "remote_sha256": "b"}
+    mock_conn.upload_data_atomic.return_value = failure
+    data_b64 = base64.b64encode(b"hello").decode()
+
+    assert svc.upload_file_to_node("lab-pi-01", "/tmp/test", data_b64, atomic=True) == failure
+    assert cache.stats()["entries"] == 0
+
+    mock_conn.upload_data_atomic.side_effect = TimeoutError("slow")
+    assert svc.upload_file_to_node("lab-pi-01", "/tmp/test", data_b64, atomic=True) == {
+        "error": "timeout",
+        "name": "lab-pi-01",
+        "path": "/tmp/test",
+    }
+
+
+def test_upload_cache_forgets_path_on_sync_and_node_on_remove():
+    """sync_file_to_node() drops the path's entry; remove_node() drops the node's entries."""
+    import base64
+    from agent.nodes.upload_cache import UploadCache
+
+    cache = UploadCache()
+    svc, mock_conn = make_service_with_open_connection(upload_cache=cache)
+    mock_conn.upload_data.return_value = {"size": 5, "mtime": 1700000000, "mode": 0o644}
+    mock_conn.sync_file.return_value = {"status": "synced", "path": "/tmp/a"}
+    data_b64 = base64.b64encode(b"hello").decode()
+
+    svc.upload_file_to_node("lab-pi-01", "/tmp/a", data_b64)
+    svc.upload_file_to_node("lab-pi-01", "/tmp/b", data_b64)
+    svc.sync_file_to_node("lab-pi-01", "/tmp/a", data_b64)
+    assert cache.get("lab-pi-01", "/tmp/a") is None
+    assert cache.get("lab-pi-01", "/tmp/b") is not None
+
+    svc.remove_node("lab-pi-01")
+    assert cache.stats()["entries"] == 0
 
 
 def test_upload_file_to_node_disabled_node_returns_error():
@@ -207,7 +436,7 @@ def test_download_file_from_node_delegates_to_connection():
     """download_file_from_node() calls connection.download_file() and returns result."""
     import base64
 
-    svc, mock_conn = _make_service_with_open_connection()
+    svc, mock_conn = make_service_with_open_connection()
     expected = {"status": "ok", "path": "/tmp/test", "data_b64": "abc"}
     mock_conn.download_file.return_value = expected
 
@@ -238,3 +467,472 @@ def test_download_file_from_node_disabled_node_returns_error():
 
     result = svc.download_file_from_node("lab-pi-01", "/tmp/test")
     assert result == {"error": "node_disabled", "name": "lab-pi-01"}
+
+
+def _range_page(offset, length, size):
+    return {
+        "status": "ok", "path": "/var/log/big.log", "offset": offset, "length": length,
+        "size_bytes": size, "eof": offset + length >= size, "data_b64": "",
+    }
+
+
+def test_download_file_from_node_ranged_read_returns_continuation_token():
+    """A ranged read delegates to download_file_range() and issues a token for the next page."""
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.download_file_range.side_effect = [_range_page(0, 10, 25), _range_page(10, 10, 25), _range_page(20, 5, 25)]
+
+    first = svc.download_file_from_node("lab-pi-01", "/var/log/big.log", offset=0, length=10)
+    second = svc.download_file_from_node(
+        "lab-pi-01", "/var/log/big.log", length=10, continuation_token=first["continuation_token"]
+    )
+    last = svc.download_file_from_node(
+        "lab-pi-01", "/var/log/big.log", length=10, continuation_token=second["continuation_token"]
+    )
+
+    assert [c.args for c in mock_conn.download_file_range.call_args_list] == [
+        ("/var/log/big.log", 0, 10), ("/var/log/big.log", 10, 10), ("/var/log/big.log", 20, 10),
+    ]
+    assert last["continuation_token"] is None
+    mock_conn.download_file.assert_not_called()
+
+
+def test_download_file_from_node_default_page_length():
+    """offset alone selects a ranged read with the default page length."""
+    from agent.nodes.service import DEFAULT_DOWNLOAD_PAGE_BYTES
+
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.download_file_range.return_value = _range_page(5, 0, 5)
+
+    svc.download_file_from_node("lab-pi-01", "/var/log/big.log", offset=5)
+
+    mock_conn.download_file_range.assert_called_once_with("/var/log/big.log", 5, DEFAULT_DOWNLOAD_PAGE_BYTES)
+
+
+def test_download_file_from_node_rejects_foreign_or_bad_token():
+    """Tokens are bound to the node and path they were issued for."""
+    from agent.nodes.service import _encode_download_token
+
+    svc, mock_conn = make_service_with_open_connection()
+    other_path = _encode_download_token("lab-pi-01", "/etc/shadow", 10)
+
+    for token in (other_path, "not-a-token"):
+        result = svc.download_file_from_node("lab-pi-01", "/var/log/big.log", continuation_token=token)
+        assert result["error"] == "invalid_continuation_token"
+    mock_conn.download_file_range.assert_not_called()
+
+
+def test_download_file_from_node_rejects_invalid_range():
+    """Negative offsets and oversized pages are rejected before any I/O."""
+    from agent.nodes.service import MAX_DOWNLOAD_PAGE_BYTES
+
+    svc, mock_conn = make_service_with_open_connection()
+
+    assert svc.download_file_from_node("lab-pi-01", "/f", offset=-1)["error"] == "invalid_range"
+    assert svc.download_file_from_node("lab-pi-01", "/f", length=0)["error"] == "invalid_range"
+    assert svc.download_file_from_node("lab-pi-01", "/f", length=MAX_DOWNLOAD_PAGE_BYTES + 1)["error"] == "invalid_range"
+    mock_conn.download_file_range.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# NodeService — sync_file_to_node() tests
+# ---------------------------------------------------------------------------
+
+
+def test_sync_file_to_node_decodes_and_delegates():
+    """sync_file_to_node() decodes the payload and delegates to connection.sync_file()."""
+    import base64
+
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.sync_file.return_value = {"status": "synced", "transfer": "delta"}
+
+    result = svc.sync_file_to_node(
+        "lab-pi-01", "/srv/model.bin", base64.b64encode(b"payload").decode(), mode="0600", block_size=65536
+    )
+
+    assert result == {"status": "synced", "transfer": "delta"}
+    mock_conn.sync_file.assert_called_once_with("/srv/model.bin", b"payload", "0600", 65536)
+
+
+def test_sync_file_to_node_validates_input():
+    """Bad base64, mode or block size are rejected before touching the node."""
+    svc, mock_conn = make_service_with_open_connection()
+
+    assert svc.sync_file_to_node("lab-pi-01", "/f", "!!!")["error"] == "invalid_base64"
+    assert svc.sync_file_to_node("lab-pi-01", "/f", "", mode="99")["error"] == "invalid_mode"
+    assert svc.sync_file_to_node("lab-pi-01", "/f", "", block_size=100)["error"] == "invalid_block_size"
+    mock_conn.sync_file.assert_not_called()
+
+
+def test_sync_file_to_node_timeout_returns_error():
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.sync_file.side_effect = TimeoutError("slow")
+
+    result = svc.sync_file_to_node("lab-pi-01", "/f", "")
+
+    assert result == {"error": "timeout", "name": "lab-pi-01", "path": "/f"}
+
+
+# ---------------------------------------------------------------------------
+# NodeService — run_command_on_nodes() fan-out tests
+# ---------------------------------------------------------------------------
+
+
+def _make_fanout_service(node_names, execute):
+    """One open mock connection per node; execute(name, cmd, timeout) drives results."""
+    svc, conns = make_service_with_open_connections(node_names)
+    for n, conn in conns.items():
+        conn.execute.side_effect = lambda cmd, timeout=None, _n=n: execute(_n, cmd, timeout)
+    return svc
+
+
+def _result_for(command, exit_code=0, stdout=""):
+    from datetime import datetime, timezone
+    from agent.connection_result import CommandResult
+
+    now = datetime.now(timezone.utc)
+    return CommandResult(command=command, exit_code=exit_code, stdout=stdout, stderr="", started_at=now, ended_at=now)
+
+
+def test_run_command_on_nodes_aggregates_results_per_node():
+    """Each node's result is returned under its name, with a summary."""
+    svc = _make_fanout_service(
+        ["a", "b"],
+        lambda name, cmd, timeout: _result_for(cmd, exit_code=0 if name == "a" else 1, stdout=name),
+    )
+
+    result = svc.run_command_on_nodes(["a", "b", "missing", "a"], "hostname")
+
+    assert result["status"] == "ok"
+    assert list(result["results"]) == ["a", "b", "missing"]
+    assert result["results"]["a"]["stdout"] == "a"
+    assert result["results"]["b"]["exit_code"] == 1
+    assert result["results"]["missing"] == {"error": "node not found", "name": "missing"}
+    assert result["summary"] == {"total": 3, "succeeded": 1, "failed": 1, "errors": 1, "deadline_exceeded": 0}
+
+
+def test_run_command_on_nodes_runs_nodes_concurrently():
+    """With max_parallel >= node count, all nodes execute at the same time."""
+    import threading
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    def _execute(name, cmd, timeout):
+        barrier.wait()
+        return _result_for(cmd)
+
+    svc = _make_fanout_service(["a", "b", "c"], _execute)
+
+    result = svc.run_command_on_nodes(["a", "b", "c"], "true", max_parallel=3, deadline=10)
+
+    assert result["summary"]["succeeded"] == 3
+
+
+def test_run_command_on_nodes_returns_partial_results_at_deadline():
+    """Nodes still running when the global deadline expires are reported as deadline_exceeded."""
+    import threading
+
+    release = threading.Event()
+
+    def _execute(name, cmd, timeout):
+        if name == "slow":
+            release.wait(5)
+        return _result_for(cmd)
+
+    svc = _make_fanout_service(["fast", "slow"], _execute)
+    try:
+        result = svc.run_command_on_nodes(["fast", "slow"], "true", deadline=0.2)
+    finally:
+        release.set()
+
+    assert result["status"] == "partial"
+    assert result["results"]["fast"]["exit_code"] == 0
+    assert result["results"]["slow"] == {"error": "deadline_exceeded", "name": "slow"}
+    assert result["summary"]["deadline_exceeded"] == 1
+
+
+def test_run_command_on_nodes_rejects_invalid_max_parallel():
+    svc = _make_fanout_service(["a"], lambda name, cmd, timeout: _result_for(cmd))
+
+    assert svc.run_command_on_nodes(["a"], "true", max_parallel=0) == {
+        "error": "invalid_max_parallel",
+        "max_parallel": 0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# NodeService — distribute_file() tests
+# ---------------------------------------------------------------------------
+
+
+def _make_distribute_service(node_names):
+    """One open mock connection per node reporting a 5-byte upload; returns (svc, {name: conn})."""
+    svc, conns = make_service_with_open_connections(node_names)
+    for conn in conns.values():
+        conn.upload_data.return_value = {"size": 5, "mtime": 1700000000, "mode": 0o644}
+        conn.stat_file.return_value = {"size": 5, "mtime": 1700000000, "mode": 0o644}
+    return svc, conns
+
+
+def test_distribute_file_shares_one_decoded_buffer_across_nodes():
+    """The payload is decoded once and the same bytes object reaches every connection."""
+    import base64
+    import hashlib
+
+    svc, conns = _make_distribute_service(["a", "b", "c"])
+
+    result = svc.distribute_file(["a", "b", "c", "a"], "/opt/tool", base64.b64encode(b"hello").decode(), "0755")
+
+    assert result["status"] == "ok"
+    assert result["sha256"] == hashlib.sha256(b"hello").hexdigest()
+    assert result["size_bytes"] == 5
+    assert list(result["results"]) == ["a", "b", "c"]
+    assert result["summary"] == {"total": 3, "written": 3, "unchanged": 0, "errors": 0}
+    buffers = [conn.upload_data.call_args[0][1] for conn in conns.values()]
+    assert all(buf is buffers[0] for buf in buffers)
+    for conn in conns.values():
+        assert conn.upload_data.call_args[0][2] == "0755"
+    assert all(r["elapsed_seconds"] >= 0 for r in result["results"].values())
+
+
+def test_distribute_file_reports_per_node_errors_and_dedup():
+    """Unknown nodes, failing writers and already-current nodes are reported individually."""
+    import base64
+
+    svc, conns = _make_distribute_service(["a", "b", "c"])
+    data_b64 = base64.b64encode(b"hello").decode()
+    svc.upload_file_to_node("a", "/f", data_b64)
+    conns["b"].upload_data.side_effect = IOError("disk full")
+
+    result = svc.distribute_file(["a", "b", "c", "missing"], "/f", data_b64)
+
+    assert result["status"] == "partial"
+    assert result["results"]["a"]["status"] == "unchanged"
+    assert result["results"]["b"]["error"] == "upload_failed"
+    assert result["results"]["b"]["detail"] == "disk full"
+    assert result["results"]["c"]["status"] == "written"
+    assert result["results"]["missing"]["error"] == "node not found"
+    assert result["summary"] == {"total": 4, "written": 1, "unchanged": 1, "errors": 2}
+
+
+def test_distribute_file_runs_nodes_concurrently():
+    """With max_parallel >= node count, all uploads are in flight at the same time."""
+    import base64
+    import threading
+
+    svc, conns = _make_distribute_service(["a", "b", "c"])
+    barrier = threading.Barrier(3, timeout=5)
+
+    def _upload(*args):
+        barrier.wait()
+        return {"size": 5, "mtime": 1, "mode": 0o644}
+
+    for conn in conns.values():
+        conn.upload_data.side_effect = _upload
+
+    result = svc.distribute_file(["a", "b", "c"], "/f", base64.b64encode(b"hello").decode(), max_parallel=3)
+
+    assert result["summary"]["errors"] == 0
+
+
+def test_distribute_file_rejects_bad_input():
+    svc, conns = _make_distribute_service(["a"])
+
+    assert svc.distribute_file(["a"], "/f", "eA==", max_parallel=0) == {
+        "error": "invalid_max_parallel",
+        "max_parallel": 0,
+    }
+    assert svc.distribute_file(["a"], "/f", "!!")["error"] == "invalid_base64"
+    assert svc.distribute_file(["a"], "/f", "eA==", mode="9")["error"] == "invalid_mode"
+    conns["a"].upload_data.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# NodeService — upload_tree() / download_tree() tests
+# ---------------------------------------------------------------------------
+
+
+def test_upload_tree_streams_decoded_entries_to_connection():
+    """Entries reach connection.upload_tree() decoded, with integer modes, as a lazy iterable."""
+    import base64
+
+    svc, mock_conn = make_service_with_open_connection()
+    received = {}
+
+    def _upload_tree(remote_dir, entries, compress):
+        received["entries"] = list(entries)
+        return {"status": "written", "path": remote_dir, "files": 2}
+
+    mock_conn.upload_tree.side_effect = _upload_tree
+    files = [
+        {"path": "bin/run.sh", "data_b64": base64.b64encode(b"#!/bin/sh\n").decode(), "mode": "0755"},
+        {"path": "conf", "data_b64": base64.b64encode(b"x=1").decode()},
+    ]
+
+    result = svc.upload_tree("lab-pi-01", "/opt/app", files, compress=True)
+
+    assert result == {"status": "written", "path": "/opt/app", "files": 2}
+    assert mock_conn.upload_tree.call_args[0][2] is True
+    assert received["entries"] == [("bin/run.sh", b"#!/bin/sh\n", 0o755), ("conf", b"x=1", 0o644)]
+
+
+@pytest.mark.parametrize(
+    "entry, detail",
+    [
+        ({"data_b64": "eA=="}, "entry needs a string 'path'"),
+        ({"path": "../etc/passwd", "data_b64": "eA=="}, "path must be relative, inside remote_dir"),
+        ({"path": "a", "data_b64": "eA==", "mode": "999"}, "invalid mode"),
+        ({"path": "a", "data_b64": "!!"}, "invalid base64"),
+    ],
+)
+def test_upload_tree_rejects_bad_entries_before_connecting(entry, detail):
+    svc, mock_conn = make_service_with_open_connection()
+
+    result = svc.upload_tree("lab-pi-01", "/opt/app", [{"path": "ok", "data_b64": ""}, entry])
+
+    assert result == {"error": "invalid_tree_entry", "index": 1, "detail": detail}
+    mock_conn.upload_tree.assert_not_called()
+
+
+def test_upload_tree_invalidates_upload_cache_for_written_paths():
+    import base64
+    from agent.nodes.upload_cache import UploadCache, UploadRecord
+
+    cache = UploadCache()
+    cache.put("lab-pi-01", "/opt/app/bin/run.sh", UploadRecord("a" * 64, 1, 1, "0755"))
+    svc, mock_conn = make_service_with_open_connection(upload_cache=cache)
+    mock_conn.upload_tree.return_value = {"status": "written"}
+
+    svc.upload_tree("lab-pi-01", "/opt/app", [{"path": "./bin/run.sh", "data_b64": base64.b64encode(b"x").decode()}])
+
+    assert cache.get("lab-pi-01", "/opt/app/bin/run.sh") is None
+
+
+def test_download_tree_encodes_files_and_maps_timeout():
+    svc, mock_conn = make_service_with_open_connection()
+    mock_conn.download_tree.return_value = {
+        "status": "ok", "path": "/opt/app", "files": [("bin/run.sh", b"hi", 0o755)],
+        "skipped": ["latest"], "bytes_total": 2, "bytes_received": 10240,
+    }
+
+    result = svc.download_tree("lab-pi-01", "/opt/app")
+
+    mock_conn.download_tree.assert_called_once_with("/opt/app", False)
+    assert result["files"] == [{"path": "bin/run.sh", "mode": "0755", "size_bytes": 2, "data_b64": "aGk="}]
+    assert result["skipped"] == ["latest"]
+
+    mock_conn.download_tree.side_effect = TimeoutError("slow")
+    assert svc.download_tree("lab-pi-01", "/opt/app") == {"error": "timeout", "name": "lab-pi-01", "path": "/opt/app"}
+
+
+# ---------------------------------------------------------------------------
+# NodeService — copy_between_nodes() tests
+# ---------------------------------------------------------------------------
+
+
+def _copy_service(data: bytes, src_mode=0o750):
+    """Two-node service whose source connection serves *data*; returns (svc, src_conn, dst_conn, written)."""
+    from unittest.mock import MagicMock
+
+    svc, conns = _make_distribute_service(["a", "b"])
+    src, dst = conns["a"], conns["b"]
+    src.stat_file.return_value = {"size": len(data), "mtime": 1, "mode": src_mode}
+    src.read_remote_file.side_effect = lambda handle, offset, length: data[offset:offset + length]
+    written = bytearray()
+    dst.write_remote_file.side_effect = lambda handle, chunk: written.extend(chunk)
+    src.open_remote_file.return_value = MagicMock(name="reader")
+    dst.open_remote_file.return_value = MagicMock(name="writer")
+    return svc, src, dst, written
+
+
+def test_copy_between_nodes_pipes_fixed_chunks_into_temp_then_renames(monkeypatch):
+    import agent.nodes.service as service_mod
+
+    monkeypatch.setattr(service_mod, "COPY_CHUNK_BYTES", 4)
+    data = b"0123456789"
+    svc, src, dst, written = _copy_service(data)
+
+    result = svc.copy_between_nodes("a", "/srv/model.bin", "b", "/data/model.bin")
+
+    assert bytes(written) == data
+    assert [c.args[1:] for c in src.read_remote_file.call_args_list] == [(0, 4), (4, 4), (8, 2)]
+    tmp_path = dst.open_remote_file.call_args.args[0]
+    assert tmp_path.startswith("/data/.model.bin.copy-")
+    assert dst.open_remote_file.call_args.args[1:] == ("wb",)
+    assert dst.open_remote_file.call_args.kwargs == {"pipelined": True}
+    dst.finish_remote_file.assert_called_once_with(dst.open_remote_file.return_value, tmp_path, "0750")
+    dst.rename_remote_file.assert_called_once_with(tmp_path, "/data/model.bin")
+    src.close_remote_file.assert_called_once_with(src.open_remote_file.return_value)
+    assert result["status"] == "copied"
+    assert result["bytes_copied"] == 10
+    assert result["mode"] == "0750"
+
+
+@pytest.fixture
+def _no_resume_delay(monkeypatch):
+    import agent.nodes.service as service_mod
+
+    monkeypatch.setattr(service_mod, "TRANSFER_RESUME_DELAY", 0)
+
+
+def test_copy_between_nodes_failure_discards_temp_file(_no_resume_delay):
+    """A step that keeps failing after MAX_TRANSFER_RESUMES reopen attempts fails the copy."""
+    from agent.nodes.service import MAX_TRANSFER_RESUMES
+
+    svc, src, dst, _ = _copy_service(b"data")
+    dst.write_remote_file.side_effect = IOError("disk full")
+
+    result = svc.copy_between_nodes("a", "/f", "b", "/g", mode="0644")
+
+    assert result == {
+        "error": "copy_failed", "transfer_id": result["transfer_id"], "src": "a", "dst": "b", "detail": "disk full",
+    }
+    assert dst.write_remote_file.call_count == MAX_TRANSFER_RESUMES + 1
+    tmp_path = dst.open_remote_file.call_args.args[0]
+    dst.abort_remote_file.assert_called_once_with(dst.reopen_remote_file.return_value, tmp_path)
+    dst.rename_remote_file.assert_not_called()
+    assert svc.get_transfer_status(result["transfer_id"])["state"] == "failed"
+
+
+def test_copy_between_nodes_resumes_from_landed_bytes_after_drop(monkeypatch, _no_resume_delay):
+    """After a dropped write both sides reopen and the copy continues from what the temp file holds."""
+    import agent.nodes.service as service_mod
+
+    monkeypatch.setattr(service_mod, "COPY_CHUNK_BYTES", 4)
+    data = b"0123456789"
+    svc, src, dst, written = _copy_service(data)
+    calls = {"n": 0}
+
+    def _write(handle, chunk):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise EOFError("transport dropped")
+        written.extend(chunk)
+
+    dst.write_remote_file.side_effect = _write
+    dst.stat_file.side_effect = lambda path: {"size": len(written), "mtime": 1, "mode": 0o600}
+
+    result = svc.copy_between_nodes("a", "/f", "b", "/g")
+
+    assert result["status"] == "copied"
+    assert result["resumes"] == 1
+    assert bytes(written) == data
+    tmp_path = dst.open_remote_file.call_args.args[0]
+    dst.reopen_remote_file.assert_called_once_with(tmp_path, 4, pipelined=True)
+    assert src.open_remote_file.call_count == 2
+    src.check_transport.assert_called_once()
+    status = svc.get_transfer_status(result["transfer_id"])
+    assert status["kind"] == "copy"
+    assert (status["state"], status["confirmed_bytes"], status["total_bytes"]) == ("completed", 10, 10)
+    assert status["source"] == {"node": "a", "path": "/f"}
+
+
+def test_copy_between_nodes_reports_missing_source_and_bad_input():
+    svc, src, dst, _ = _copy_service(b"")
+    src.stat_file.return_value = None
+
+    assert svc.copy_between_nodes("a", "/nope", "b", "/g") == {"error": "file_not_found", "name": "a", "path": "/nope"}
+    assert svc.copy_between_nodes("a", "/f", "b", "/g", mode="99") == {
+        "error": "invalid_mode", "path": "/g", "mode": "99",
+    }
+    assert svc.copy_between_nodes("a", "/f", "zz", "/g") == {"error": "node not found", "name": "zz"}
+    dst.open_remote_file.assert_not_called()
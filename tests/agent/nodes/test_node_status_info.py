@@ -19,13 +19,26 @@ from tests.agent.nodes.conftest import (
 
 
 def test_get_node_status_empty_registry():
-    """Empty registry returns {"status": "ok", "nodes": []}."""
+    """Empty registry returns no nodes, still with the timer scheduler stats."""
     from unittest.mock import MagicMock
     registry = NodeRegistry()
     pool = make_mock_pool()
     svc = NodeService(registry=registry, pool=pool, handshake_service=MagicMock(), agent_identity_service=MagicMock())
     result = svc.get_node_status()
-    assert result == {"status": "ok", "nodes": []}
+    assert result == {"status": "ok", "nodes": [], "scheduler": pool.timer_stats.return_value}
+
+
+def test_get_node_status_reports_timer_scheduler_stats():
+    """A real pool's scheduler counters appear under "scheduler"."""
+    from unittest.mock import MagicMock
+    from agent.connectionpool.pool import ConnectionPool
+
+    svc = NodeService(registry=NodeRegistry(), pool=ConnectionPool([]), handshake_service=MagicMock(),
+                      agent_identity_service=MagicMock())
+
+    scheduler = svc.get_node_status()["scheduler"]
+
+    assert {"workers", "pending", "runs", "late_runs", "overruns", "errors"} <= set(scheduler)
 
 
 def test_get_node_status_includes_required_fields():
@@ -106,8 +119,8 @@ def test_get_node_status_cached_info_available_true():
     result = svc.get_node_status()
     assert result["nodes"][0]["cached_info_available"] is True
 
-def test_get_node_status_uses_pool_get_connection_state():
-    """NodeService calls pool.get_connection_state(name) — never pool.connections directly."""
+def test_get_node_status_uses_one_pool_snapshot():
+    """NodeService reads all states via pool.snapshot_states() — never per node, never pool.connections."""
     from agent.connectionpool.connection import ConnectionState
     from unittest.mock import MagicMock
 
@@ -118,8 +131,30 @@ def test_get_node_status_uses_pool_get_connection_state():
                      host="192.168.1.10", port=22, user="pi", id_file=None)
     registry.add(cfg)
     svc = NodeService(registry=registry, pool=pool, handshake_service=MagicMock(), agent_identity_service=MagicMock())
-    svc.get_node_status()
-    pool.get_connection_state.assert_called_with("lab-pi-01")
+    result = svc.get_node_status()
+    pool.snapshot_states.assert_called_once_with()
+    pool.get_connection_state.assert_not_called()
+    assert result["nodes"][0]["pool_state"] == "open"
+
+
+def test_get_node_status_includes_keepalive_rtt():
+    from agent.connectionpool.connection import ConnectionState
+    from unittest.mock import MagicMock
+
+    rtt = {"last_ms": 3.1, "ewma_ms": 2.9, "p95_ms": 4.0, "samples": 12, "missed": 0, "measured_at": 1.0}
+    pool = make_mock_pool(connections=[make_mock_connection("lab-pi-01", ConnectionState.OPEN)])
+    pool.snapshot_rtt.return_value = {"lab-pi-01": rtt}
+    registry = NodeRegistry()
+    registry.add(NodeConfig(name="lab-pi-01", mode="direct", enabled=True,
+                            host="192.168.1.10", port=22, user="pi", id_file=None))
+    registry.add(NodeConfig(name="lab-pi-02", mode="direct", enabled=True,
+                            host="192.168.1.11", port=22, user="pi", id_file=None))
+    svc = NodeService(registry=registry, pool=pool, handshake_service=MagicMock(), agent_identity_service=MagicMock())
+
+    nodes = {n["name"]: n for n in svc.get_node_status()["nodes"]}
+
+    assert nodes["lab-pi-01"]["rtt"] == rtt
+    assert nodes["lab-pi-02"]["rtt"] is None
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,67 @@
+"""Unit tests for ResultCache (TTL + LRU command result cache)."""
+
+from agent.nodes.result_cache import ResultCache
+
+
+def test_get_returns_value_and_age():
+    cache = ResultCache()
+    cache.put("n1", "nproc", 1, {"stdout": "4\n"}, ttl=60)
+
+    hit = cache.get("n1", "nproc", 1)
+
+    assert hit is not None
+    result, age = hit
+    assert result == {"stdout": "4\n"}
+    assert age >= 0
+
+
+def test_expired_entry_is_a_miss(monkeypatch):
+    import agent.nodes.result_cache as mod
+
+    now = [1000.0]
+    monkeypatch.setattr(mod.time, "monotonic", lambda: now[0])
+    cache = ResultCache()
+    cache.put("n1", "df -h", 1, {"stdout": "x"}, ttl=5)
+
+    now[0] += 6
+
+    assert cache.get("n1", "df -h", 1) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_generation_mismatch_is_a_miss():
+    cache = ResultCache()
+    cache.put("n1", "uname -a", 1, {"stdout": "x"}, ttl=60)
+
+    assert cache.get("n1", "uname -a", 2) is None
+    assert cache.stats() == {"hits": 0, "misses": 1, "evictions": 0, "entries": 0}
+
+
+def test_lru_eviction_drops_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put("n1", "a", 1, {"v": "a"}, ttl=60)
+    cache.put("n1", "b", 1, {"v": "b"}, ttl=60)
+    cache.get("n1", "a", 1)  # "a" is now most recently used
+    cache.put("n1", "c", 1, {"v": "c"}, ttl=60)
+
+    assert cache.get("n1", "b", 1) is None
+    assert cache.get("n1", "a", 1) is not None
+    assert cache.get("n1", "c", 1) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_non_positive_ttl_is_not_stored():
+    cache = ResultCache()
+    cache.put("n1", "a", 1, {"v": "a"}, ttl=0)
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_node_only_drops_that_node():
+    cache = ResultCache()
+    cache.put("n1", "a", 1, {"v": "a"}, ttl=60)
+    cache.put("n1", "b", 1, {"v": "b"}, ttl=60)
+    cache.put("n2", "a", 1, {"v": "a"}, ttl=60)
+
+    assert cache.invalidate_node("n1") == 2
+    assert cache.get("n2", "a", 1) is not None
@@ -0,0 +1,136 @@
+"""Unit tests for NodeService shell session APIs and SessionRegistry."""
+
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from agent.connection_result import CommandResult
+from agent.connectionpool.session import SessionClosed
+from agent.nodes.sessions import SessionRegistry
+from tests.agent.nodes.conftest import make_service_with_open_connection
+
+
+def _result(command, stdout=""):
+    now = datetime.now(timezone.utc)
+    return CommandResult(command=command, exit_code=0, stdout=stdout, stderr="", started_at=now, ended_at=now)
+
+
+def test_open_session_and_run_commands():
+    svc, conn = make_service_with_open_connection()
+    shell = conn.open_shell_session.return_value
+    shell.run.side_effect = lambda cmd, timeout=None: _result(cmd, stdout="/tmp\n")
+
+    opened = svc.open_session("lab-pi-01")
+    result = svc.run_in_session(opened["session_id"], "pwd")
+
+    assert opened["status"] == "opened"
+    assert result["stdout"] == "/tmp\n"
+    assert result["session_id"] == opened["session_id"]
+
+
+def test_open_session_enforces_per_node_cap():
+    svc, _ = make_service_with_open_connection(session_registry=SessionRegistry(max_per_node=1))
+
+    svc.open_session("lab-pi-01")
+
+    assert svc.open_session("lab-pi-01") == {"error": "too_many_sessions", "name": "lab-pi-01", "max_sessions": 1}
+
+
+def test_open_session_reports_no_free_channel():
+    svc, conn = make_service_with_open_connection()
+    conn.open_shell_session.side_effect = TimeoutError("no slot")
+
+    assert svc.open_session("lab-pi-01") == {"error": "no_free_channel", "name": "lab-pi-01"}
+
+
+def test_run_in_session_timeout_closes_session():
+    svc, conn = make_service_with_open_connection()
+    conn.open_shell_session.return_value.run.side_effect = TimeoutError("slow")
+    session_id = svc.open_session("lab-pi-01")["session_id"]
+
+    result = svc.run_in_session(session_id, "sleep 100", timeout=1)
+
+    assert result == {"error": "timeout", "session_id": session_id, "command": "sleep 100"}
+    assert svc.run_in_session(session_id, "true")["error"] == "session_not_found"
+
+
+def test_run_in_session_reports_closed_shell():
+    svc, conn = make_service_with_open_connection()
+    conn.open_shell_session.return_value.run.side_effect = SessionClosed("exited")
+    session_id = svc.open_session("lab-pi-01")["session_id"]
+
+    assert svc.run_in_session(session_id, "exit") == {"error": "session_closed", "session_id": session_id}
+
+
+def test_close_session_closes_shell_and_forgets_id():
+    svc, conn = make_service_with_open_connection()
+    shell = conn.open_shell_session.return_value
+    session_id = svc.open_session("lab-pi-01")["session_id"]
+
+    assert svc.close_session(session_id) == {"status": "closed", "session_id": session_id}
+    shell.close.assert_called_once()
+    assert svc.close_session(session_id) == {"error": "session_not_found", "session_id": session_id}
+
+
+def test_remove_node_closes_its_sessions():
+    svc, conn = make_service_with_open_connection()
+    shell = conn.open_shell_session.return_value
+    svc.open_session("lab-pi-01")
+
+    svc.remove_node("lab-pi-01")
+
+    shell.close.assert_called_once()
+
+
+def test_disable_node_closes_its_sessions():
+    svc, conn = make_service_with_open_connection()
+    shell = conn.open_shell_session.return_value
+    session_id = svc.open_session("lab-pi-01")["session_id"]
+
+    svc.disable_node("lab-pi-01")
+
+    shell.close.assert_called_once()
+    assert svc.run_in_session(session_id, "pwd")["error"] == "session_not_found"
+
+
+def test_session_registry_reaps_idle_sessions():
+    registry = SessionRegistry(idle_timeout=0)
+    shell = MagicMock()
+    entry = registry.add("n1", shell)
+
+    assert registry.get(entry.session_id) is None
+    shell.close.assert_called_once()
+
+
+def test_session_registry_reaps_sessions_from_before_a_reconnect():
+    registry = SessionRegistry()
+    connection = MagicMock(generation=1)
+    shell = MagicMock(alive=True)
+    entry = registry.add("n1", shell, connection, generation=1)
+    assert registry.get(entry.session_id) is entry
+
+    connection.generation = 2
+
+    assert registry.has_capacity("n1")
+    assert registry.get(entry.session_id) is None
+    shell.close.assert_called_once()
+
+
+def test_session_registry_reaps_sessions_whose_shell_ended():
+    registry = SessionRegistry()
+    shell = MagicMock(alive=False)
+    entry = registry.add("n1", shell, MagicMock(generation=1), generation=1)
+
+    assert registry.get(entry.session_id) is None
+    shell.close.assert_called_once()
+
+
+def test_run_in_session_after_reconnect_reports_session_not_found():
+    svc, conn = make_service_with_open_connection()
+    conn.generation = 1
+    shell = conn.open_shell_session.return_value
+    session_id = svc.open_session("lab-pi-01")["session_id"]
+
+    conn.generation = 2  # the pool reopened the connection; the shell's channel is gone
+
+    assert svc.run_in_session(session_id, "pwd")["error"] == "session_not_found"
+    shell.close.assert_called_once()
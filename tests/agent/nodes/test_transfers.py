@@ -0,0 +1,39 @@
+"""Unit tests for TransferRegistry (resumable transfer progress records)."""
+
+from agent.nodes.transfers import TransferRegistry
+
+
+def test_checkpoint_resume_and_terminal_state():
+    registry = TransferRegistry()
+    registry.start("t1", "copy", "b", "/g", total_bytes=10, source={"node": "a", "path": "/f"})
+
+    registry.checkpoint("t1", 4)
+    registry.set_state("t1", "interrupted")
+    registry.resumed("t1", 4)
+    registry.set_state("t1", "completed")
+
+    record = registry.get("t1")
+    assert (record["state"], record["confirmed_bytes"], record["resumes"]) == ("completed", 4, 1)
+    assert record["source"] == {"node": "a", "path": "/f"}
+    assert "detail" not in record
+
+
+def test_unknown_ids_are_ignored():
+    registry = TransferRegistry()
+    registry.checkpoint("nope", 1)
+    registry.set_state("nope", "failed")
+
+    assert registry.get("nope") is None
+    assert registry.list() == []
+
+
+def test_finished_records_pruned_oldest_first():
+    registry = TransferRegistry(max_finished=1)
+    registry.start("running", "upload", "n", "/r")
+    for transfer_id in ("old", "new"):
+        registry.start(transfer_id, "upload", "n", "/p")
+        registry.set_state(transfer_id, "failed", detail="boom")
+
+    assert registry.get("old") is None
+    assert registry.get("new")["detail"] == "boom"
+    assert registry.get("running")["state"] == "running"
@@ -0,0 +1,136 @@
+"""Unit tests for UploadCache (upload deduplication records)."""
+
+import json
+from unittest.mock import MagicMock
+
+from agent.nodes.upload_cache import UploadCache, UploadRecord
+
+
+def _record(digest="a" * 64, size=5, mtime=1700000000, mode="0644"):
+    return UploadRecord(sha256=digest, size=size, mtime=mtime, mode=mode)
+
+
+def test_put_and_get_by_node_and_path():
+    cache = UploadCache()
+    cache.put("n1", "/tmp/a", _record())
+
+    assert cache.get("n1", "/tmp/a") == _record()
+    assert cache.get("n2", "/tmp/a") is None
+    assert cache.get("n1", "/tmp/b") is None
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = UploadCache(max_entries=2)
+    cache.put("n1", "/a", _record())
+    cache.put("n1", "/b", _record())
+    cache.get("n1", "/a")
+    cache.put("n1", "/c", _record())
+
+    assert cache.get("n1", "/a") is not None
+    assert cache.get("n1", "/b") is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_invalidate_and_invalidate_node():
+    cache = UploadCache()
+    cache.put("n1", "/a", _record())
+    cache.put("n1", "/b", _record())
+    cache.put("n2", "/a", _record())
+
+    assert cache.invalidate("n1", "/a") is True
+    assert cache.invalidate("n1", "/a") is False
+    assert cache.invalidate_node("n1") == 1
+    assert cache.get("n2", "/a") is not None
+
+
+def test_persistent_cache_survives_reload(tmp_path):
+    path = tmp_path / "uploads.json"
+    cache = UploadCache(path=str(path), scheduler=MagicMock())
+    cache.put("n1", "/a", _record(digest="b" * 64))
+    cache.put("n1", "/b", _record())
+    cache.invalidate("n1", "/b")
+    cache.close()
+
+    reloaded = UploadCache(path=str(path))
+
+    assert reloaded.get("n1", "/a") == _record(digest="b" * 64)
+    assert reloaded.get("n1", "/b") is None
+    assert not (tmp_path / "uploads.json.tmp").exists()
+
+
+def test_reload_with_smaller_limit_keeps_newest(tmp_path):
+    path = tmp_path / "uploads.json"
+    cache = UploadCache(path=str(path), scheduler=MagicMock())
+    for name in ("/a", "/b", "/c"):
+        cache.put("n1", name, _record())
+    cache.close()
+
+    reloaded = UploadCache(max_entries=2, path=str(path))
+
+    assert reloaded.get("n1", "/a") is None
+    assert reloaded.get("n1", "/c") is not None
+
+
+def test_unreadable_cache_file_starts_empty(tmp_path):
+    path = tmp_path / "uploads.json"
+    path.write_text(json.dumps([{"node": "n1"}]))
+
+    cache = UploadCache(path=str(path))
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_changes_are_written_once_by_the_debounced_flush(tmp_path):
+    path = tmp_path / "uploads.json"
+    scheduler = MagicMock()
+    cache = UploadCache(path=str(path), flush_delay=5.0, scheduler=scheduler)
+    for name in ("/a", "/b", "/c"):
+        cache.put("n1", name, _record())
+    cache.invalidate("n1", "/b")
+
+    assert not path.exists()
+    scheduler.call_later.assert_called_once()
+    assert scheduler.call_later.call_args.args[0] == 5.0
+
+    scheduler.call_later.call_args.args[1]()  # timer fires
+
+    assert [row["path"] for row in json.loads(path.read_text())] == ["/a", "/c"]
+    cache.put("n1", "/d", _record())
+    assert scheduler.call_later.call_count == 2  # next change schedules a new flush
+
+
+def test_close_writes_pending_changes_and_cancels_timer(tmp_path):
+    path = tmp_path / "uploads.json"
+    scheduler = MagicMock()
+    cache = UploadCache(path=str(path), scheduler=scheduler)
+    cache.put("n1", "/a", _record())
+
+    cache.close()
+
+    scheduler.call_later.return_value.cancel.assert_called_once()
+    assert UploadCache(path=str(path)).get("n1", "/a") == _record()
+
+
+def test_flush_writes_outside_the_cache_lock(tmp_path, monkeypatch):
+    path = tmp_path / "uploads.json"
+    cache = UploadCache(path=str(path), scheduler=MagicMock())
+    cache.put("n1", "/a", _record())
+    seen = []
+    real_dump = json.dump
+    monkeypatch.setattr(
+        "agent.nodes.upload_cache.json.dump",
+        lambda *args, **kwargs: (seen.append(cache._lock.locked()), real_dump(*args, **kwargs)),
+    )
+
+    cache.flush()
+
+    assert seen == [False]
+
+
+def test_in_memory_cache_never_schedules_a_flush():
+    scheduler = MagicMock()
+    cache = UploadCache(scheduler=scheduler)
+    cache.put("n1", "/a", _record())
+    cache.close()
+
+    scheduler.call_later.assert_not_called()
@@ -0,0 +1,168 @@
+"""Unit tests for NodeService chunked upload APIs and UploadRegistry."""
+
+import base64
+
+from agent.nodes.uploads import UploadRegistry, MAX_CHUNK_BYTES
+from tests.agent.nodes.conftest import make_service_with_open_connection
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def test_chunked_upload_streams_chunks_and_commits():
+    svc, conn = make_service_with_open_connection()
+    handle = conn.open_remote_file.return_value
+
+    started = svc.begin_upload("lab-pi-01", "/opt/app.bin", mode="0755")
+    upload_id = started["upload_id"]
+    first = svc.upload_chunk(upload_id, 0, _b64(b"abc"))
+    second = svc.upload_chunk(upload_id, 3, _b64(b"defg"))
+    committed = svc.commit_upload(upload_id)
+
+    assert started["status"] == "started"
+    assert started["max_chunk_bytes"] == MAX_CHUNK_BYTES
+    conn.open_remote_file.assert_called_once_with("/opt/app.bin", "wb")
+    assert first["bytes_received"] == 3
+    assert second["bytes_received"] == 7
+    assert [c.args for c in conn.write_remote_file.call_args_list] == [(handle, b"abc"), (handle, b"defg")]
+    conn.finish_remote_file.assert_called_once_with(handle, "/opt/app.bin", "0755")
+    assert committed == {"status": "written", "upload_id": upload_id, "path": "/opt/app.bin", "bytes_written": 7}
+    assert svc.commit_upload(upload_id) == {"error": "upload_not_found", "upload_id": upload_id}
+
+
+def test_upload_chunk_rejects_out_of_order_offset():
+    svc, conn = make_service_with_open_connection()
+    upload_id = svc.begin_upload("lab-pi-01", "/tmp/f")["upload_id"]
+    svc.upload_chunk(upload_id, 0, _b64(b"abc"))
+
+    result = svc.upload_chunk(upload_id, 0, _b64(b"abc"))
+
+    assert result == {"error": "offset_mismatch", "upload_id": upload_id, "expected_offset": 3}
+    assert conn.write_remote_file.call_count == 1
+
+
+def test_upload_chunk_validates_input():
+    svc, conn = make_service_with_open_connection()
+    upload_id = svc.begin_upload("lab-pi-01", "/tmp/f")["upload_id"]
+
+    assert svc.upload_chunk(upload_id, 0, "!!!")["error"] == "invalid_base64"
+    too_big = "A" * ((MAX_CHUNK_BYTES + 2) // 3 * 4 + 4)
+    assert svc.upload_chunk(upload_id, 0, too_big)["error"] == "chunk_too_large"
+    assert svc.upload_chunk("nope", 0, _b64(b"x")) == {"error": "upload_not_found", "upload_id": "nope"}
+    conn.write_remote_file.assert_not_called()
+
+
+def test_upload_chunk_write_failure_aborts_upload():
+    """A write that still fails after reopening the file is a real failure: the upload is aborted."""
+    svc, conn = make_service_with_open_connection()
+    conn.write_remote_file.side_effect = IOError("disk full")
+    upload_id = svc.begin_upload("lab-pi-01", "/tmp/f")["upload_id"]
+
+    result = svc.upload_chunk(upload_id, 0, _b64(b"abc"))
+
+    assert result == {"error": "upload_failed", "upload_id": upload_id, "detail": "disk full"}
+    assert conn.write_remote_file.call_count == 2
+    conn.abort_remote_file.assert_called_once_with(conn.reopen_remote_file.return_value, "/tmp/f")
+    assert svc.upload_chunk(upload_id, 0, _b64(b"abc"))["error"] == "upload_not_found"
+    assert svc.get_transfer_status(upload_id)["state"] == "failed"
+
+
+def test_upload_chunk_resumes_at_confirmed_offset_after_connection_loss():
+    """After a dropped write the file is reopened at bytes_received on the reconnected connection."""
+    svc, conn = make_service_with_open_connection()
+    upload_id = svc.begin_upload("lab-pi-01", "/tmp/f")["upload_id"]
+    svc.upload_chunk(upload_id, 0, _b64(b"abc"))
+    reopened = conn.reopen_remote_file.return_value
+    conn.write_remote_file.side_effect = [EOFError("transport dropped"), None, None]
+
+    result = svc.upload_chunk(upload_id, 3, _b64(b"def"))
+
+    assert result == {"status": "ok", "upload_id": upload_id, "bytes_received": 6, "resumed": True}
+    conn.check_transport.assert_called_once()
+    conn.reopen_remote_file.assert_called_once_with("/tmp/f", 3)
+    assert conn.write_remote_file.call_args.args == (reopened, b"def")
+    assert svc.upload_chunk(upload_id, 6, _b64(b"g"))["bytes_received"] == 7
+    status = svc.get_transfer_status(upload_id)
+    assert (status["state"], status["confirmed_bytes"], status["resumes"]) == ("running", 7, 1)
+
+
+def test_upload_survives_unreachable_node_and_resumes_later():
+    """While the node cannot be reopened the upload is kept; the client resends the same chunk."""
+    svc, conn = make_service_with_open_connection()
+    upload_id = svc.begin_upload("lab-pi-01", "/tmp/f")["upload_id"]
+    svc.upload_chunk(upload_id, 0, _b64(b"abc"))
+    conn.write_remote_file.side_effect = EOFError("transport dropped")
+    svc._pool.ensure_connection_open.return_value = None
+
+    interrupted = svc.upload_chunk(upload_id, 3, _b64(b"def"))
+    assert interrupted == {"error": "upload_interrupted", "upload_id": upload_id, "expected_offset": 3}
+    assert svc.get_transfer_status(upload_id)["state"] == "interrupted"
+    conn.abort_remote_file.assert_not_called()
+
+    svc._pool.ensure_connection_open.return_value = conn
+    conn.write_remote_file.side_effect = None
+    assert svc.upload_chunk(upload_id, 3, _b64(b"def"))["resumed"] is True
+    assert svc.commit_upload(upload_id)["bytes_written"] == 6
+    conn.finish_remote_file.assert_called_once_with(conn.reopen_remote_file.return_value, "/tmp/f", "0644")
+    assert svc.get_transfer_status(upload_id)["state"] == "completed"
+
+
+def test_get_transfer_status_lists_and_expires_reaped_uploads():
+    registry = UploadRegistry()
+    svc, conn = make_service_with_open_connection(upload_registry=registry)
+    upload_id = svc.begin_upload("lab-pi-01", "/tmp/f")["upload_id"]
+
+    listed = svc.get_transfer_status()["transfers"]
+    assert [(t["transfer_id"], t["kind"], t["state"]) for t in listed] == [(upload_id, "upload", "running")]
+
+    registry.idle_timeout = 0
+    assert svc.get_transfer_status(upload_id)["state"] == "expired"
+    assert svc.get_transfer_status("nope") == {"error": "transfer_not_found", "transfer_id": "nope"}
+
+
+def test_begin_upload_validates_mode_and_capacity():
+    svc, conn = make_service_with_open_connection(upload_registry=UploadRegistry(max_uploads=1))
+
+    assert svc.begin_upload("lab-pi-01", "/tmp/f", mode="9z")["error"] == "invalid_mode"
+    svc.begin_upload("lab-pi-01", "/tmp/a")
+    assert svc.begin_upload("lab-pi-01", "/tmp/b") == {"error": "too_many_uploads", "max_uploads": 1}
+    conn.open_remote_file.assert_called_once()
+
+
+def test_abort_upload_discards_partial_file():
+    svc, conn = make_service_with_open_connection()
+    handle = conn.open_remote_file.return_value
+    upload_id = svc.begin_upload("lab-pi-01", "/tmp/f")["upload_id"]
+
+    assert svc.abort_upload(upload_id) == {"status": "aborted", "upload_id": upload_id}
+    conn.abort_remote_file.assert_called_once_with(handle, "/tmp/f")
+    assert svc.abort_upload(upload_id) == {"error": "upload_not_found", "upload_id": upload_id}
+
+
+def test_idle_uploads_are_reaped():
+    registry = UploadRegistry(idle_timeout=0)
+    svc, conn = make_service_with_open_connection(upload_registry=registry)
+    upload_id = svc.begin_upload("lab-pi-01", "/tmp/f")["upload_id"]
+
+    assert svc.upload_chunk(upload_id, 0, _b64(b"x"))["error"] == "upload_not_found"
+    conn.abort_remote_file.assert_called_once()
+
+
+def test_remove_node_aborts_its_uploads():
+    svc, conn = make_service_with_open_connection()
+    svc.begin_upload("lab-pi-01", "/tmp/f")
+
+    svc.remove_node("lab-pi-01")
+
+    conn.abort_remote_file.assert_called_once()
+
+
+def test_disable_node_aborts_its_uploads():
+    svc, conn = make_service_with_open_connection()
+    upload_id = svc.begin_upload("lab-pi-01", "/tmp/f")["upload_id"]
+
+    svc.disable_node("lab-pi-01")
+
+    conn.abort_remote_file.assert_called_once()
+    assert svc.upload_chunk(upload_id, 0, _b64(b"x"))["error"] == "upload_not_found"
@@ -0,0 +1,62 @@
+"""Unit tests for CommandResult (bytes-backed, lazily decoded)."""
+
+import base64
+from datetime import datetime, timezone
+
+import pytest
+
+from agent.connection_result import CommandResult
+
+
+def _result(stdout=b"", stderr=b"", **kwargs):
+    now = datetime.now(timezone.utc)
+    return CommandResult("cmd", 0, stdout, stderr, now, now, **kwargs)
+
+
+def test_str_output_is_stored_as_utf8_bytes():
+    result = _result(stdout="héllo", stderr="")
+
+    assert result.stdout_bytes == "héllo".encode("utf-8")
+    assert result.stdout == "héllo"
+
+
+def test_invalid_utf8_is_replaced_by_default():
+    result = _result(stdout=b"ok\xff\xfe")
+
+    assert result.stdout == "ok��"
+    assert result.to_dict()["stdout"] == "ok��"
+
+
+def test_strict_errors_raise_on_invalid_utf8():
+    result = _result(stdout=b"\xff", errors="strict")
+
+    with pytest.raises(UnicodeDecodeError):
+        _ = result.stdout
+
+
+def test_to_dict_base64_returns_raw_bytes():
+    raw = bytes(range(256))
+    result = _result(stdout=raw, stderr=b"warn")
+
+    out = result.to_dict("base64")
+
+    assert base64.b64decode(out["stdout"]) == raw
+    assert base64.b64decode(out["stderr"]) == b"warn"
+    assert out["output_format"] == "base64"
+
+
+def test_to_dict_text_has_no_output_format_key():
+    assert "output_format" not in _result(stdout=b"x").to_dict()
+
+
+def test_to_dict_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        _result().to_dict("hex")
+
+
+def test_result_uses_slots():
+    result = _result()
+
+    assert not hasattr(result, "__dict__")
+    with pytest.raises(AttributeError):
+        result.extra = 1
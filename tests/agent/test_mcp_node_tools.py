@@ -235,7 +235,9 @@ def test_run_command_on_node_handler_delegates():
     fn = _get_tool_fn(mcp, "run_command_on_node")
     result = fn(name="test-node", command="echo hello", timeout=30)
 
-    svc.run_command_on_node.assert_called_once_with(name="test-node", command="echo hello", timeout=30)
+    svc.run_command_on_node.assert_called_once_with(
+        name="test-node", command="echo hello", timeout=30, cache_ttl=0, output_format="text"
+    )
     assert result == {
         "exit_code": 0,
         "stdout": "hello",
@@ -257,7 +259,7 @@ def test_upload_file_to_node_handler_delegates():
     result = fn(name="test-node", remote_path="/tmp/test.txt", data_b64="aGVsbG8=", mode="0644")
 
     svc.upload_file_to_node.assert_called_once_with(
-        name="test-node", remote_path="/tmp/test.txt", data_b64="aGVsbG8=", mode="0644"
+        name="test-node", remote_path="/tmp/test.txt", data_b64="aGVsbG8=", mode="0644", atomic=False
     )
     assert result == {"status": "written", "path": "/tmp/test.txt"}
 
@@ -272,5 +274,165 @@ def test_download_file_from_node_handler_delegates():
     fn = _get_tool_fn(mcp, "download_file_from_node")
     result = fn(name="test-node", remote_path="/tmp/test.txt")
 
-    svc.download_file_from_node.assert_called_once_with(name="test-node", remote_path="/tmp/test.txt")
+    svc.download_file_from_node.assert_called_once_with(
+        name="test-node", remote_path="/tmp/test.txt", offset=None, length=None, continuation_token=None
+    )
     assert result == {"status": "ok", "path": "/tmp/test.txt", "data_b64": "aGVsbG8="}
+
+
+# ---------------------------------------------------------------------------
+# Handler tests — background job tools
+# ---------------------------------------------------------------------------
+
+def test_job_tools_are_registered():
+    mcp = make_test_mcp()
+    mcp_handlers.register_tools(mcp, make_mock_node_service(), make_mock_identity_service())
+
+    names = _tool_names(mcp)
+    for expected in ["start_command_on_node", "get_job_status", "get_job_output", "cancel_job"]:
+        assert expected in names
+
+
+def test_start_command_on_node_handler_delegates():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.start_command_on_node.return_value = {"status": "started", "job_id": "abc", "name": "test-node"}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+
+    fn = _get_tool_fn(mcp, "start_command_on_node")
+    result = fn(name="test-node", command="make", timeout=600)
+
+    svc.start_command_on_node.assert_called_once_with(name="test-node", command="make", timeout=600)
+    assert result == {"status": "started", "job_id": "abc", "name": "test-node"}
+
+
+def test_get_job_output_handler_delegates():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.get_job_output.return_value = {"job_id": "abc", "data": "x"}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+
+    fn = _get_tool_fn(mcp, "get_job_output")
+    result = fn(job_id="abc", offset=10)
+
+    svc.get_job_output.assert_called_once_with(
+        job_id="abc", offset=10, limit=65536, stream="stdout", output_format="text"
+    )
+    assert result == {"job_id": "abc", "data": "x"}
+
+
+def test_run_command_on_nodes_handler_delegates():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.run_command_on_nodes.return_value = {"status": "ok", "results": {}}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+
+    fn = _get_tool_fn(mcp, "run_command_on_nodes")
+    result = fn(names=["a", "b"], command="uptime", max_parallel=4, deadline=30)
+
+    svc.run_command_on_nodes.assert_called_once_with(
+        names=["a", "b"], command="uptime", max_parallel=4, deadline=30, output_format="text"
+    )
+    assert result == {"status": "ok", "results": {}}
+
+
+def test_session_tools_delegate():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.open_session.return_value = {"status": "opened", "session_id": "s1", "name": "n"}
+    svc.run_in_session.return_value = {"exit_code": 0, "session_id": "s1"}
+    svc.close_session.return_value = {"status": "closed", "session_id": "s1"}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+
+    assert _get_tool_fn(mcp, "open_session")(name="n")["session_id"] == "s1"
+    assert _get_tool_fn(mcp, "run_in_session")(session_id="s1", command="pwd")["exit_code"] == 0
+    assert _get_tool_fn(mcp, "close_session")(session_id="s1")["status"] == "closed"
+
+    svc.open_session.assert_called_once_with(name="n")
+    svc.run_in_session.assert_called_once_with(session_id="s1", command="pwd", timeout=30)
+    svc.close_session.assert_called_once_with(session_id="s1")
+
+
+def test_chunked_upload_tools_delegate():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.begin_upload.return_value = {"status": "started", "upload_id": "u1"}
+    svc.upload_chunk.return_value = {"status": "ok", "bytes_received": 3}
+    svc.commit_upload.return_value = {"status": "written", "upload_id": "u1"}
+    svc.abort_upload.return_value = {"status": "aborted", "upload_id": "u1"}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+
+    assert _get_tool_fn(mcp, "begin_upload")(name="n", remote_path="/tmp/f")["upload_id"] == "u1"
+    assert _get_tool_fn(mcp, "upload_chunk")(upload_id="u1", offset=0, data_b64="YWJj")["bytes_received"] == 3
+    assert _get_tool_fn(mcp, "commit_upload")(upload_id="u1")["status"] == "written"
+    assert _get_tool_fn(mcp, "abort_upload")(upload_id="u1")["status"] == "aborted"
+
+    svc.begin_upload.assert_called_once_with(name="n", remote_path="/tmp/f", mode="0644")
+    svc.upload_chunk.assert_called_once_with(upload_id="u1", offset=0, data_b64="YWJj")
+    svc.commit_upload.assert_called_once_with(upload_id="u1")
+    svc.abort_upload.assert_called_once_with(upload_id="u1")
+
+
+def test_sync_file_to_node_handler_delegates():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.sync_file_to_node.return_value = {"status": "unchanged"}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+
+    result = _get_tool_fn(mcp, "sync_file_to_node")(name="n", remote_path="/f", data_b64="eA==")
+
+    svc.sync_file_to_node.assert_called_once_with(
+        name="n", remote_path="/f", data_b64="eA==", mode="0644", block_size=131072
+    )
+    assert result == {"status": "unchanged"}
+
+
+def test_distribute_file_handler_delegates():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.distribute_file.return_value = {"status": "ok"}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+
+    result = _get_tool_fn(mcp, "distribute_file")(names=["a", "b"], remote_path="/f", data_b64="eA==")
+
+    svc.distribute_file.assert_called_once_with(
+        names=["a", "b"], remote_path="/f", data_b64="eA==", mode="0644", max_parallel=16, atomic=False
+    )
+    assert result == {"status": "ok"}
+
+
+def test_tree_transfer_handlers_delegate():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.upload_tree.return_value = {"status": "written"}
+    svc.download_tree.return_value = {"status": "ok"}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+    files = [{"path": "a", "data_b64": "eA=="}]
+
+    assert _get_tool_fn(mcp, "upload_tree")(name="n", remote_dir="/d", files=files) == {"status": "written"}
+    assert _get_tool_fn(mcp, "download_tree")(name="n", remote_dir="/d", compress=True) == {"status": "ok"}
+
+    svc.upload_tree.assert_called_once_with(name="n", remote_dir="/d", files=files, compress=False)
+    svc.download_tree.assert_called_once_with(name="n", remote_dir="/d", compress=True)
+
+
+def test_copy_between_nodes_handler_delegates():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.copy_between_nodes.return_value = {"status": "copied"}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+
+    result = _get_tool_fn(mcp, "copy_between_nodes")(src="a", src_path="/f", dst="b", dst_path="/g")
+
+    svc.copy_between_nodes.assert_called_once_with(src="a", src_path="/f", dst="b", dst_path="/g", mode=None)
+    assert result == {"status": "copied"}
+
+
+def test_get_transfer_status_handler_delegates():
+    mcp = make_test_mcp()
+    svc = make_mock_node_service()
+    svc.get_transfer_status.return_value = {"transfers": []}
+    mcp_handlers.register_tools(mcp, svc, make_mock_identity_service())
+
+    assert _get_tool_fn(mcp, "get_transfer_status")() == {"transfers": []}
+    svc.get_transfer_status.assert_called_once_with(transfer_id=None)
@@ -0,0 +1,130 @@
+"""Benchmark: SFTP download throughput over an artificially slow link.
+
+A local TCP proxy in front of the sshd fixture delays every forwarded chunk by
+_ONE_WAY_DELAY seconds in each direction, approximating a high-latency edge
+link. The same file is then downloaded with a prefetch window of 1 (one
+outstanding 32 KiB read, i.e. one round trip per request) and with the
+default window.
+
+Run with:
+    pytest -m benchmark -s tests/benchmarks/test_download_throughput_benchmark.py
+"""
+import base64
+import heapq
+import os
+import select
+import socket
+import threading
+import time
+
+import pytest
+
+_ONE_WAY_DELAY = 0.04  # 80 ms round trip
+_FILE_BYTES = 2 * 1024 * 1024
+
+
+class _LatencyProxy:
+    """Forward TCP connections to (host, port), delivering data *delay* seconds late."""
+
+    def __init__(self, host, port, delay):
+        self.target = (host, port)
+        self.delay = delay
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self._listener.getsockname()[1]
+        self._stop = threading.Event()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(self.target)
+            for src, dst in ((client, upstream), (upstream, client)):
+                threading.Thread(target=self._pump, args=(src, dst), daemon=True).start()
+
+    def _pump(self, src, dst):
+        # Reads immediately, writes each chunk once its delay has elapsed, so
+        # the link stays full and only latency (not bandwidth) is added.
+        pending = []
+        seq = 0
+        while not self._stop.is_set():
+            timeout = max(pending[0][0] - time.monotonic(), 0) if pending else 0.5
+            readable, _, _ = select.select([src], [], [], timeout)
+            if readable:
+                data = src.recv(65536)
+                if not data:
+                    break
+                heapq.heappush(pending, (time.monotonic() + self.delay, seq, data))
+                seq += 1
+            while pending and pending[0][0] <= time.monotonic():
+                dst.sendall(heapq.heappop(pending)[2])
+        for sock in (src, dst):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self._stop.set()
+        self._listener.close()
+
+
+def _download_all(conn, remote_path):
+    pieces, offset = [], 0
+    while True:
+        page = conn.download_file_range(remote_path, offset, 4 * 1024 * 1024)
+        assert page["status"] == "ok", page
+        pieces.append(base64.b64decode(page["data_b64"]))
+        offset += page["length"]
+        if page["eof"]:
+            return b"".join(pieces)
+
+
+@pytest.mark.benchmark
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_prefetch_window_download_throughput(spawn_sshd):
+    from agent.connectionpool.config_loader import DEFAULT_SFTP_PREFETCH_WINDOW
+    from agent.connectionpool.connection import Connection
+
+    proxy = _LatencyProxy(spawn_sshd.host, spawn_sshd.port, _ONE_WAY_DELAY)
+    content = os.urandom(_FILE_BYTES)
+    remote_path = f"/tmp/mcp_bench_download_{os.getpid()}.bin"
+
+    results = {}
+    try:
+        for window in (1, DEFAULT_SFTP_PREFETCH_WINDOW):
+            conn = Connection(
+                name=f"bench-download-{window}",
+                mode="direct",
+                user=spawn_sshd.user,
+                host="127.0.0.1",
+                port=proxy.port,
+                id_file=spawn_sshd.client_key_path,
+                sftp_prefetch_window=window,
+            )
+            conn.open()
+            try:
+                if not results:
+                    assert conn.upload_file(remote_path, base64.b64encode(content).decode())["status"] == "written"
+                started = time.perf_counter()
+                data = _download_all(conn, remote_path)
+                results[window] = time.perf_counter() - started
+                assert data == content
+            finally:
+                if window == DEFAULT_SFTP_PREFETCH_WINDOW:
+                    conn.execute(f"rm -f {remote_path}", timeout=10)
+                conn.close()
+    finally:
+        proxy.close()
+
+    mib = _FILE_BYTES / (1024 * 1024)
+    print(
+        "\nSFTP download of {:.0f} MiB over a {:.0f} ms RTT link:".format(mib, _ONE_WAY_DELAY * 2000)
+        + "".join(
+            "\n  window={:>3}: {:6.2f} s  {:7.2f} MiB/s".format(w, t, mib / t) for w, t in results.items()
+        )
+    )
+    assert results[DEFAULT_SFTP_PREFETCH_WINDOW] < results[1]
@@ -0,0 +1,112 @@
+"""Benchmark: thread count and per-command overhead of BaseConnection.execute().
+
+Compares the current select/event-driven wait against the previous strategy,
+which spawned one helper thread per command to wait on recv_exit_status().
+The legacy strategy is reproduced here against the same open transport so both
+runs share one sshd fixture and one connection.
+
+Run with:
+    pytest -m benchmark -s tests/benchmarks/test_execute_overhead_benchmark.py
+"""
+import statistics
+import threading
+import time
+
+import pytest
+
+_PARALLEL = 8
+_ROUNDS = 10
+
+
+def _legacy_execute(conn, command, timeout):
+    """Thread-per-command wait, as execute() worked before the event-driven drain."""
+    _, stdout, stderr = conn._ssh.exec_command(command)
+    holder = [None]
+
+    def _wait():
+        holder[0] = stdout.channel.recv_exit_status()
+
+    t = threading.Thread(target=_wait, daemon=True)
+    t.start()
+    t.join(timeout)
+    out = stdout.read()
+    stderr.read()
+    stdout.channel.close()
+    return holder[0], out
+
+
+def _current_execute(conn, command, timeout):
+    result = conn.execute(command, timeout=timeout)
+    return result.exit_code, result.stdout
+
+
+def _measure(conn, execute_fn):
+    """Run _ROUNDS rounds of _PARALLEL concurrent commands; return (peak_threads, latencies)."""
+    latencies = []
+    peak = [threading.active_count()]
+    stop = threading.Event()
+
+    def _sample():
+        while not stop.is_set():
+            peak[0] = max(peak[0], threading.active_count())
+            time.sleep(0.001)
+
+    sampler = threading.Thread(target=_sample, daemon=True)
+    sampler.start()
+    baseline = threading.active_count()
+    try:
+        for _ in range(_ROUNDS):
+            def _one():
+                started = time.perf_counter()
+                exit_code, _ = execute_fn(conn, "sleep 0.05; echo ok", 10)
+                assert exit_code == 0
+                latencies.append(time.perf_counter() - started)
+
+            workers = [threading.Thread(target=_one) for _ in range(_PARALLEL)]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join(30)
+    finally:
+        stop.set()
+        sampler.join(5)
+    # Exclude the sampler and the _PARALLEL caller threads from the peak.
+    return peak[0] - baseline - _PARALLEL, latencies
+
+
+@pytest.mark.benchmark
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_execute_thread_count_and_overhead(spawn_sshd):
+    from agent.connectionpool.connection import Connection
+
+    conn = Connection(
+        name="bench-exec",
+        mode="direct",
+        user=spawn_sshd.user,
+        host=spawn_sshd.host,
+        port=spawn_sshd.port,
+        id_file=spawn_sshd.client_key_path,
+    )
+    conn.open()
+    try:
+        legacy_extra, legacy_lat = _measure(conn, _legacy_execute)
+        current_extra, current_lat = _measure(conn, _current_execute)
+    finally:
+        conn.close()
+
+    print(
+        "\nexecute() overhead, {} rounds x {} parallel `sleep 0.05`:\n"
+        "  legacy  thread-per-command: extra threads peak={:>3}  median={:.1f} ms  p95={:.1f} ms\n"
+        "  current event-driven:       extra threads peak={:>3}  median={:.1f} ms  p95={:.1f} ms".format(
+            _ROUNDS,
+            _PARALLEL,
+            legacy_extra,
+            statistics.median(legacy_lat) * 1000,
+            statistics.quantiles(legacy_lat, n=20)[-1] * 1000,
+            current_extra,
+            statistics.median(current_lat) * 1000,
+            statistics.quantiles(current_lat, n=20)[-1] * 1000,
+        )
+    )
+    assert current_extra < legacy_extra
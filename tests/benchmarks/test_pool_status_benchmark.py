@@ -0,0 +1,86 @@
+"""Benchmark: get_node_status latency against fleet size.
+
+Builds a NodeRegistry and a ConnectionPool of synthetic (never opened)
+connections and times NodeService.get_node_status(), which reads every pool
+state in one snapshot_states() pass. For comparison it reproduces the
+previous per-node lookup, which scanned the pool's connection list under the
+pool lock once per node. At 10 000 nodes that O(n²) scan takes tens of
+seconds, so its cost there is extrapolated from a sample of lookups.
+
+No sshd is needed. Run with:
+    pytest -m benchmark -s tests/benchmarks/test_pool_status_benchmark.py
+"""
+import statistics
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from agent.connectionpool.config_loader import ConnectionConfig
+from agent.connectionpool.pool import ConnectionPool
+from agent.nodes.models import NodeConfig
+from agent.nodes.registry import NodeRegistry
+from agent.nodes.service import NodeService
+
+_SIZES = (10, 1_000, 10_000)
+_ROUNDS = 5
+_LEGACY_SAMPLE = 50
+
+
+def _build(size):
+    pool = ConnectionPool([])
+    registry = NodeRegistry()
+    for i in range(size):
+        name = f"node-{i:05d}"
+        pool.add_connection(
+            ConnectionConfig(name=name, mode="direct", user="u", host="127.0.0.1", port=22, id_file="/tmp/id")
+        )
+        registry.add(NodeConfig(name=name, mode="direct", enabled=True, host="127.0.0.1", port=22, user="u", id_file=None))
+    svc = NodeService(registry=registry, pool=pool, handshake_service=MagicMock(), agent_identity_service=MagicMock())
+    return pool, registry, svc
+
+
+def _legacy_state(pool, connections, name):
+    """Per-name lookup as get_connection_state() worked before the name index."""
+    with pool.lock:
+        for conn in connections:
+            if conn.name == name:
+                return conn.get_state().value
+        return "not_in_pool"
+
+
+def _median_seconds(fn):
+    timings = []
+    for _ in range(_ROUNDS):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+@pytest.mark.benchmark
+def test_node_status_latency_by_fleet_size():
+    rows = []
+    for size in _SIZES:
+        pool, registry, svc = _build(size)
+        connections = pool.connections
+        names = [cfg.name for cfg, _ in registry.all()]
+
+        current = _median_seconds(svc.get_node_status)
+        assert len(svc.get_node_status()["nodes"]) == size
+
+        # Names spread evenly across the list so the sample sees the average scan length.
+        sample = names[:: max(len(names) // _LEGACY_SAMPLE, 1)]
+        per_lookup = _median_seconds(lambda: [_legacy_state(pool, connections, n) for n in sample]) / len(sample)
+        legacy = per_lookup * size
+        rows.append((size, current, legacy))
+
+    print("\nget_node_status latency (median of {} rounds):".format(_ROUNDS))
+    for size, current, legacy in rows:
+        print(
+            "  {:>6} nodes: snapshot {:>9.2f} ms   legacy per-node scan {:>10.2f} ms{}".format(
+                size, current * 1000, legacy * 1000, " (extrapolated)" if size > _LEGACY_SAMPLE else ""
+            )
+        )
+    size, current, legacy = rows[-1]
+    assert current < legacy
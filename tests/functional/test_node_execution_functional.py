@@ -133,6 +133,32 @@ def test_upload_file_to_node_writes_file(node_exec_fixture):
         service.run_command_on_node(name, f"rm -f {shlex.quote(remote_path)}")
 
 
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_upload_file_to_node_skips_identical_reupload(node_exec_fixture):
+    import base64
+    service, pool, name = node_exec_fixture
+    _wait_for_open(pool, name)
+
+    data_b64 = base64.b64encode(b"dedup me").decode()
+    remote_path = f"/tmp/mcp_test_upload_dedup_{os.getpid()}.txt"
+
+    try:
+        first = service.upload_file_to_node(name, remote_path, data_b64)
+        second = service.upload_file_to_node(name, remote_path, data_b64)
+        assert first["status"] == "written"
+        assert second == {"status": "unchanged", "path": remote_path, "sha256": first["sha256"]}
+
+        # Editing the file on the node defeats the cache entry.
+        service.run_command_on_node(name, f"printf changed > {shlex.quote(remote_path)}")
+        third = service.upload_file_to_node(name, remote_path, data_b64)
+        assert third["status"] == "written"
+        verify = service.run_command_on_node(name, f"cat {shlex.quote(remote_path)}")
+        assert verify["stdout"] == "dedup me"
+    finally:
+        service.run_command_on_node(name, f"rm -f {shlex.quote(remote_path)}")
+
+
 @pytest.mark.functional
 @pytest.mark.requires_sshd
 def test_download_file_from_node_reads_file(node_exec_fixture):
@@ -212,3 +238,208 @@ def test_handshake_sh_runs_on_sshd_fixture(node_exec_fixture):
         assert "value" in fact, f"Fact {key!r} missing 'value' field"
         assert fact["source"] == "handshake", f"Fact {key!r} has wrong source"
         assert "collected_at" in fact, f"Fact {key!r} missing 'collected_at' field"
+
+
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_session_preserves_cwd_and_env(node_exec_fixture):
+    service, pool, name = node_exec_fixture
+    _wait_for_open(pool, name)
+
+    opened = service.open_session(name)
+    assert opened.get("status") == "opened", opened
+    session_id = opened["session_id"]
+    try:
+        assert service.run_in_session(session_id, "cd /tmp && export MCP_SESSION_VAR=kept")["exit_code"] == 0
+        result = service.run_in_session(session_id, 'pwd; printf %s "$MCP_SESSION_VAR"')
+        assert result["exit_code"] == 0
+        assert result["stdout"] == "/tmp\nkept"
+
+        failing = service.run_in_session(session_id, "ls /definitely-missing-path")
+        assert failing["exit_code"] != 0
+        assert failing["stderr"] != ""
+    finally:
+        service.close_session(session_id)
+
+
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_session_exit_reports_session_closed(node_exec_fixture):
+    service, pool, name = node_exec_fixture
+    _wait_for_open(pool, name)
+
+    session_id = service.open_session(name)["session_id"]
+    result = service.run_in_session(session_id, "exit 3", timeout=5)
+
+    assert result == {"error": "session_closed", "session_id": session_id}
+
+
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_chunked_upload_writes_file(node_exec_fixture):
+    import base64
+    import hashlib
+    service, pool, name = node_exec_fixture
+    _wait_for_open(pool, name)
+
+    content = os.urandom(3 * 1024 * 1024 + 17)
+    chunk = 1024 * 1024
+    remote_path = f"/tmp/mcp_test_chunked_{os.getpid()}.bin"
+
+    try:
+        upload_id = service.begin_upload(name, remote_path, mode="0600")["upload_id"]
+        for offset in range(0, len(content), chunk):
+            data_b64 = base64.b64encode(content[offset:offset + chunk]).decode()
+            assert service.upload_chunk(upload_id, offset, data_b64)["status"] == "ok"
+        committed = service.commit_upload(upload_id)
+        assert committed["status"] == "written"
+        assert committed["bytes_written"] == len(content)
+
+        verify = service.run_command_on_node(name, f"sha256sum {shlex.quote(remote_path)}")
+        assert verify["stdout"].split()[0] == hashlib.sha256(content).hexdigest()
+    finally:
+        service.run_command_on_node(name, f"rm -f {shlex.quote(remote_path)}")
+
+
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_ranged_download_pages_through_file(node_exec_fixture):
+    import base64
+    service, pool, name = node_exec_fixture
+    _wait_for_open(pool, name)
+
+    remote_path = f"/tmp/mcp_test_ranged_{os.getpid()}.txt"
+    try:
+        assert service.run_command_on_node(name, f"seq 1 20000 > {shlex.quote(remote_path)}")["exit_code"] == 0
+        expected = service.run_command_on_node(name, f"cat {shlex.quote(remote_path)}")["stdout"].encode()
+
+        pieces, token = [], None
+        page = service.download_file_from_node(name, remote_path, offset=0, length=4096)
+        while True:
+            assert page["status"] == "ok", page
+            pieces.append(base64.b64decode(page["data_b64"]))
+            token = page["continuation_token"]
+            if token is None:
+                break
+            page = service.download_file_from_node(name, remote_path, length=4096, continuation_token=token)
+
+        assert b"".join(pieces) == expected
+        assert len(pieces) > 1
+    finally:
+        service.run_command_on_node(name, f"rm -f {shlex.quote(remote_path)}")
+
+
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_sync_file_to_node_ships_only_changed_blocks(node_exec_fixture):
+    import base64
+    service, pool, name = node_exec_fixture
+    _wait_for_open(pool, name)
+
+    original = os.urandom(1024 * 1024)
+    changed = bytearray(original)
+    changed[300000:300010] = b"0123456789"
+    remote_path = f"/tmp/mcp_test_sync_{os.getpid()}.bin"
+
+    try:
+        first = service.sync_file_to_node(name, remote_path, base64.b64encode(original).decode())
+        assert first["status"] == "synced" and first["transfer"] == "full"
+
+        second = service.sync_file_to_node(name, remote_path, base64.b64encode(bytes(changed)).decode())
+        assert second["status"] == "synced" and second["transfer"] == "delta", second
+        assert second["bytes_sent"] == second["block_size"]
+
+        third = service.sync_file_to_node(name, remote_path, base64.b64encode(bytes(changed)).decode())
+        assert third["status"] == "unchanged"
+
+        page = service.download_file_from_node(name, remote_path, offset=0, length=len(changed))
+        assert base64.b64decode(page["data_b64"]) == bytes(changed)
+    finally:
+        service.run_command_on_node(name, f"rm -f {shlex.quote(remote_path)}")
+
+
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+@pytest.mark.parametrize("compress", [False, True])
+def test_upload_and_download_tree_round_trip(node_exec_fixture, compress):
+    import base64
+    service, pool, name = node_exec_fixture
+    _wait_for_open(pool, name)
+
+    remote_dir = f"/tmp/mcp_test_tree_{os.getpid()}_{int(compress)}"
+    contents = {f"d{i % 5}/f{i}.txt": f"file {i}\n".encode() * (i + 1) for i in range(200)}
+    files = [{"path": p, "data_b64": base64.b64encode(c).decode()} for p, c in contents.items()]
+    files[0]["mode"] = "0755"
+
+    try:
+        written = service.upload_tree(name, remote_dir, files, compress=compress)
+        assert written["status"] == "written" and written["files"] == 200, written
+
+        fetched = service.download_tree(name, remote_dir, compress=compress)
+        assert fetched["status"] == "ok", fetched
+        got = {f["path"]: base64.b64decode(f["data_b64"]) for f in fetched["files"]}
+        assert got == contents
+        modes = {f["path"]: f["mode"] for f in fetched["files"]}
+        assert modes[files[0]["path"]] == "0755"
+
+        missing = service.download_tree(name, remote_dir + "_missing")
+        assert missing["error"] == "tree_failed"
+    finally:
+        service.run_command_on_node(name, f"rm -rf {shlex.quote(remote_dir)}")
+
+
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_atomic_upload_replaces_file_and_leaves_no_temp_files(node_exec_fixture):
+    import base64
+    import hashlib
+    service, pool, name = node_exec_fixture
+    _wait_for_open(pool, name)
+
+    remote_dir = f"/tmp/mcp_test_atomic_{os.getpid()}"
+    remote_path = f"{remote_dir}/tool"
+    content = os.urandom(3 * 1024 * 1024)
+    service.run_command_on_node(name, f"mkdir -p {remote_dir} && printf old > {remote_path}")
+
+    try:
+        result = service.upload_file_to_node(
+            name, remote_path, base64.b64encode(content).decode(), mode="0755", atomic=True
+        )
+        assert result == {
+            "status": "written",
+            "path": remote_path,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "verified": True,
+        }
+        listing = service.run_command_on_node(name, f"ls -A {remote_dir}")
+        assert listing["stdout"].split() == ["tool"]
+        check = service.run_command_on_node(name, f"sha256sum {remote_path}")
+        assert check["stdout"].split()[0] == result["sha256"]
+    finally:
+        service.run_command_on_node(name, f"rm -rf {remote_dir}")
+
+
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_copy_between_nodes_streams_file(node_exec_fixture):
+    import base64
+    service, pool, name = node_exec_fixture
+    _wait_for_open(pool, name)
+
+    # The fixture has one node, so this copies node -> gateway -> same node.
+    content = os.urandom(5 * 1024 * 1024 + 123)
+    src_path = f"/tmp/mcp_test_copy_src_{os.getpid()}.bin"
+    dst_path = f"/tmp/mcp_test_copy_dst_{os.getpid()}.bin"
+
+    try:
+        assert service.upload_file_to_node(name, src_path, base64.b64encode(content).decode(), "0750")["status"] == "written"
+        result = service.copy_between_nodes(name, src_path, name, dst_path)
+        assert result["status"] == "copied", result
+        assert result["bytes_copied"] == len(content)
+        assert result["mode"] == "0750"
+
+        check = service.run_command_on_node(name, f"cmp {src_path} {dst_path} && stat -c %a {dst_path}")
+        assert check["exit_code"] == 0, check
+        assert check["stdout"].strip() == "750"
+    finally:
+        service.run_command_on_node(name, f"rm -f {src_path} {dst_path}")
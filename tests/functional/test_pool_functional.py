@@ -85,3 +85,21 @@ def test_pool_disable_connection_closes_and_prevents_reconnect(pool_and_name):
     time.sleep(0.6)
     state = pool.get_connection_state(name)
     assert state == "closed", f"Expected 'closed' after disable, got '{state}'"
+
+
+@pytest.mark.functional
+@pytest.mark.requires_sshd
+def test_pool_active_keepalive_measures_rtt(pool_and_name):
+    """A keepalive global request is answered by sshd and shows up in snapshot_rtt()."""
+    pool, name = pool_and_name
+    _wait_for_open(pool, name)
+
+    assert pool.get_connection(name).send_keepalive() is True
+
+    deadline = time.time() + 5
+    while time.time() < deadline and not pool.snapshot_rtt()[name]:
+        time.sleep(0.05)
+    rtt = pool.snapshot_rtt()[name]
+    assert rtt is not None and rtt["samples"] == 1
+    assert rtt["last_ms"] < 5000
+    assert pool.get_connection_state(name) == "open"